@@ -0,0 +1,9 @@
+import sys
+
+from dsr.batch import main
+
+
+#Запуск из каталога проекта: python batch.py ... (то же, что dsr batch ...)
+
+if __name__ == "__main__":
+    sys.exit(main())
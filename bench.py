@@ -0,0 +1,336 @@
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import networkx as nx
+import numpy as np
+
+from dsr.network_topology import NetworkTopologyGenerator
+from dsr.simulation import HeadlessNetwork
+
+
+#Набор бенчмарков ядра симулятора (фиксированные seed, без GUI)
+#Каждый бенчмарк - подготовка (не измеряется) и измеряемая функция, которая
+#выполняется repeat раз; в результат идут наименьшее и медианное время.
+#Результаты сохраняются в базовый файл (--save), следующие запуски сравниваются
+#с ним: отношение времени и отметка о замедлении больше threshold.
+
+DEFAULT_BASELINE = 'bench_baseline.json'
+SEED = 0
+PAIRS_SEED = 1
+
+Benchmark = Tuple[str, Callable[[], Callable[[], Optional[dict]]], int]  # имя, подготовка, repeat
+
+
+def bench_create_topology(method: str, num_nodes: int):
+    def setup():
+        return lambda: {'edges': NetworkTopologyGenerator.create_topology(num_nodes, SEED, method).number_of_edges()}
+    return setup
+
+
+def bench_create_adjacency(num_nodes: int):
+    #генератор сразу в массивы CSR (без графа networkx)
+    def setup():
+        return lambda: {'edges': NetworkTopologyGenerator.create_adjacency(num_nodes, SEED, 'constructive').num_edges}
+    return setup
+
+
+def bench_has_no_bridges(num_nodes: int):
+    def setup():
+        graph = NetworkTopologyGenerator.create_topology(num_nodes, SEED, 'constructive')
+        return lambda: {'no_bridges': NetworkTopologyGenerator.has_no_bridges(graph)}
+    return setup
+
+
+def bench_rreq_flood(num_nodes: int):
+    #рассылка RREQ по всей сети (назначение отвечает, кэши выключены, рассылка до конца)
+    def setup():
+        network = HeadlessNetwork(delay=1.0)
+        network.configure_route_cache(None, 0)
+        network.create_topology(num_nodes, SEED)
+        network.metrics = None  # только обработка пакетов узлами
+
+        def run():
+            before = network.packet_counts.get('RREQ', 0)
+            network.discover(0, num_nodes - 1)
+            return {'rreq': network.packet_counts.get('RREQ', 0) - before}
+        return run
+    return setup
+
+
+def bench_discovery(num_nodes: int, num_pairs: int = 50):
+    #поиск маршрутов для пар по очереди (кэши маршрутов включены, как в batch.py)
+    def setup():
+        rng = np.random.default_rng(PAIRS_SEED)
+        pairs = [tuple(int(x) for x in rng.choice(num_nodes, 2, replace=False)) for _ in range(num_pairs)]
+
+        def run():
+            network = HeadlessNetwork(delay=1.0)
+            network.create_topology(num_nodes, SEED)
+            latencies = []
+            for source, destination in pairs:
+                if network.discover(source, destination) is not None:
+                    latencies.append(network.found_time - network.start_time)
+            return {'discoveries': num_pairs, 'latency_mean': statistics.mean(latencies) if latencies else None}
+        return run
+    return setup
+
+
+def bench_partition(num_nodes: int, parts: int):
+    #разбиение графа на части для нескольких процессов (в результате - ребра между частями)
+    def setup():
+        from dsr.partition import cut_edges, partition_nodes
+
+        adjacency = NetworkTopologyGenerator.create_adjacency(num_nodes, SEED, 'constructive')
+        return lambda: {'cut_edges': cut_edges(adjacency, partition_nodes(adjacency, parts))}
+    return setup
+
+
+def bench_concurrent(num_nodes: int, workers: Optional[int] = None, num_pairs: int = 20):
+    #одновременные поиски без кэшей до конца рассылок; workers - узлы в нескольких
+    #процессах (PartitionedNetwork, процессы запускаются при подготовке и
+    #останавливаются после замеров через run.close)
+    def setup():
+        from dsr.partition import PartitionedNetwork
+
+        network = HeadlessNetwork(delay=1.0) if workers is None else PartitionedNetwork(workers, delay=1.0)
+        network.configure_route_cache(None, 0)
+        network.create_topology(num_nodes, SEED, 'constructive')
+        network.metrics = None
+        if workers is not None:
+            network.start_workers()
+        rng = np.random.default_rng(PAIRS_SEED)
+        pairs = [tuple(int(x) for x in rng.choice(num_nodes, 2, replace=False)) for _ in range(num_pairs)]
+
+        def run():
+            sessions = [network.initiate_communication(source, destination) for source, destination in pairs]
+            network.run()
+            return {'found': sum(session.route is not None for session in sessions),
+                    'rreq': sum(session.rreq for session in sessions)}
+        if workers is not None:
+            run.close = network.close
+        return run
+    return setup
+
+
+def bench_stretch(num_nodes: int):
+    #все пары: эталон shortest_hops и рассылка на источник (режим flood)
+    def setup():
+        from dsr.stretch import run_stretch
+
+        def run():
+            report, _ = run_stretch(num_nodes, SEED, 'flood')
+            return {'pairs': report['summary']['pairs'], 'rreq_mean': report['summary']['rreq']['mean']}
+        return run
+    return setup
+
+
+def _render_window(network):
+    #окно GUI без Tk: экземпляр DSRSimulatorGUI без setup_ui, холст Agg
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from graph_layout import LayoutCache
+    from gui import DSRSimulatorGUI
+
+    window = DSRSimulatorGUI.__new__(DSRSimulatorGUI)
+    window.network = network
+    window.pos = None
+    window.layout_cache = LayoutCache(cache_dir=None)
+    window._drawn_graph = None
+    window.node_collection = None
+    window.route_collection = None
+    window.info_text = None
+    window._node_order = []
+    window._node_index = {}
+    window.fig = Figure(figsize=(10, 8))
+    window.ax = window.fig.add_subplot(111)
+    window.canvas = FigureCanvasAgg(window.fig)  # draw_idle рисует сразу
+    return window
+
+
+def bench_visualize(num_nodes: int, rebuild: bool):
+    #visualize_graph: rebuild - первый кадр топологии (все объекты рисунка),
+    #иначе - кадр пакета (цвета узлов, маршрут, подпись) на готовых объектах
+    def setup():
+        from dsr.dsr_protocol import DSRPacket
+
+        network = HeadlessNetwork()
+        network.create_topology(num_nodes, SEED)
+        window = _render_window(network)
+        window.pos, _ = window.layout_cache.layout(network.graph)  # раскладка не измеряется
+        route = tuple(nx.shortest_path(network.graph, 0, num_nodes - 1))
+        packet = DSRPacket('RREQ', 0, num_nodes - 1, route[:-1], 1)
+        window.visualize_graph()
+
+        def run():
+            if rebuild:
+                window._drawn_graph = None
+            window.visualize_graph(route, packet, route[-2])
+        return run
+    return setup
+
+
+def bench_import(module: str):
+    #импорт ядра в новом процессе (вместе с запуском интерпретатора),
+    #в результате - тяжелые модули, загруженные при импорте
+    def setup():
+        from dsr.cli import measure_import
+        return lambda: {'heavy_loaded': measure_import(module)['heavy_loaded']}
+    return setup
+
+
+def benchmarks(quick: bool = False) -> List[Benchmark]:
+    sizes = (50, 200) if quick else (50, 200, 1000)
+    suite: List[Benchmark] = [('import.dsr.simulation', bench_import('dsr.simulation'), 5)]
+    for n in sizes:
+        suite.append((f'topology.incremental[{n}]', bench_create_topology('incremental', n), 5))
+    for n in (1000,) if quick else (1000, 10000):
+        suite.append((f'topology.constructive[{n}]', bench_create_topology('constructive', n), 5))
+    for n in (10000,) if quick else (10000, 100000):
+        suite.append((f'topology.adjacency[{n}]', bench_create_adjacency(n), 5))
+    for n in (1000,) if quick else (1000, 10000):
+        suite.append((f'topology.has_no_bridges[{n}]', bench_has_no_bridges(n), 5))
+    for n in sizes:
+        suite.append((f'node.rreq_flood[{n}]', bench_rreq_flood(n), 5))
+    for n in sizes[:2]:
+        suite.append((f'discovery.end_to_end[{n}]', bench_discovery(n), 3))
+    for n in (1000,) if quick else (1000, 10000):
+        suite.append((f'discovery.concurrent[{n}]', bench_concurrent(n), 3))
+        suite.append((f'discovery.partitioned[{n},workers=2]', bench_concurrent(n, 2), 3))
+    for n in (10000,) if quick else (10000, 100000):
+        suite.append((f'partition.nodes[{n},parts=4]', bench_partition(n, 4), 5))
+    for n in sizes[:2]:
+        suite.append((f'analysis.stretch[{n}]', bench_stretch(n), 3))
+    for n in (50,) if quick else (50, 200):
+        suite.append((f'gui.visualize_graph.rebuild[{n}]', bench_visualize(n, True), 5))
+        suite.append((f'gui.visualize_graph.frame[{n}]', bench_visualize(n, False), 10))
+    return suite
+
+
+def run_benchmark(setup, repeat: int) -> dict:
+    run = setup()
+    times = []
+    info = None
+    try:
+        run()  # прогрев (импорты, кэши интерпретатора)
+        for _ in range(repeat):
+            started = time.perf_counter()
+            info = run()
+            times.append(time.perf_counter() - started)
+    finally:
+        # ресурсы подготовки (процессы PartitionedNetwork) освобождаются и при ошибке замера
+        close = getattr(run, 'close', None)
+        if close is not None:
+            close()
+    result = {'min': min(times), 'median': statistics.median(times), 'repeat': repeat}
+    if info:
+        result['info'] = info
+    return result
+
+
+def environment() -> dict:
+    import matplotlib
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'networkx': nx.__version__,
+        'numpy': np.__version__,
+        'matplotlib': matplotlib.__version__,
+        'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> Tuple[List[str], int]:
+    #строки сравнения с базовым файлом и число замедлений (по наименьшему времени)
+    lines = [f"{'бенчмарк':<40} {'база, мс':>10} {'сейчас, мс':>11} {'отношение':>10}"]
+    regressions = 0
+    for name, result in results.items():
+        current = result['min'] * 1000.0
+        base = baseline.get(name)
+        if base is None:
+            lines.append(f"{name:<40} {'-':>10} {current:>11.3f} {'новый':>10}")
+            continue
+        ratio = result['min'] / base['min'] if base['min'] > 0 else float('inf')
+        mark = ''
+        if base.get('info') != result.get('info'):
+            mark = '  другой результат'  # seed те же - изменилось поведение, время несравнимо
+        elif ratio > 1.0 + threshold:
+            mark = '  ЗАМЕДЛЕНИЕ'
+            regressions += 1
+        elif ratio < 1.0 - threshold:
+            mark = '  ускорение'
+        lines.append(f"{name:<40} {base['min'] * 1000.0:>10.3f} {current:>11.3f} {ratio:>9.2f}x{mark}")
+    return lines, regressions
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Бенчмарки ядра симулятора DSR")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="базовый файл результатов")
+    parser.add_argument('--save', action='store_true', help="сохранить результаты как базовые")
+    parser.add_argument('--filter', '-k', nargs='+', help="только бенчмарки по шаблонам имен (например 'topology.*')")
+    parser.add_argument('--quick', action='store_true', help="только малые размеры")
+    parser.add_argument('--repeat', type=int, help="число повторов каждого бенчмарка")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="допустимое отклонение от базы (0.2 - на 20%%)")
+    parser.add_argument('--fail-on-regression', action='store_true',
+                        help="код выхода 1 при замедлении относительно базы")
+    parser.add_argument('--list', action='store_true', help="показать имена бенчмарков")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    suite = benchmarks(args.quick)
+    if args.filter:
+        suite = [b for b in suite if any(fnmatch.fnmatch(b[0], pattern) for pattern in args.filter)]
+    if args.list:
+        for name, _, _ in suite:
+            print(name)
+        return 0
+
+    results: Dict[str, dict] = {}
+    for name, setup, repeat in suite:
+        try:
+            results[name] = run_benchmark(setup, args.repeat or repeat)
+        except ImportError as e:  # например, нет tkinter для gui.*
+            print(f"{name}: пропущен ({e})", file=sys.stderr)
+            continue
+        print(f"{name:<40} min {results[name]['min'] * 1000.0:10.3f} мс  "
+              f"median {results[name]['median'] * 1000.0:10.3f} мс", file=sys.stderr)
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    regressions = 0
+    if baseline is not None and not args.save:
+        lines, regressions = compare(results, baseline['results'], args.threshold)
+        print(f"\nСравнение с {args.baseline} ({baseline['environment']['date']}):")
+        current = environment()
+        changed = [key for key in ('python', 'machine', 'networkx', 'numpy', 'matplotlib')
+                   if baseline['environment'].get(key) != current[key]]
+        if changed:
+            print(f"Внимание: окружение отличается от базового ({', '.join(changed)})")
+        print('\n'.join(lines))
+
+    if args.save:
+        saved = dict(baseline['results']) if baseline is not None else {}
+        saved.update(results)  # --filter обновляет только свои бенчмарки
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'environment': environment(), 'results': saved}, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+        print(f"Базовые результаты сохранены: {args.baseline}", file=sys.stderr)
+
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
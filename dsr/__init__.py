@@ -0,0 +1,53 @@
+#Ядро симулятора DSR без GUI: протокол, сеть, моделирование без потоков, трафик
+#Импорт пакета ничего не загружает: имена ниже берутся из модулей при первом
+#обращении (dsr.HeadlessNetwork импортирует dsr.simulation), networkx и numpy -
+#только когда понадобятся (см. _lazy).
+
+import importlib
+
+_EXPORTS = {
+    'DSRPacket': 'dsr_protocol',
+    'DataPacket': 'dsr_protocol',
+    'Node': 'dsr_protocol',
+    'RouteCache': 'dsr_protocol',
+    'Network': 'network',
+    'DiscoverySession': 'network',
+    'HeadlessNetwork': 'simulation',
+    'EventScheduler': 'simulation',
+    'PartitionedNetwork': 'partition',
+    'partition_nodes': 'partition',
+    'NetworkTopologyGenerator': 'network_topology',
+    'Adjacency': 'adjacency',
+    'StoredTopology': 'topology_file',
+    'save_topology': 'topology_file',
+    'load_topology': 'topology_file',
+    'LinkModel': 'link_model',
+    'LinkParams': 'link_model',
+    'NetworkMetrics': 'metrics',
+    'EventLog': 'event_log',
+    'TraceWriter': 'sim_trace',
+    'TraceReplay': 'sim_trace',
+    'read_trace': 'sim_trace',
+    'TrafficGenerator': 'traffic',
+    'Flow': 'traffic',
+    'RandomWaypoint': 'mobility',
+    'MobilityController': 'mobility',
+    'run_batch': 'batch',
+    'shortest_hops': 'stretch',
+    'run_stretch': 'stretch',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module 'dsr' has no attribute {name!r}")
+    value = getattr(importlib.import_module('.' + module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,28 @@
+import importlib.util
+import sys
+
+
+#Отложенный импорт тяжелых зависимостей (networkx, numpy, asyncio)
+#Модуль загружается при первом обращении к его атрибуту, поэтому импорт ядра
+#не платит за библиотеки, которые сценарию не понадобились. В аннотациях
+#модули не вычисляются (from __future__ import annotations у импортирующих).
+
+def lazy_import(name: str):
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"Модуль {name} не установлен", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def is_loaded(name: str) -> bool:
+    #модуль действительно выполнен (а не только отложен lazy_import)
+    module = sys.modules.get(name)
+    return module is not None and type(module).__name__ != '_LazyModule'
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import hashlib
+from array import array
+from typing import Dict, Iterable, Optional, Tuple
+
+from ._lazy import lazy_import
+
+nx = lazy_import('networkx')
+np = lazy_import('numpy')
+
+
+#Смежность в формате CSR: соседи узла v - indices[offsets[v]:offsets[v + 1]]
+#Два плоских массива вместо графа networkx (словарь словарей) и множества
+#соседей у каждого узла: на 100 тыс. узлов это единицы мегабайт, а не сотни.
+#Узлы перебирают соседей как срезы memoryview (без копий, элементы - int).
+#Хранилище неизменяемое: изменения связей (with_changes) дают новый экземпляр,
+#поэтому потоки узлов всегда видят согласованную смежность.
+
+Link = Tuple[int, int]
+
+
+class Adjacency:
+    #num_nodes число узлов (0..N-1)
+    #offsets начало списка соседей каждого узла (N + 1 значений, int64)
+    #indices соседи подряд (2 * число ребер, int32)
+    #assumed свойства, гарантированные генератором (is_connected, has_bridges),
+    #переносятся в метрики графа networkx при to_networkx
+
+    __slots__ = ('num_nodes', 'offsets', 'indices', 'assumed', '_offsets', '_indices')
+
+    def __init__(self, num_nodes: int, offsets, indices, assumed: Optional[dict] = None):
+        if len(offsets) != num_nodes + 1:
+            raise ValueError(f"Для {num_nodes} узлов нужно {num_nodes + 1} смещений, получено {len(offsets)}")
+        self.num_nodes = num_nodes
+        self.offsets = offsets
+        self.indices = indices
+        self.assumed = dict(assumed) if assumed else {}
+        self._offsets = memoryview(offsets)  # элементы memoryview - обычные int
+        self._indices = memoryview(indices)
+
+    def __reduce__(self):
+        #для передачи в другие процессы (memoryview не сериализуется)
+        return Adjacency, (self.num_nodes, self.offsets, self.indices, self.assumed)
+
+    @classmethod
+    def empty(cls, num_nodes: int = 0) -> "Adjacency":
+        #узлы без связей (без numpy)
+        return cls(num_nodes, array('q', bytes(8 * (num_nodes + 1))), array('i'))
+
+    @classmethod
+    def from_edges(cls, num_nodes: int, edges, assumed: Optional[dict] = None) -> "Adjacency":
+        #по массиву ребер (M, 2); соседи каждого узла - по возрастанию, поэтому
+        #смежность (и порядок рассылки RREQ) зависит только от набора ребер
+        edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        if len(edges) and (edges.min() < 0 or edges.max() >= num_nodes):
+            raise ValueError(f"Ребро с узлом вне 0..{num_nodes - 1}")
+        # каждое ребро в обе стороны: u0 v0 u1 v1 ... -> v0 u0 v1 u1 ...
+        sources = edges.ravel()
+        targets = edges[:, ::-1].ravel()
+        order = np.argsort(sources * num_nodes + targets, kind='stable')
+        offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=num_nodes), out=offsets[1:])
+        return cls(num_nodes, offsets, targets[order].astype(np.int32), assumed)
+
+    @classmethod
+    def from_graph(cls, graph: nx.Graph) -> "Adjacency":
+        #по графу networkx с узлами 0..N-1
+        return cls.from_edges(graph.number_of_nodes(), list(graph.edges()))
+
+    @property
+    def num_edges(self) -> int:
+        return len(self._indices) // 2
+
+    @property
+    def nbytes(self) -> int:
+        return self._offsets.nbytes + self._indices.nbytes
+
+    def __len__(self) -> int:
+        return self.num_nodes
+
+    def neighbors(self, node: int) -> memoryview:
+        #срез без копии: итерация и `in` по нему, list(...) для копии
+        offsets = self._offsets
+        return self._indices[offsets[node]:offsets[node + 1]]
+
+    def degree(self, node: int) -> int:
+        return self._offsets[node + 1] - self._offsets[node]
+
+    def degrees(self) -> np.ndarray:
+        return np.diff(np.asarray(self.offsets))
+
+    def has_edge(self, u: int, v: int) -> bool:
+        return v in self.neighbors(u)
+
+    def edges(self) -> np.ndarray:
+        #ребра (M, 2), u < v, по возрастанию u
+        sources = np.repeat(np.arange(self.num_nodes, dtype=np.int64), self.degrees())
+        targets = np.asarray(self.indices, dtype=np.int64)
+        forward = sources < targets
+        return np.stack([sources[forward], targets[forward]], axis=1)
+
+    def content_hash(self) -> str:
+        #хэш содержимого (соседи упорядочены: зависит только от набора ребер и числа узлов)
+        #один идентификатор топологии для файлов, таблиц sweep и кэша раскладок
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(np.asarray(self.offsets).astype('<i8', copy=False).tobytes())
+        digest.update(np.asarray(self.indices).astype('<i4', copy=False).tobytes())
+        return digest.hexdigest()
+
+    def with_changes(self, added: Iterable[Link], removed: Iterable[Link]) -> "Adjacency":
+        #новая смежность: без removed и с added (гарантии генератора больше не действуют)
+        #заново строятся только списки соседей концов измененных связей, участки
+        #остальных узлов копируются срезами - без сортировки всех ребер (from_edges)
+        n = self.num_nodes
+        changed: Dict[int, set] = {}
+        for edges, add in ((removed, False), (added, True)):
+            for u, v in edges:
+                if not (0 <= u < n and 0 <= v < n):
+                    raise ValueError(f"Ребро с узлом вне 0..{n - 1}")
+                for node, neighbor in ((u, v), (v, u)):
+                    neighbors = changed.get(node)
+                    if neighbors is None:
+                        neighbors = changed[node] = set(self.neighbors(node))
+                    if add:
+                        neighbors.add(neighbor)
+                    else:
+                        neighbors.discard(neighbor)
+        if not changed:
+            return Adjacency(n, self.offsets, self.indices)
+
+        nodes = sorted(changed)
+        old_offsets = np.asarray(self.offsets, dtype=np.int64)
+        old_indices = np.asarray(self.indices, dtype=np.int32)
+        degrees = np.diff(old_offsets)
+        degrees[nodes] = [len(changed[node]) for node in nodes]
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(degrees, out=offsets[1:])
+        indices = np.empty(offsets[-1], dtype=np.int32)
+        start = 0  # первый узел еще не скопированного участка без изменений
+        for node in nodes + [n]:
+            if start < node:
+                indices[offsets[start]:offsets[node]] = old_indices[old_offsets[start]:old_offsets[node]]
+            if node < n:
+                indices[offsets[node]:offsets[node + 1]] = sorted(changed[node])
+            start = node + 1
+        return Adjacency(n, offsets, indices)
+
+    def to_networkx(self) -> nx.Graph:
+        #граф для GUI и анализа (строится заново при каждом вызове)
+        from .network_topology import TopologyInfo
+
+        graph = nx.Graph()
+        graph.add_nodes_from(range(self.num_nodes))
+        graph.add_edges_from(self.edges().tolist())
+        if self.assumed:
+            TopologyInfo.for_graph(graph).assume(**self.assumed)
+        return graph
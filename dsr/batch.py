@@ -0,0 +1,274 @@
+import argparse
+import csv
+import json
+import random
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .simulation import HeadlessNetwork
+from .event_log import LEVEL_NAMES
+from .network_topology import NetworkTopologyGenerator
+
+
+#Пакетный запуск поиска маршрутов без GUI: задержки, процентили, число RREQ/RREP
+
+CSV_FIELDS = [
+    'source', 'destination', 'found', 'hops', 'latency',
+    'wall_ms', 'rreq', 'rrep', 'route',
+]
+
+
+def choose_pairs(num_nodes: int, count: int, rng: random.Random) -> List[Tuple[int, int]]:
+    #случайные пары (источник, назначение) с несовпадающими узлами
+    pairs = []
+    for _ in range(count):
+        source, destination = rng.sample(range(num_nodes), 2)
+        pairs.append((source, destination))
+    return pairs
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    #процентиль с линейной интерполяцией (q от 0 до 100)
+    if not values:
+        return None
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * q / 100.0
+    lower = int(pos)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (pos - lower)
+
+
+def summarize(values: List[float]) -> Dict[str, Optional[float]]:
+    return {
+        'mean': sum(values) / len(values) if values else None,
+        'p50': percentile(values, 50),
+        'p90': percentile(values, 90),
+        'p99': percentile(values, 99),
+        'max': max(values) if values else None,
+    }
+
+
+def run_batch(num_nodes: int, seed: int, num_pairs: int, delay: float = 1.0,
+              use_cache: bool = True, log_file: Optional[str] = None,
+              log_level: str = 'INFO', trace_file: Optional[str] = None,
+              method: str = 'incremental', num_edges: Optional[int] = None,
+              concurrent: bool = False, jitter: float = 0.0, loss: float = 0.0,
+              bandwidth: Optional[float] = None, metrics_file: Optional[str] = None,
+              metrics_format: str = 'prometheus', topology: Optional[str] = None,
+              workers: int = 1) -> dict:
+    #строим топологию по seed и выполняем поиск маршрута для каждой пары
+    #log_file структурированный журнал событий (JSON-строки), log_level его уровень
+    #trace_file файл трассы для проигрывания в GUI и анализа (sim_trace.read_trace)
+    #method, num_edges способ построения топологии и число ребер (для 'constructive')
+    #concurrent все поиски запускаются одновременно (нагрузочный режим), время
+    #по отдельным поискам тогда не разделить - в отчете только общее
+    #jitter, loss, bandwidth параметры всех каналов (см. link_model.LinkParams)
+    #metrics_file снимок метрик узлов и поисков в конце (формат metrics_format)
+    #topology файл сохраненной топологии вместо генерации (num_nodes берется из него)
+    #workers > 1 - узлы в нескольких процессах по частям графа (partition.PartitionedNetwork),
+    #маршруты и счетчики те же, что в одном процессе
+    if workers > 1:
+        from .partition import PartitionedNetwork  # multiprocessing - только для нескольких процессов
+        network = PartitionedNetwork(workers, delay)
+    else:
+        network = HeadlessNetwork(delay=delay)
+    try:
+        if trace_file:
+            network.start_trace(trace_file)
+        if log_file:
+            levels = {name: level for level, name in LEVEL_NAMES.items()}
+            network.open_log_file(log_file, levels[log_level])
+        if not use_cache:
+            network.configure_route_cache(None, 0)
+        network.configure_links(None, jitter, loss, bandwidth, seed)
+        if topology:
+            network.load_topology(topology)
+            num_nodes = network.adjacency.num_nodes
+        else:
+            network.create_topology(num_nodes, seed, method, num_edges)
+        pairs = choose_pairs(num_nodes, num_pairs, random.Random(seed))
+
+        discoveries = []
+        batch_started = time.perf_counter()
+        if concurrent:
+            sessions = [network.initiate_communication(source, destination) for source, destination in pairs]
+            network.run()
+            for session in sessions:
+                route = session.route
+                discoveries.append({
+                    'source': session.source,
+                    'destination': session.destination,
+                    'found': route is not None,
+                    'hops': len(route) - 1 if route else None,
+                    'latency': session.latency,
+                    'wall_ms': None,
+                    'rreq': session.rreq,
+                    'rrep': session.rrep,
+                    'route': list(route) if route else None,
+                })
+        else:
+            for source, destination in pairs:
+                rreq_before = network.packet_counts.get('RREQ', 0)
+                rrep_before = network.packet_counts.get('RREP', 0)
+                started = time.perf_counter()
+                route = network.discover(source, destination)
+                wall_ms = (time.perf_counter() - started) * 1000.0
+                discoveries.append({
+                    'source': source,
+                    'destination': destination,
+                    'found': route is not None,
+                    'hops': len(route) - 1 if route else None,
+                    'latency': network.found_time - network.start_time if route else None,
+                    'wall_ms': wall_ms,
+                    'rreq': network.packet_counts.get('RREQ', 0) - rreq_before,
+                    'rrep': network.packet_counts.get('RREP', 0) - rrep_before,
+                    'route': list(route) if route else None,
+                })
+        wall_total_ms = (time.perf_counter() - batch_started) * 1000.0
+        if metrics_file:
+            network.export_metrics(metrics_file, metrics_format)
+    finally:
+        # рабочие процессы, журнал и трасса закрываются и при ошибке
+        network.close_log_file()
+        network.stop_trace()
+        if workers > 1:
+            network.close()
+
+    found = [d for d in discoveries if d['found']]
+    return {
+        'config': {
+            'nodes': num_nodes,
+            'edges': network.adjacency.num_edges,
+            'seed': seed,
+            'generator': method,
+            'topology': topology,
+            'pairs': num_pairs,
+            'delay': delay,
+            'cache': use_cache,
+            'concurrent': concurrent,
+            'jitter': jitter,
+            'loss': loss,
+            'bandwidth': bandwidth,
+            'workers': workers,
+        },
+        'summary': {
+            'discoveries': len(discoveries),
+            'found': len(found),
+            'latency': summarize([d['latency'] for d in found]),
+            'wall_ms': summarize([d['wall_ms'] for d in discoveries if d['wall_ms'] is not None]),
+            'wall_total_ms': wall_total_ms,
+            'hops': summarize([d['hops'] for d in found]),
+            'rreq_total': network.packet_counts.get('RREQ', 0),
+            'rrep_total': network.packet_counts.get('RREP', 0),
+            'lost_total': network.link_model.lost,
+            'rreq_per_discovery': summarize([d['rreq'] for d in discoveries if d['rreq'] is not None]),
+            'rrep_per_discovery': summarize([d['rrep'] for d in discoveries if d['rrep'] is not None]),
+        },
+        'discoveries': discoveries,
+    }
+
+
+def write_json(report: dict, stream):
+    json.dump(report, stream, ensure_ascii=False, indent=2)
+    stream.write('\n')
+
+
+def write_csv(report: dict, stream):
+    writer = csv.DictWriter(stream, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    for discovery in report['discoveries']:
+        row = dict(discovery)
+        row['route'] = ' '.join(map(str, discovery['route'])) if discovery['route'] else ''
+        writer.writerow(row)
+
+
+def format_summary(report: dict) -> str:
+    config = report['config']
+    summary = report['summary']
+
+    def fmt(stats):
+        return ', '.join(
+            f"{key}={value:.3f}" if value is not None else f"{key}=-"
+            for key, value in stats.items()
+        )
+
+    return '\n'.join([
+        f"Топология: {config['nodes']} узлов, {config['edges']} связей, seed={config['seed']}",
+        f"Поисков: {summary['discoveries']}, маршрут найден: {summary['found']}",
+        f"Задержка (вирт. с): {fmt(summary['latency'])}",
+        f"Время (мс): {fmt(summary['wall_ms'])}, всего {summary['wall_total_ms']:.1f}",
+        f"RREQ: всего {summary['rreq_total']}, {fmt(summary['rreq_per_discovery'])}",
+        f"RREP: всего {summary['rrep_total']}, {fmt(summary['rrep_per_discovery'])}",
+        f"Потеряно пакетов: {summary['lost_total']}",
+    ])
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Пакетный поиск маршрутов DSR без GUI (отчет по задержкам и служебному трафику)"
+    )
+    parser.add_argument('--nodes', type=int, default=50, help="количество узлов")
+    parser.add_argument('--seed', type=int, default=0, help="seed топологии и выбора пар")
+    parser.add_argument('--generator', choices=NetworkTopologyGenerator.METHODS, default='incremental',
+                        help="способ построения топологии")
+    parser.add_argument('--edges', type=int, help="точное число ребер (для --generator constructive)")
+    parser.add_argument('--topology', help="файл топологии (см. dsr topology) вместо --nodes/--generator")
+    parser.add_argument('--pairs', type=int, default=100, help="количество пар источник/назначение")
+    parser.add_argument('--delay', type=float, default=1.0, help="задержка одного перехода (вирт. с)")
+    parser.add_argument('--no-cache', action='store_true', help="отключить кэш маршрутов узлов")
+    parser.add_argument('--jitter', type=float, default=0.0, help="разброс задержки канала (вирт. с)")
+    parser.add_argument('--loss', type=float, default=0.0, help="вероятность потери пакета в канале")
+    parser.add_argument('--bandwidth', type=float, help="пропускная способность канала (байт/вирт. с)")
+    parser.add_argument('--metrics', help="файл снимка метрик узлов и поисков")
+    parser.add_argument('--metrics-format', choices=('prometheus', 'csv', 'discoveries'), default='prometheus',
+                        help="формат снимка: Prometheus, CSV по узлам или CSV по поискам")
+    parser.add_argument('--concurrent', action='store_true',
+                        help="запустить все поиски одновременно (нагрузочный режим)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="число процессов узлов (граф делится на части, результаты те же); "
+                             "выигрыш только при свободных ядрах и больших рассылках (от ~10 тыс. узлов)")
+    parser.add_argument('--format', choices=('json', 'csv'), default='json')
+    parser.add_argument('--log-file', help="структурированный журнал событий (JSON-строки)")
+    parser.add_argument('--log-level', choices=('DEBUG', 'INFO', 'WARNING', 'ERROR'), default='INFO',
+                        help="уровень журнала (DEBUG - каждый RREQ/RREP)")
+    parser.add_argument('--trace', help="записать трассу событий для проигрывания")
+    parser.add_argument('--output', '-o', help="файл результата (по умолчанию stdout)")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.nodes < 2:
+        print("Ошибка: количество узлов должно быть не меньше 2", file=sys.stderr)
+        return 2
+
+    if args.workers < 1:
+        print("Ошибка: число процессов должно быть не меньше 1", file=sys.stderr)
+        return 2
+
+    if args.edges is not None and args.generator != 'constructive':
+        print("Ошибка: --edges задается только для --generator constructive", file=sys.stderr)
+        return 2
+
+    try:
+        report = run_batch(args.nodes, args.seed, args.pairs, args.delay, not args.no_cache,
+                           args.log_file, args.log_level, args.trace, args.generator, args.edges,
+                           args.concurrent, args.jitter, args.loss, args.bandwidth,
+                           args.metrics, args.metrics_format, args.topology, args.workers)
+    except ValueError as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 2
+    writer = write_json if args.format == 'json' else write_csv
+
+    if args.output:
+        with open(args.output, 'w', newline='', encoding='utf-8') as f:
+            writer(report, f)
+    else:
+        writer(report, sys.stdout)
+    print(format_summary(report), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+import argparse
+import importlib
+import json
+import re
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+
+#Консольная точка входа ядра (dsr или python -m dsr), GUI не загружается
+#Подкоманды batch, sweep, traffic, mobility, stretch, topology - те же CLI, что и у модулей;
+#import-time - время импорта ядра в отдельном процессе и загруженные тяжелые модули.
+
+COMMANDS = {
+    'batch': ('batch', "пакетный поиск маршрутов"),
+    'sweep': ('sweep', "перебор параметров в нескольких процессах"),
+    'traffic': ('traffic', "потоки данных CBR/Poisson"),
+    'mobility': ('mobility', "подвижность узлов и поддержка маршрутов"),
+    'stretch': ('stretch', "растяжение маршрутов относительно кратчайших путей"),
+    'topology': ('topology_file', "создание, преобразование и просмотр файлов топологии"),
+}
+
+HEAVY_MODULES = ('networkx', 'numpy', 'matplotlib', 'tkinter', 'asyncio')
+
+_IMPORTTIME = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+from dsr._lazy import is_loaded
+print(json.dumps({{'seconds': elapsed, 'heavy': [m for m in {heavy!r} if is_loaded(m)]}}))
+"""
+
+
+def measure_import(module: str = 'dsr.simulation', top: int = 10) -> Dict:
+    #импорт module в новом процессе: время (perf_counter и -X importtime),
+    #тяжелые модули, загруженные при импорте, и самые долгие модули
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        capture_output=True, text=True, check=True
+    )
+    process = time.perf_counter() - started
+    started = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'pass'], check=True)
+    interpreter = time.perf_counter() - started
+
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+    entries = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    # модули, загруженные командой import module (без импортов запуска интерпретатора):
+    # importtime пишет вложенные импорты до родителя, поэтому блок верхнего уровня -
+    # строки от предыдущей записи верхнего уровня до записи пакета или самого модуля
+    parts = module.split('.')
+    targets = {'.'.join(parts[:i]) for i in range(1, len(parts) + 1)}
+    own, block = [], []
+    for entry in entries:
+        block.append(entry)
+        if entry[3] == 0:
+            if entry[0] in targets:
+                own.extend(block)
+            block = []
+    slowest = sorted(own, key=lambda entry: entry[1], reverse=True)[:top]
+    return {
+        'module': module,
+        'import_ms': probe['seconds'] * 1000.0,
+        'process_ms': process * 1000.0,
+        'interpreter_ms': interpreter * 1000.0,
+        'heavy_loaded': probe['heavy'],
+        'slowest': [{'module': name, 'self_ms': self_us / 1000.0} for name, self_us, _, _ in slowest],
+    }
+
+
+def format_import(report: Dict) -> str:
+    lines = [
+        f"Импорт {report['module']}: {report['import_ms']:.1f} мс "
+        f"(процесс {report['process_ms']:.0f} мс, пустой интерпретатор {report['interpreter_ms']:.0f} мс)",
+        f"Загружены тяжелые модули: {', '.join(report['heavy_loaded']) or 'нет'}",
+        "Самые долгие модули (собственное время):",
+    ]
+    lines.extend(f"  {entry['self_ms']:8.2f} мс  {entry['module']}" for entry in report['slowest'])
+    return '\n'.join(lines)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='dsr', description="Симулятор DSR без GUI")
+    commands = parser.add_subparsers(dest='command', required=True)
+    for name, (_, text) in COMMANDS.items():
+        commands.add_parser(name, help=text, add_help=False)
+    timing = commands.add_parser('import-time', help="время импорта ядра (в отдельном процессе)")
+    timing.add_argument('--module', default='dsr.simulation', help="импортируемый модуль")
+    timing.add_argument('--top', type=int, default=10, help="сколько самых долгих модулей показать")
+    timing.add_argument('--json', action='store_true', help="результат в JSON")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in COMMANDS:
+        # параметры передаются CLI модуля как есть (dsr batch --help - справка batch)
+        module = importlib.import_module('.' + COMMANDS[argv[0]][0], __package__)
+        return module.main(argv[1:])
+
+    args = build_parser().parse_args(argv)
+    if args.command == 'import-time':
+        report = measure_import(args.module, args.top)
+        print(json.dumps(report, ensure_ascii=False, indent=2) if args.json else format_import(report))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
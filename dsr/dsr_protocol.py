@@ -0,0 +1,466 @@
+import threading
+import time
+import queue
+import itertools
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Tuple, Optional
+
+from .event_log import DEBUG, ERROR
+
+Route = Tuple[int, ...]  # маршрут - неизменяемый кортеж узлов
+
+
+class DSRPacket:
+    #Класс для работы с пакетами DSR
+    #Маршрут - неизменяемый кортеж, поэтому один пакет RREQ рассылается всем
+    #соседям без копирования, а RREP несет индекс hop узла-получателя в маршруте
+    #(пересылка O(1) на переход, без reversed и index)
+    
+    __slots__ = ('type', 'source', 'destination', 'route', 'packet_id', 'hop', 'timestamp')
+    
+    def __init__(self, packet_type: str, source: int, destination: int, 
+                 route: Optional[Iterable[int]] = None, packet_id: int = 0, hop: int = 0):
+        self.type = packet_type  # RREQ, RREP, RERR или DATA
+        self.source = source
+        self.destination = destination
+        self.route: Route = tuple(route) if route else (source,)  # кортеж не копируется
+        self.packet_id = packet_id
+        self.hop = hop  # для RREP: индекс узла-получателя в route
+        self.timestamp = time.time()
+        
+    def at_hop(self, hop: int) -> "DSRPacket":
+        #тот же пакет для следующего перехода (маршрут общий, не копируется)
+        return DSRPacket(self.type, self.source, self.destination, self.route, self.packet_id, hop)
+
+
+def route_uses_link(route: Route, u: int, v: int) -> bool:
+    #проходит ли маршрут по связи u-v (в любом направлении)
+    if u not in route or v not in route:
+        return False
+    i = route.index(u)
+    return (i + 1 < len(route) and route[i + 1] == v) or (i > 0 and route[i - 1] == v)
+
+
+def broken_link(rerr: DSRPacket) -> Tuple[int, int]:
+    #разорванная связь из RERR: от обнаружившего узла (source) к следующему по маршруту
+    i = rerr.route.index(rerr.source)
+    return rerr.source, rerr.route[i + 1]
+
+
+class DataPacket(DSRPacket):
+    #Пакет данных (DATA), пересылается по маршруту источника из заголовка
+    #hop индекс узла-получателя в route, пакет идет по одному пути, поэтому
+    #при пересылке hop меняется на месте (без нового объекта)
+    #flow_id поток, к которому относится пакет, packet_id - номер в потоке
+    #payload размер данных (байты), sent_at время сети отправки источником
+    
+    __slots__ = ('flow_id', 'payload', 'sent_at')
+    
+    def __init__(self, route: Route, flow_id: int, packet_id: int, payload: int, sent_at: float):
+        self.type = 'DATA'
+        self.source = route[0]
+        self.destination = route[-1]
+        self.route = route
+        self.packet_id = packet_id
+        self.hop = 0
+        self.timestamp = sent_at
+        self.flow_id = flow_id
+        self.payload = payload
+        self.sent_at = sent_at
+
+
+class RouteCache:
+    #Кэш маршрутов узла: назначение -> маршрут (начинается с самого узла)
+    #ttl время жизни маршрута в секундах (None - без ограничения)
+    #max_size максимальное число маршрутов, при переполнении вытесняется
+    #давно не использованный (LRU), None - без ограничения
+    #clock функция текущего времени (у сети без потоков время виртуальное)
+
+    def __init__(self, ttl: Optional[float] = None, max_size: Optional[int] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.clock = clock
+        self._routes: "OrderedDict[int, Tuple[Optional[float], Route]]" = OrderedDict()
+
+    def get(self, destination: int) -> Optional[Route]:
+        entry = self._routes.get(destination)
+        if entry is None:
+            return None
+        expires, route = entry
+        if expires is not None and self.clock() >= expires:
+            del self._routes[destination]
+            return None
+        self._routes.move_to_end(destination)
+        return route
+
+    def put(self, destination: int, route: Route):
+        expires = self.clock() + self.ttl if self.ttl is not None else None
+        self._routes[destination] = (expires, route)
+        self._routes.move_to_end(destination)
+        if self.max_size is not None:
+            while len(self._routes) > self.max_size:
+                self._routes.popitem(last=False)
+
+    def remove_link(self, u: int, v: int) -> int:
+        #удаляем маршруты через связь u-v (связь разорвана), возвращаем их количество
+        stale = [destination for destination, (_, route) in self._routes.items()
+                 if route_uses_link(route, u, v)]
+        for destination in stale:
+            del self._routes[destination]
+        return len(stale)
+
+    def clear(self):
+        self._routes.clear()
+
+    def __contains__(self, destination: int) -> bool:
+        return self.get(destination) is not None
+
+    def __len__(self) -> int:
+        return len(self._routes)
+
+
+class RreqFilter:
+    #Подавление повторных RREQ с ограниченной памятью
+    #Идентификаторы запросов у каждого источника монотонные, поэтому для источника
+    #хранится старший идентификатор и битовая маска последних window
+    #идентификаторов. Отмеченные запросы, вышедшие из окна (у источника много
+    #одновременных поисков, RREQ приходят не по порядку), переносятся в словарь
+    #идентификатор -> время: запрос старше окна повторный, только если он там есть.
+    #Устаревание решает только время: источники, от которых ничего не было дольше
+    #expiry секунд, забываются, из словаря уходят записи старше expiry.
+    #window можно увеличивать на ходу (сеть растит окно по числу открытых поисков
+    #одного источника), записанные до этого в словарь запросы остаются в нем.
+    
+    def __init__(self, window: int = 64, expiry: Optional[float] = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.expiry = expiry
+        self.clock = clock
+        self._entries: Dict[int, list] = {}  # source -> [старший id, маска, время, {id вне окна: время}]
+        self._last_purge = clock()
+        
+    def register(self, source: int, request_id: int) -> bool:
+        #отмечаем запрос, True если он новый (его нужно обработать)
+        now = self.clock()
+        if self.expiry is not None and now - self._last_purge > self.expiry:
+            self._purge(now)
+        entry = self._entries.get(source)
+        if entry is None:
+            self._entries[source] = [request_id, 1, now, {}]
+            return True
+        highest, mask, _, older = entry
+        entry[2] = now
+        if request_id > highest:
+            shift = request_id - highest
+            window = self.window
+            # отмеченные запросы, которые выходят из окна, - в словарь
+            moved = mask >> max(0, window - shift)
+            offset = max(window, shift)  # смещение младшего выходящего бита после сдвига
+            while moved:
+                if moved & 1:
+                    older[request_id - offset] = now
+                moved >>= 1
+                offset += 1
+            entry[0] = request_id
+            entry[1] = ((mask << shift) | 1) & ((1 << window) - 1) if shift < window else 1
+            return True
+        offset = highest - request_id
+        if offset >= self.window:
+            if request_id in older:
+                return False
+            older[request_id] = now
+            return True
+        if mask >> offset & 1 or (older and request_id in older):  # словарь - после роста окна
+            return False
+        entry[1] = mask | (1 << offset)
+        return True
+        
+    def _purge(self, now: float):
+        stale = [source for source, entry in self._entries.items() if now - entry[2] > self.expiry]
+        for source in stale:
+            del self._entries[source]
+        for entry in self._entries.values():
+            older = entry[3]
+            if older:
+                entry[3] = {request_id: seen for request_id, seen in older.items() if now - seen <= self.expiry}
+        self._last_purge = now
+        
+    def __contains__(self, key: Tuple[int, int]) -> bool:
+        source, request_id = key
+        entry = self._entries.get(source)
+        if entry is None:
+            return False
+        offset = entry[0] - request_id
+        if offset >= self.window:
+            return request_id in entry[3]
+        return offset >= 0 and (bool(entry[1] >> offset & 1) or request_id in entry[3])
+        
+    def clear(self):
+        self._entries.clear()
+        
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class Node(threading.Thread):
+    #Класс узла сети, работающий в отдельном потоке
+    
+    def __init__(self, node_id: int, network): #инициализируем узел
+        super().__init__(daemon=True)
+        self.node_id = node_id
+        self.network = network
+        self.route_cache = RouteCache(  # кэш маршрутов (TTL + LRU)
+            network.route_cache_ttl, network.route_cache_size, network.now
+        )
+        self.message_queue = queue.Queue()
+        self.running = False
+        self.processed_rreq = RreqFilter(network.rreq_window, clock=network.now)  # source, packet_id
+        self._request_ids = itertools.count(1)  # монотонные идентификаторы своих RREQ
+        
+    @property
+    def neighbors(self) -> memoryview:
+        #соседи - срез массива смежности сети (без копии), связи меняет сеть
+        return self.network.adjacency.neighbors(self.node_id)
+        
+    def link_broken(self, neighbor_id: int):
+        #связь с соседом пропала (подвижность): маршруты через нее в кэше недействительны
+        self.route_cache.remove_link(self.node_id, neighbor_id)
+        
+    def run(self):
+        #основной цикл работы узла
+        self.running = True
+        while self.running:
+            try:
+                # Получаем сообщение из очереди
+                packet = self.message_queue.get(timeout=0.1)
+                self.process_packet(packet, self.message_queue.qsize())
+            except queue.Empty: #если очередь пуста, то продолжаем цикл
+                continue
+            except Exception as e:
+                self.network.log("Ошибка в узле %s: %s", self.node_id, e, level=ERROR)
+                
+    def process_packet(self, packet: DSRPacket, queue_depth: int = 0):
+        #обработка входящего пакета
+        #queue_depth длина очереди узла после извлечения пакета (для метрик)
+        if packet.type == 'DATA':
+            # горячий путь пересылки данных: без замера времени, итоги - в потоках сети
+            self.process_data(packet)
+            return
+        metrics = self.network.metrics
+        if metrics is not None:
+            started = time.perf_counter()
+        if packet.type == 'RREQ':
+            self.process_rreq(packet)
+        elif packet.type == 'RREP':
+            self.process_rrep(packet)
+        elif packet.type == 'RERR':
+            self.process_rerr(packet)
+        if metrics is not None:
+            metrics.packet_processed(self.node_id, packet.type, time.perf_counter() - started, queue_depth)
+            
+    def process_rreq(self, packet: DSRPacket):
+        #обработка запроса маршрута (Route Request)
+        # Проверяем, не обрабатывали ли мы уже этот RREQ (и отмечаем его)
+        if not self.processed_rreq.register(packet.source, packet.packet_id):
+            return
+        
+        # Логируем получение RREQ
+        self.network.log(
+            "Узел %s получил RREQ от %s к %s, маршрут: %s",
+            self.node_id, packet.source, packet.destination, packet.route, level=DEBUG
+        )
+        self.network.visualize_step(packet, self.node_id)
+        
+        # Если мы узел назначения
+        if self.node_id == packet.destination:
+            # Отправляем RREP обратно
+            self.send_rrep(packet)
+            return
+            
+        # Проверяем, что нас еще нет в маршруте (избегаем циклов)
+        if self.node_id in packet.route:
+            return
+            
+        # Если в кэше есть маршрут до назначения, отвечаем сами (cached reply),
+        # склеивая пройденный путь с маршрутом из кэша без циклов
+        cached_route = self.route_cache.get(packet.destination)
+        if cached_route is not None and not set(cached_route).intersection(packet.route):
+            self.send_rrep(packet, cached_route)
+            return
+            
+        # Добавляем себя к маршруту и пересылаем соседям
+        # (один пакет на всех соседей, маршрут неизменяемый)
+        new_route = packet.route + (self.node_id,)
+        new_packet = DSRPacket(
+            'RREQ', 
+            packet.source, 
+            packet.destination,
+            new_route,
+            packet.packet_id
+        )
+        for neighbor in self.neighbors:
+            if neighbor not in new_route:
+                self.network.send_packet(self.node_id, neighbor, new_packet)
+                
+    def send_rrep(self, rreq_packet: DSRPacket, cached_route: Optional[Route] = None):
+        #отправка ответа на запрос маршрута (Route Reply)
+        #cached_route маршрут из кэша от этого узла до назначения (ответ промежуточного узла)
+        # полный маршрут от источника до назначения
+        full_route = rreq_packet.route + (cached_route or (self.node_id,))
+        
+        if cached_route:
+            self.network.log(
+                "Узел %s отвечает из кэша RREP к %s, маршрут: %s",
+                self.node_id, rreq_packet.source, full_route
+            )
+        else:
+            self.network.log(
+                "Узел %s отправляет RREP к %s, маршрут: %s",
+                self.node_id, rreq_packet.source, full_route
+            )
+            # Запоминаем обратный маршрут до источника
+            self.route_cache.put(rreq_packet.source, full_route[::-1])
+        
+        # Создаем RREP пакет
+        rrep = DSRPacket(
+            'RREP',
+            rreq_packet.destination,  # Теперь мы источник
+            rreq_packet.source,        # Первоначальный источник это назначение
+            full_route,
+            rreq_packet.packet_id,
+            len(rreq_packet.route) - 1  # следующий получатель - последний узел пройденного пути
+        )
+        
+        # Отправляем RREP обратно по обратному маршруту (мы стоим сразу после пройденного пути)
+        if rreq_packet.route:
+            next_hop = full_route[rrep.hop]
+            self.network.send_packet(self.node_id, next_hop, rrep)
+            
+    def process_rrep(self, packet: DSRPacket):
+        """Route Reply обработка"""
+        self.network.log(
+            "Узел %s получил RREP от %s к %s, маршрут: %s",
+            self.node_id, packet.source, packet.destination, packet.route, level=DEBUG
+        )
+        self.network.visualize_step(packet, self.node_id)
+        
+        # Сохраняем в кэше маршрут до назначения и обратный до источника
+        current_idx = packet.hop
+        self.route_cache.put(packet.source, packet.route[current_idx:])
+        if current_idx > 0:
+            self.route_cache.put(packet.destination, packet.route[current_idx::-1])
+        
+        # Если мы узел назначения RREP (источник RREQ)
+        if self.node_id == packet.destination:
+            self.network.log(
+                "Маршрут найден! От %s до %s: %s",
+                self.node_id, packet.source, packet.route
+            )
+            self.network.route_found(packet.route, packet.packet_id)
+            return
+            
+        # Пересылаем RREP дальше по маршруту (к источнику)
+        if current_idx > 0:
+            next_hop = packet.route[current_idx - 1]
+            self.network.send_packet(self.node_id, next_hop, packet.at_hop(current_idx - 1))
+            
+    def process_data(self, packet: DataPacket):
+        #пересылка данных по маршруту источника (без журнала и визуализации -
+        #пакетов данных миллионы, итоги считает сеть)
+        route = packet.route
+        hop = packet.hop
+        if hop == len(route) - 1:
+            self.network.data_delivered(packet)
+            return
+        next_hop = route[hop + 1]
+        if next_hop not in self.neighbors:  # связи на маршруте больше нет
+            self.network.data_dropped(packet, self.node_id)
+            self.send_rerr(packet, next_hop)
+            return
+        packet.hop = hop + 1
+        self.network.send_packet(self.node_id, next_hop, packet)
+        
+    def send_rerr(self, packet: DSRPacket, next_hop: int):
+        #ошибка маршрута (Route Error): связь с next_hop разорвана, сообщаем источнику
+        #пакета по пройденной части маршрута (обратно, как RREP)
+        self.route_cache.remove_link(self.node_id, next_hop)
+        hop = packet.hop  # наш индекс в маршруте
+        if hop == 0:  # мы сами источник
+            self.network.route_error(self.node_id, (self.node_id, next_hop))
+            return
+        rerr = DSRPacket('RERR', self.node_id, packet.source, packet.route, packet.packet_id, hop - 1)
+        self.network.log(
+            "Узел %s отправляет RERR к %s: связь %s-%s разорвана",
+            self.node_id, packet.source, self.node_id, next_hop
+        )
+        self.network.visualize_step(rerr, self.node_id)
+        previous = packet.route[hop - 1]
+        if previous in self.neighbors:
+            self.network.send_packet(self.node_id, previous, rerr)
+            
+    def process_rerr(self, packet: DSRPacket):
+        #обработка ошибки маршрута: убираем маршруты через разорванную связь и
+        #пересылаем RERR дальше к источнику (если и обратной связи нет - RERR теряется)
+        u, v = broken_link(packet)
+        self.route_cache.remove_link(u, v)
+        self.network.log(
+            "Узел %s получил RERR от %s: связь %s-%s разорвана",
+            self.node_id, packet.source, u, v, level=DEBUG
+        )
+        self.network.visualize_step(packet, self.node_id)
+        
+        if self.node_id == packet.destination:
+            self.network.route_error(self.node_id, (u, v))
+            return
+            
+        hop = packet.hop
+        if hop > 0 and packet.route[hop - 1] in self.neighbors:
+            self.network.send_packet(self.node_id, packet.route[hop - 1], packet.at_hop(hop - 1))
+            
+    def send_data(self, packet: DataPacket):
+        #отправка пакета данных этим узлом-источником (route[0] == node_id)
+        self.process_data(packet)
+        
+    def next_request_id(self) -> int:
+        #следующий идентификатор своего RREQ (монотонный)
+        return next(self._request_ids)
+        
+    def initiate_route_discovery(self, destination: int, request_id: Optional[int] = None): # Инициировать поиск маршрута к узлу назначения
+        #request_id идентификатор запроса (выдает сеть для сеанса), None - новый
+        if request_id is None:
+            request_id = self.next_request_id()
+            
+        # Проверяем кэш маршрутов
+        cached_route = self.route_cache.get(destination)
+        if cached_route is not None:
+            self.network.log(
+                "Узел %s использует кэшированный маршрут к %s: %s",
+                self.node_id, destination, cached_route
+            )
+            self.network.route_found(cached_route, request_id)
+            return
+
+        # Создаем новый RREQ
+        packet_id = request_id
+        rreq = DSRPacket('RREQ', self.node_id, destination, (self.node_id,), packet_id)
+        
+        self.network.log(
+            "Узел %s инициирует поиск маршрута к %s", self.node_id, destination
+        )
+        self.network.visualize_step(rreq, self.node_id)
+        
+        # Отмечаем, что мы обработали этот RREQ
+        self.processed_rreq.register(self.node_id, packet_id)
+        
+        # Отправляем RREQ всем соседям
+        for neighbor in self.neighbors:
+            self.network.send_packet(self.node_id, neighbor, rreq)
+            
+    def stop(self): # Остановить узел
+        self.running = False
+    
+    def clear_cache(self):#Очистить кэш маршрутов и обработанных RREQ
+        self.processed_rreq.clear()
+        self.route_cache.clear()
+
@@ -0,0 +1,108 @@
+import json
+import time
+from typing import Callable, List, Optional
+
+
+#Журнал событий с уровнями
+#Сообщение передается шаблоном и аргументами (как в logging) и форматируется
+#только если его кто-то читает: уровень прошел фильтр и есть хотя бы один приемник.
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVEL_NAMES = {DEBUG: 'DEBUG', INFO: 'INFO', WARNING: 'WARNING', ERROR: 'ERROR'}
+
+
+class LogRecord:
+    #запись журнала, текст собирается при первом обращении к message
+
+    __slots__ = ('time', 'level', 'template', 'args', '_message')
+
+    def __init__(self, time: float, level: int, template: str, args: tuple):
+        self.time = time
+        self.level = level
+        self.template = template
+        self.args = args
+        self._message: Optional[str] = None
+
+    @property
+    def message(self) -> str:
+        if self._message is None:
+            self._message = self.template % self.args if self.args else self.template
+        return self._message
+
+
+class CallbackSink:
+    #приемник, передающий готовый текст в функцию (например, DSRSimulatorGUI.add_log)
+
+    def __init__(self, callback: Callable[[str], None], level: int = DEBUG):
+        self.callback = callback
+        self.level = level
+
+    def emit(self, record: LogRecord):
+        self.callback(record.message)
+
+    def close(self):
+        pass
+
+
+class FileLogSink:
+    #структурированный журнал: одна JSON-строка на запись
+    #{"time": ..., "level": "INFO", "message": ...}, запись буферизуется
+
+    def __init__(self, path: str, level: int = DEBUG, buffer_size: int = 1 << 16):
+        self.path = path
+        self.level = level
+        self._file = open(path, 'a', encoding='utf-8', buffering=buffer_size)
+
+    def emit(self, record: LogRecord):
+        self._file.write(json.dumps({
+            'time': record.time,
+            'level': LEVEL_NAMES.get(record.level, record.level),
+            'message': record.message,
+        }, ensure_ascii=False))
+        self._file.write('\n')
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+class EventLog:
+    #level минимальный уровень записей (ниже - отбрасываются без форматирования)
+    #clock функция времени для записей (у сети без потоков время виртуальное)
+
+    def __init__(self, level: int = DEBUG, clock: Callable[[], float] = time.time):
+        self.level = level
+        self.clock = clock
+        self.sinks: List = []
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+        return sink
+
+    def remove_sink(self, sink):
+        if sink in self.sinks:
+            self.sinks.remove(sink)
+            sink.close()
+
+    def enabled(self, level: int) -> bool:
+        return level >= self.level and bool(self.sinks)
+
+    def log(self, level: int, template: str, *args):
+        if level < self.level or not self.sinks:
+            return
+        record = LogRecord(self.clock(), level, template, args)
+        for sink in self.sinks:
+            if level >= sink.level:
+                sink.emit(record)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+        self.sinks.clear()
@@ -0,0 +1,97 @@
+import random
+import threading
+from typing import Dict, Optional, Tuple
+
+from .dsr_protocol import DSRPacket
+
+
+#Модель каналов: задержка, разброс, потери и пропускная способность каждого ребра
+#Отправка не ждет: transmit только вычисляет, через сколько секунд пакет
+#придет (или что он потерян), доставку по времени выполняет планировщик среды.
+
+PACKET_HEADER_SIZE = 16  # тип, источник, назначение, идентификатор (байты)
+ROUTE_ENTRY_SIZE = 4  # один узел маршрута (байты)
+
+
+def packet_size(packet: DSRPacket) -> int:
+    #размер пакета в байтах (заголовок + маршрут + данные у DATA)
+    return PACKET_HEADER_SIZE + ROUTE_ENTRY_SIZE * len(packet.route) + getattr(packet, 'payload', 0)
+
+
+class LinkParams:
+    #параметры канала
+    #latency задержка распространения (секунды, None - задержка сети Network.delay)
+    #jitter разброс задержки, равномерно в [-jitter, +jitter] (секунды)
+    #loss вероятность потери пакета (0..1)
+    #bandwidth пропускная способность (байт/с, None - без ограничения и без очереди)
+
+    __slots__ = ('latency', 'jitter', 'loss', 'bandwidth')
+
+    def __init__(self, latency: Optional[float] = None, jitter: float = 0.0,
+                 loss: float = 0.0, bandwidth: Optional[float] = None):
+        if not 0.0 <= loss <= 1.0:
+            raise ValueError(f"Вероятность потери должна быть от 0 до 1: {loss}")
+        if bandwidth is not None and bandwidth <= 0:
+            raise ValueError(f"Пропускная способность должна быть положительной: {bandwidth}")
+        self.latency = latency
+        self.jitter = max(0.0, jitter)
+        self.loss = loss
+        self.bandwidth = bandwidth
+
+
+class LinkModel:
+    #default параметры всех каналов без собственных настроек
+    #sent, lost количество переданных и потерянных пакетов
+    #Канал с ограниченной пропускной способностью передает пакеты по очереди
+    #(отдельно в каждом направлении): следующий начинает передачу, когда
+    #закончилась предыдущая.
+
+    def __init__(self, default: Optional[LinkParams] = None, seed: Optional[int] = None):
+        self.default = default or LinkParams()
+        self.rng = random.Random(seed)
+        self.sent = 0
+        self.lost = 0
+        self._links: Dict[Tuple[int, int], LinkParams] = {}
+        self._busy_until: Dict[Tuple[int, int], float] = {}
+        self._lock = threading.Lock()
+
+    def set_link(self, u: int, v: int, params: LinkParams):
+        #собственные параметры ребра (в обе стороны)
+        self._links[(u, v) if u < v else (v, u)] = params
+
+    def get_link(self, u: int, v: int) -> LinkParams:
+        return self._links.get((u, v) if u < v else (v, u), self.default)
+
+    def reset(self):
+        #сброс очередей каналов и счетчиков (параметры сохраняются)
+        with self._lock:
+            self._busy_until.clear()
+            self.sent = 0
+            self.lost = 0
+
+    def transmit(self, now: float, from_node: int, to_node: int, packet: DSRPacket,
+                 base_delay: float) -> Optional[float]:
+        #через сколько секунд пакет придет к to_node, None - потерян
+        #base_delay задержка для каналов без своей latency
+        params = self._links.get((from_node, to_node) if from_node < to_node else (to_node, from_node),
+                                 self.default)
+        latency = base_delay if params.latency is None else params.latency
+        if params.jitter == 0.0 and params.loss == 0.0 and params.bandwidth is None:
+            with self._lock:  # += не атомарно: узлы в потоках передают одновременно
+                self.sent += 1
+            return latency
+
+        with self._lock:
+            self.sent += 1
+            start = now
+            if params.bandwidth is not None:
+                key = (from_node, to_node)
+                start = max(now, self._busy_until.get(key, now))
+                start += packet_size(packet) / params.bandwidth
+                self._busy_until[key] = start
+            if params.loss and self.rng.random() < params.loss:
+                self.lost += 1
+                return None
+            if params.jitter:
+                latency = max(0.0, latency + self.rng.uniform(-params.jitter, params.jitter))
+        return start - now + latency
@@ -0,0 +1,331 @@
+import bisect
+import csv
+import os
+import threading
+from array import array
+from collections import deque
+from typing import Deque, Dict, List, Optional, Sequence
+
+
+#Счетчики и гистограммы сети
+#Обновление - несколько сложений на пакет, без блокировок (счетчики приблизительны
+#при одновременной записи из потоков узлов, для наблюдения этого достаточно).
+#Экспорт: словарь (API), CSV, текстовый формат Prometheus (textfile collector).
+
+PROCESS_BUCKETS = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 1e-2, 5e-2, 0.1)
+LATENCY_BUCKETS = (0.1, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+CONTROL_BUCKETS = (10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000)
+HOPS_BUCKETS = (1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 30, 50)
+
+
+class Histogram:
+    #гистограмма с фиксированными верхними границами корзин (как в Prometheus)
+
+    __slots__ = ('bounds', 'counts', 'count', 'sum')
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # последняя - +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        #оценка квантиля по корзинам (верхняя граница корзины)
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds + (float('inf'),), self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float('inf')
+
+    def as_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else None,
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+        }
+
+
+class NodeMetrics:
+    #счетчики одного узла
+    #packets_in, packets_out пакеты по типам
+    #queue_depth последняя и queue_depth_max наибольшая длина очереди при обработке
+    #process_count, process_time, process_time_max вызовы process_packet и их время (секунды)
+
+    __slots__ = ('packets_in', 'packets_out', 'queue_depth', 'queue_depth_max',
+                 'process_count', 'process_time', 'process_time_max')
+
+    def __init__(self):
+        self.packets_in: Dict[str, int] = {}
+        self.packets_out: Dict[str, int] = {}
+        self.queue_depth = 0
+        self.queue_depth_max = 0
+        self.process_count = 0
+        self.process_time = 0.0
+        self.process_time_max = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            'packets_in': dict(self.packets_in),
+            'packets_out': dict(self.packets_out),
+            'queue_depth': self.queue_depth,
+            'queue_depth_max': self.queue_depth_max,
+            'process_count': self.process_count,
+            'process_time': self.process_time,
+            'process_time_max': self.process_time_max,
+        }
+
+
+class FlowStats:
+    #итоги потока данных (пакеты DATA одного источника к одному назначению)
+    #sent, delivered пакеты, dropped отброшены узлом (следующего перехода нет среди соседей),
+    #остальные неполученные потеряны в каналах или еще в пути
+    #no_route пакеты, не отправленные из-за отсутствия маршрута (идет новый поиск)
+    #bytes_delivered полученные данные, latencies задержки доставленных пакетов (секунды сети)
+    #first_sent, last_delivered время сети первой отправки и последней доставки
+
+    __slots__ = ('flow_id', 'source', 'destination', 'sent', 'delivered', 'dropped', 'no_route',
+                 'bytes_delivered', 'latencies', 'first_sent', 'last_delivered')
+
+    def __init__(self, flow_id: int, source: int, destination: int):
+        self.flow_id = flow_id
+        self.source = source
+        self.destination = destination
+        self.sent = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.no_route = 0
+        self.bytes_delivered = 0
+        self.latencies = array('d')  # миллионы значений без объектов float
+        self.first_sent: Optional[float] = None
+        self.last_delivered: Optional[float] = None
+
+    def packet_sent(self, now: float):
+        if self.first_sent is None:
+            self.first_sent = now
+        self.sent += 1
+
+    def packet_delivered(self, now: float, latency: float, payload: int):
+        self.delivered += 1
+        self.bytes_delivered += payload
+        self.latencies.append(latency)
+        self.last_delivered = now
+
+    @property
+    def lost(self) -> int:
+        return self.sent - self.delivered - self.dropped
+
+    @property
+    def throughput(self) -> Optional[float]:
+        #полученные данные в байтах за секунду сети (от первой отправки до последней доставки)
+        if self.first_sent is None or self.last_delivered is None or self.last_delivered <= self.first_sent:
+            return None
+        return self.bytes_delivered / (self.last_delivered - self.first_sent)
+
+
+class NetworkMetrics:
+    #nodes счетчики узлов (создаются при первом пакете узла)
+    #process_time гистограмма времени process_packet по всем узлам
+    #discovery_* гистограммы завершенных поисков: время до первого RREP,
+    #служебные пакеты (RREQ + RREP) и длина маршрута в переходах
+    #discoveries строки последних max_discoveries завершенных поисков
+    #route_errors ошибки маршрута (RERR), дошедшие до источников
+
+    DISCOVERY_FIELDS = ('session_id', 'source', 'destination', 'found', 'latency',
+                        'rreq', 'rrep', 'control_packets', 'hops', 'routes')
+
+    def __init__(self, max_discoveries: int = 10000):
+        self.max_discoveries = max_discoveries
+        self.discoveries: Deque[dict] = deque(maxlen=max_discoveries)
+        self.nodes: Dict[int, NodeMetrics] = {}
+        self.process_time = Histogram(PROCESS_BUCKETS)
+        self.discovery_latency = Histogram(LATENCY_BUCKETS)
+        self.discovery_control = Histogram(CONTROL_BUCKETS)
+        self.discovery_hops = Histogram(HOPS_BUCKETS)
+        self.discoveries_failed = 0
+        self.route_errors = 0
+
+    def node(self, node_id: int) -> NodeMetrics:
+        metrics = self.nodes.get(node_id)
+        if metrics is None:
+            metrics = self.nodes[node_id] = NodeMetrics()
+        return metrics
+
+    def packet_sent(self, node_id: int, packet_type: str):
+        out = self.node(node_id).packets_out
+        out[packet_type] = out.get(packet_type, 0) + 1
+
+    def packet_processed(self, node_id: int, packet_type: str, seconds: float, queue_depth: int = 0):
+        metrics = self.node(node_id)
+        received = metrics.packets_in
+        received[packet_type] = received.get(packet_type, 0) + 1
+        metrics.queue_depth = queue_depth
+        if queue_depth > metrics.queue_depth_max:
+            metrics.queue_depth_max = queue_depth
+        metrics.process_count += 1
+        metrics.process_time += seconds
+        if seconds > metrics.process_time_max:
+            metrics.process_time_max = seconds
+        self.process_time.observe(seconds)
+
+    def discovery_finished(self, row: dict):
+        #поиск завершен (маршрут найден или рассылка кончилась без ответа)
+        #row - строка с полями DISCOVERY_FIELDS
+        self.discoveries.append(row)
+        self.discovery_control.observe(row['control_packets'])
+        if row['latency'] is None:
+            self.discoveries_failed += 1
+            return
+        self.discovery_latency.observe(row['latency'])
+        self.discovery_hops.observe(row['hops'])
+
+    def reset(self):
+        self.__init__(self.max_discoveries)
+
+    def snapshot(self) -> dict:
+        #сводка по сети (суммы по узлам и гистограммы поисков)
+        packets_in: Dict[str, int] = {}
+        packets_out: Dict[str, int] = {}
+        for metrics in list(self.nodes.values()):
+            for kind, count in list(metrics.packets_in.items()):
+                packets_in[kind] = packets_in.get(kind, 0) + count
+            for kind, count in list(metrics.packets_out.items()):
+                packets_out[kind] = packets_out.get(kind, 0) + count
+        return {
+            'packets_in': packets_in,
+            'packets_out': packets_out,
+            'queue_depth_max': max((m.queue_depth_max for m in list(self.nodes.values())), default=0),
+            'process_time': self.process_time.as_dict(),
+            'discovery_latency': self.discovery_latency.as_dict(),
+            'discovery_control_packets': self.discovery_control.as_dict(),
+            'discovery_hops': self.discovery_hops.as_dict(),
+            'discoveries_failed': self.discoveries_failed,
+            'route_errors': self.route_errors,
+        }
+
+    def packet_types(self) -> List[str]:
+        kinds = set()
+        for metrics in list(self.nodes.values()):
+            kinds.update(metrics.packets_in)
+            kinds.update(metrics.packets_out)
+        return sorted(kinds)
+
+    def write_csv(self, stream):
+        #таблица по узлам: входящие и исходящие пакеты по типам, очередь, время обработки
+        kinds = self.packet_types()
+        writer = csv.writer(stream)
+        writer.writerow(
+            ['node'] + [f'in_{kind}' for kind in kinds] + [f'out_{kind}' for kind in kinds]
+            + ['queue_depth_max', 'process_count', 'process_time', 'process_time_max']
+        )
+        for node_id in sorted(self.nodes):
+            metrics = self.nodes[node_id]
+            writer.writerow(
+                [node_id]
+                + [metrics.packets_in.get(kind, 0) for kind in kinds]
+                + [metrics.packets_out.get(kind, 0) for kind in kinds]
+                + [metrics.queue_depth_max, metrics.process_count,
+                   f'{metrics.process_time:.9f}', f'{metrics.process_time_max:.9f}']
+            )
+
+    def write_discoveries_csv(self, stream):
+        #таблица завершенных поисков
+        writer = csv.DictWriter(stream, fieldnames=self.DISCOVERY_FIELDS)
+        writer.writeheader()
+        writer.writerows(list(self.discoveries))
+
+    def write_prometheus(self, stream, prefix: str = 'dsr'):
+        #текстовый формат экспозиции Prometheus
+        def header(name, kind, text):
+            stream.write(f"# HELP {prefix}_{name} {text}\n# TYPE {prefix}_{name} {kind}\n")
+
+        def histogram(name, text, hist: Histogram):
+            header(name, 'histogram', text)
+            total = 0
+            for bound, count in zip(hist.bounds, hist.counts):
+                total += count
+                stream.write(f'{prefix}_{name}_bucket{{le="{bound:g}"}} {total}\n')
+            stream.write(f'{prefix}_{name}_bucket{{le="+Inf"}} {hist.count}\n')
+            stream.write(f'{prefix}_{name}_sum {hist.sum:.9g}\n{prefix}_{name}_count {hist.count}\n')
+
+        nodes = sorted(self.nodes.items())
+        header('node_packets_in_total', 'counter', 'Packets processed by node')
+        for node_id, metrics in nodes:
+            for kind, count in sorted(metrics.packets_in.items()):
+                stream.write(f'{prefix}_node_packets_in_total{{node="{node_id}",type="{kind}"}} {count}\n')
+        header('node_packets_out_total', 'counter', 'Packets sent by node')
+        for node_id, metrics in nodes:
+            for kind, count in sorted(metrics.packets_out.items()):
+                stream.write(f'{prefix}_node_packets_out_total{{node="{node_id}",type="{kind}"}} {count}\n')
+        header('node_queue_depth', 'gauge', 'Node queue depth at last processed packet')
+        for node_id, metrics in nodes:
+            stream.write(f'{prefix}_node_queue_depth{{node="{node_id}"}} {metrics.queue_depth}\n')
+        header('node_process_seconds_total', 'counter', 'Time spent in process_packet')
+        for node_id, metrics in nodes:
+            stream.write(f'{prefix}_node_process_seconds_total{{node="{node_id}"}} {metrics.process_time:.9g}\n')
+        histogram('process_seconds', 'process_packet duration', self.process_time)
+        histogram('discovery_latency_seconds', 'Time to first RREP (network time)', self.discovery_latency)
+        histogram('discovery_control_packets', 'RREQ and RREP packets per discovery', self.discovery_control)
+        histogram('discovery_route_hops', 'Discovered route length in hops', self.discovery_hops)
+        header('discoveries_failed_total', 'counter', 'Discoveries finished without a route')
+        stream.write(f'{prefix}_discoveries_failed_total {self.discoveries_failed}\n')
+        header('route_errors_total', 'counter', 'Route errors received by sources')
+        stream.write(f'{prefix}_route_errors_total {self.route_errors}\n')
+
+    def export(self, path: str, fmt: str = 'prometheus'):
+        #fmt 'prometheus', 'csv' (по узлам) или 'discoveries' (по поискам)
+        #снимок в файл: запись во временный и переименование (читатель не видит половину файла)
+        write = self._writer(fmt)
+        tmp = path + '.tmp'
+        try:
+            with open(tmp, 'w', newline='', encoding='utf-8') as f:
+                write(f)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):  # недописанный снимок не оставляем
+                os.remove(tmp)
+            raise
+
+    def _writer(self, fmt: str):
+        writers = {
+            'prometheus': self.write_prometheus,
+            'csv': self.write_csv,
+            'discoveries': self.write_discoveries_csv,
+        }
+        if fmt not in writers:
+            raise ValueError(f"Неизвестный формат метрик: {fmt}")
+        return writers[fmt]
+
+
+class MetricsExporter(threading.Thread):
+    #периодическая выгрузка снимка метрик сети в файл (раз в interval секунд)
+
+    def __init__(self, metrics: NetworkMetrics, path: str, interval: float = 10.0,
+                 fmt: str = 'prometheus'):
+        super().__init__(daemon=True)
+        metrics._writer(fmt)  # неизвестный формат - ошибка сразу, а не в потоке
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.fmt = fmt
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            self.metrics.export(self.path, self.fmt)
+
+    def stop(self):
+        #останавливаем и пишем последний снимок
+        self._stopped.set()
+        self.metrics.export(self.path, self.fmt)
@@ -0,0 +1,308 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import sys
+import time
+import random
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .batch import choose_pairs
+from .simulation import HeadlessNetwork
+from .traffic import TrafficGenerator
+from .adjacency import Adjacency
+from ._lazy import lazy_import
+
+np = lazy_import('numpy')
+
+
+#Подвижность узлов: положения, модель случайных путевых точек, связи по радиусу
+#Связь есть, пока узлы ближе radio_range. Соседи ищутся по равномерной сетке с
+#ячейкой radio_range (только 3x3 ячейки вокруг узла), и пересчитываются только
+#для сдвинувшихся узлов, поэтому шаг стоит O(сдвинувшиеся * плотность), а не O(N^2).
+#Разорванные связи обрабатывает DSR: кэши узлов на концах, RERR к источникам данных.
+
+Link = Tuple[int, int]
+
+
+class SpatialGrid:
+    #узлы по ячейкам cell_size x cell_size
+
+    def __init__(self, cell_size: float):
+        if cell_size <= 0:
+            raise ValueError(f"Размер ячейки должен быть положительным: {cell_size}")
+        self.cell_size = cell_size
+        self.cells: Dict[Tuple[int, int], Set[int]] = {}
+        self._cell_of: Dict[int, Tuple[int, int]] = {}
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def move(self, node: int, x: float, y: float):
+        #добавляем узел или переносим его в ячейку новой точки
+        cell = self._cell(x, y)
+        old = self._cell_of.get(node)
+        if old == cell:
+            return
+        if old is not None:
+            members = self.cells[old]
+            members.discard(node)
+            if not members:
+                del self.cells[old]
+        self.cells.setdefault(cell, set()).add(node)
+        self._cell_of[node] = cell
+
+    def nearby(self, x: float, y: float) -> List[int]:
+        #узлы в ячейке точки и восьми соседних (кандидаты в соседи при радиусе <= cell_size)
+        cx, cy = self._cell(x, y)
+        result: List[int] = []
+        cells = self.cells
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                members = cells.get((cx + dx, cy + dy))
+                if members:
+                    result.extend(members)
+        return result
+
+
+class RandomWaypoint:
+    #модель случайных путевых точек в области width x height: узел идет к случайной
+    #точке со случайной скоростью из [min_speed, max_speed], стоит pause секунд и
+    #выбирает следующую (max_speed 0 - узлы неподвижны)
+    #positions массив (N, 2) текущих положений
+
+    def __init__(self, num_nodes: int, width: float, height: float, min_speed: float,
+                 max_speed: float, pause: float = 0.0, seed: Optional[int] = None):
+        if max_speed < min_speed or min_speed < 0:
+            raise ValueError(f"Неверный диапазон скоростей: {min_speed}..{max_speed}")
+        if min_speed == 0 and max_speed > 0:
+            # узел со скоростью 0 никогда не дойдет до точки
+            raise ValueError("Наименьшая скорость подвижных узлов должна быть положительной")
+        self.size = np.array([width, height], dtype=float)
+        self.min_speed = min_speed
+        self.max_speed = max_speed
+        self.pause = pause
+        self.rng = np.random.default_rng(seed)
+        self.positions = self.rng.random((num_nodes, 2)) * self.size
+        self.targets = self.rng.random((num_nodes, 2)) * self.size
+        self.speeds = self.rng.uniform(min_speed, max_speed, num_nodes)
+        self.pause_left = np.zeros(num_nodes)
+
+    def step(self, dt: float) -> np.ndarray:
+        #сдвигаем узлы на dt секунд, возвращаем индексы сдвинувшихся
+        if self.max_speed == 0:
+            return np.empty(0, dtype=np.int64)
+        waiting = self.pause_left > 0
+        self.pause_left[waiting] -= dt
+        moving = np.nonzero(~waiting)[0]
+        delta = self.targets[moving] - self.positions[moving]
+        dist = np.sqrt((delta ** 2).sum(axis=1))
+        travel = self.speeds[moving] * dt
+        arrived = dist <= travel
+        going = ~arrived
+        self.positions[moving[going]] += delta[going] * (travel[going] / dist[going])[:, None]
+
+        done = moving[arrived]
+        if len(done):
+            self.positions[done] = self.targets[done]
+            self.pause_left[done] = self.pause
+            self.targets[done] = self.rng.random((len(done), 2)) * self.size
+            self.speeds[done] = self.rng.uniform(self.min_speed, self.max_speed, len(done))
+        return moving
+
+
+class MobilityController:
+    #подвижность узлов HeadlessNetwork: раз в interval секунд сети модель сдвигает
+    #узлы, изменения связей передаются в network.update_links
+    #radio_range радиус связи, adjacency текущие соседи по положениям
+    #link_ups, link_breaks количество появившихся и разорванных связей, updates шагов
+
+    def __init__(self, network: HeadlessNetwork, model: RandomWaypoint, radio_range: float,
+                 interval: float = 1.0):
+        self.network = network
+        self.model = model
+        self.radio_range = radio_range
+        self.interval = interval
+        self.grid = SpatialGrid(radio_range)
+        self.adjacency: List[Set[int]] = [set() for _ in range(len(model.positions))]
+        self.link_ups = 0
+        self.link_breaks = 0
+        self.updates = 0
+        self._until: Optional[float] = None
+
+    def _within(self, node: int) -> Set[int]:
+        positions = self.model.positions
+        x, y = positions[node]
+        candidates = np.array(self.grid.nearby(x, y), dtype=np.int64)
+        delta = positions[candidates] - positions[node]
+        close = candidates[(delta ** 2).sum(axis=1) <= self.radio_range ** 2]
+        result = set(close.tolist())
+        result.discard(node)
+        return result
+
+    def build_adjacency(self) -> Adjacency:
+        #смежность по текущим положениям (все узлы)
+        positions = self.model.positions
+        for node in range(len(positions)):
+            self.grid.move(node, *positions[node])
+        edges: List[Link] = []
+        for node in range(len(positions)):
+            self.adjacency[node] = self._within(node)
+            edges.extend((node, other) for other in sorted(self.adjacency[node]) if other > node)
+        return Adjacency.from_edges(len(positions), edges)
+
+    def attach(self) -> Adjacency:
+        #сеть по начальным положениям (заменяет текущую топологию сети)
+        adjacency = self.build_adjacency()
+        # положения - массив модели (сеть видит текущие, в том числе при save_topology)
+        self.network.set_topology(adjacency, self.model.positions, {'radio_range': self.radio_range})
+        return adjacency
+
+    def update_neighbors(self, moved: Iterable[int]) -> Tuple[List[Link], List[Link]]:
+        #пересчет соседей сдвинувшихся узлов, возвращаем (появившиеся, разорванные) связи
+        positions = self.model.positions
+        moved = list(moved)
+        for node in moved:
+            self.grid.move(node, *positions[node])
+        added: Set[Link] = set()
+        removed: Set[Link] = set()
+        for node in moved:
+            new = self._within(node)
+            old = self.adjacency[node]
+            for other in new - old:
+                added.add((node, other) if node < other else (other, node))
+            for other in old - new:
+                removed.add((node, other) if node < other else (other, node))
+        for u, v in removed:
+            self.adjacency[u].discard(v)
+            self.adjacency[v].discard(u)
+        for u, v in added:
+            self.adjacency[u].add(v)
+            self.adjacency[v].add(u)
+        return sorted(added), sorted(removed)
+
+    def step(self):
+        #один шаг подвижности: модель, соседи, связи сети
+        moved = self.model.step(self.interval)
+        added, removed = self.update_neighbors(moved.tolist())
+        self.updates += 1
+        self.link_ups += len(added)
+        self.link_breaks += len(removed)
+        if added or removed:
+            self.network.update_links(added, removed)
+
+    def start(self, duration: float):
+        #шаги подвижности на планировщике сети в течение duration секунд сети
+        self._until = self.network.scheduler.now + duration
+        self.network.scheduler.schedule(self.interval, self._tick)
+
+    def _tick(self):
+        self.step()
+        if self.network.scheduler.now + self.interval <= self._until:
+            self.network.scheduler.schedule(self.interval, self._tick)
+
+
+FIELDS = [
+    'speed', 'nodes', 'links', 'link_breaks', 'link_ups', 'rerr', 'route_errors', 'rediscoveries',
+    'rreq', 'rrep', 'sent', 'delivered', 'dropped', 'no_route', 'delivery_ratio',
+    'control_per_delivered', 'latency_p50', 'latency_p99', 'wall_s',
+]
+
+
+def run_mobility(num_nodes: int, seed: int, speed: float, area: float = 1000.0,
+                 radio_range: float = 250.0, pause: float = 0.0, num_flows: int = 10,
+                 rate: float = 10.0, payload: int = 512, duration: float = 60.0,
+                 interval: float = 1.0, delay: float = 0.01) -> Dict:
+    #один прогон: потоки данных при подвижности со скоростью до speed (единиц области в секунду)
+    #стоимость поддержки маршрутов - RERR, повторные поиски и служебные пакеты на доставленный
+    network = HeadlessNetwork(delay=delay)
+    model = RandomWaypoint(num_nodes, area, area, min(1.0, speed), speed, pause, seed)
+    controller = MobilityController(network, model, radio_range, interval)
+    links = controller.attach().num_edges
+    generator = TrafficGenerator(network, seed)
+    for source, destination in choose_pairs(num_nodes, num_flows, random.Random(seed)):
+        generator.add_flow(source, destination, rate, 'cbr', payload, duration=duration)
+
+    started = time.perf_counter()
+    controller.start(duration)
+    generator.run()
+    wall = time.perf_counter() - started
+
+    summary = generator.report()['summary']
+    counts = network.packet_counts
+    control = counts.get('RREQ', 0) + counts.get('RREP', 0) + counts.get('RERR', 0)
+    return {
+        'speed': speed,
+        'nodes': num_nodes,
+        'links': links,
+        'link_breaks': controller.link_breaks,
+        'link_ups': controller.link_ups,
+        'rerr': counts.get('RERR', 0),
+        'route_errors': network.metrics.route_errors if network.metrics is not None else None,
+        'rediscoveries': summary['rediscoveries'],
+        'rreq': counts.get('RREQ', 0),
+        'rrep': counts.get('RREP', 0),
+        'sent': summary['sent'],
+        'delivered': summary['delivered'],
+        'dropped': summary['dropped'],
+        'no_route': summary['no_route'],
+        'delivery_ratio': summary['delivery_ratio'],
+        'control_per_delivered': control / summary['delivered'] if summary['delivered'] else None,
+        'latency_p50': summary['latency']['p50'],
+        'latency_p99': summary['latency']['p99'],
+        'wall_s': wall,
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Стоимость поддержки маршрутов DSR при подвижности узлов (случайные путевые точки)"
+    )
+    parser.add_argument('--nodes', type=int, default=100, help="количество узлов")
+    parser.add_argument('--seed', type=int, default=0, help="seed положений, движения и пар")
+    parser.add_argument('--speeds', type=float, nargs='+', default=[0.0, 5.0, 10.0, 20.0],
+                        help="наибольшие скорости узлов (единиц области в вирт. секунду)")
+    parser.add_argument('--area', type=float, default=1000.0, help="сторона квадратной области")
+    parser.add_argument('--range', type=float, default=250.0, dest='radio_range', help="радиус связи")
+    parser.add_argument('--pause', type=float, default=0.0, help="остановка в путевой точке (вирт. с)")
+    parser.add_argument('--flows', type=int, default=10, help="количество потоков CBR")
+    parser.add_argument('--rate', type=float, default=10.0, help="пакетов в вирт. секунду на поток")
+    parser.add_argument('--payload', type=int, default=512, help="размер данных пакета (байты)")
+    parser.add_argument('--duration', type=float, default=60.0, help="длительность (вирт. с)")
+    parser.add_argument('--interval', type=float, default=1.0, help="шаг подвижности (вирт. с)")
+    parser.add_argument('--delay', type=float, default=0.01, help="задержка одного перехода (вирт. с)")
+    parser.add_argument('--output', '-o', help="файл CSV (по умолчанию stdout)")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.nodes < 2:
+        print("Ошибка: количество узлов должно быть не меньше 2", file=sys.stderr)
+        return 2
+
+    rows = []
+    try:
+        for speed in args.speeds:
+            rows.append(run_mobility(args.nodes, args.seed, speed, args.area, args.radio_range, args.pause,
+                                     args.flows, args.rate, args.payload, args.duration, args.interval,
+                                     args.delay))
+            print(f"скорость {speed:g}: разрывов {rows[-1]['link_breaks']}, RERR {rows[-1]['rerr']}, "
+                  f"доставлено {rows[-1]['delivered']}/{rows[-1]['sent']}", file=sys.stderr)
+    except ValueError as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 2
+
+    stream = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+    try:
+        writer = csv.DictWriter(stream, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    finally:
+        if args.output:
+            stream.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,491 @@
+from __future__ import annotations
+
+import time
+import threading
+import itertools
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from ._lazy import lazy_import
+from .dsr_protocol import Node, DSRPacket, DataPacket, Route
+from .network_topology import NetworkTopologyGenerator
+from .adjacency import Adjacency
+from .node_runtime import create_runtime
+from .event_log import EventLog, CallbackSink, FileLogSink, DEBUG, INFO, ERROR
+from .sim_trace import TraceWriter
+from .link_model import LinkModel, LinkParams
+from .metrics import NetworkMetrics, MetricsExporter, FlowStats
+
+nx = lazy_import('networkx')
+
+
+class DiscoverySession:
+    #Сеанс поиска маршрута source -> destination, сеансы независимы и могут идти одновременно
+    #session_id номер сеанса в сети
+    #request_id идентификатор RREQ источника (по нему RREP находит сеанс)
+    #routes все полученные маршруты (первый - самый быстрый, дальше ответы из кэшей и дублей)
+    #start_time, found_time время сети запуска и получения первого маршрута
+    #rreq, rrep число служебных пакетов этого поиска
+    #future concurrent.futures.Future, результат - первый маршрут (None - не найден)
+    
+    def __init__(self, session_id: int, source: int, destination: int,
+                 request_id: int, start_time: float):
+        self.session_id = session_id
+        self.source = source
+        self.destination = destination
+        self.request_id = request_id
+        self.start_time = start_time
+        self.found_time: Optional[float] = None
+        self.routes: List[Route] = []
+        self.future: Future = Future()
+        self.rreq = 0
+        self.rrep = 0
+        
+    @property
+    def route(self) -> Optional[Route]:
+        return self.routes[0] if self.routes else None
+        
+    @property
+    def latency(self) -> Optional[float]:
+        #время до первого маршрута (секунды сети)
+        return self.found_time - self.start_time if self.found_time is not None else None
+        
+    @property
+    def control_packets(self) -> int:
+        return self.rreq + self.rrep
+        
+    def as_dict(self) -> dict:
+        route = self.route
+        return {
+            'session_id': self.session_id,
+            'source': self.source,
+            'destination': self.destination,
+            'found': route is not None,
+            'latency': self.latency,
+            'rreq': self.rreq,
+            'rrep': self.rrep,
+            'control_packets': self.control_packets,
+            'hops': len(route) - 1 if route else None,
+            'routes': len(self.routes),
+        }
+        
+    def done(self) -> bool:
+        return self.future.done()
+        
+    def result(self, timeout: Optional[float] = None) -> Optional[Route]:
+        #ждем первый маршрут (TimeoutError, если не пришел за timeout секунд)
+        return self.future.result(timeout)
+        
+    def add_done_callback(self, callback: Callable[["DiscoverySession"], None]):
+        self.future.add_done_callback(lambda _: callback(self))
+        
+    def _add_route(self, route: Route, now: float) -> bool:
+        #True для первого маршрута сеанса
+        self.routes.append(route)
+        if len(self.routes) > 1:
+            return False
+        self.found_time = now
+        self.future.set_result(route)
+        return True
+        
+    def _expire(self):
+        #маршрут не найден (рассылка завершилась без ответа)
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class Network:
+    #Класс сети, управляющий всеми узлами
+    #gui экземпляр класса DSRSimulatorGUI (или None для работы без интерфейса)
+    #nodes словарь узлов
+    #adjacency смежность узлов (массивы CSR, см. adjacency.Adjacency)
+    #graph граф networkx для GUI и анализа (строится из adjacency при обращении)
+    #lock блокировка для синхронизации доступа к графу
+    #delay задержка между шагами (секунды)
+    #paused флаг паузы
+    #found_route маршрут последнего запущенного сеанса поиска
+    #sessions сеансы поиска маршрута по номеру (с момента создания топологии)
+    #runtime среда выполнения узлов: 'threads' (поток на узел) или 'asyncio'
+    #route_cache_ttl время жизни маршрута в кэше узла (секунды, None - бессрочно)
+    #route_cache_size максимальное число маршрутов в кэше узла (None - без ограничения)
+    #rreq_window окно подавления повторных RREQ узлов (растет по числу открытых поисков одного источника)
+    #event_log журнал событий с уровнями (приемники: GUI, файл)
+    #trace запись трассы для проигрывания (None - не пишется)
+    #link_model модель каналов (задержка, разброс, потери, пропускная способность ребер)
+    #metrics счетчики узлов и поисков (None - не собираются)
+    #flows итоги потоков данных по номеру потока (заполняет traffic.TrafficGenerator)
+    #positions положения узлов (N, 2) или None, topology_meta метаданные топологии (seed, способ построения)
+    #node_class класс узлов сети (узел строится как node_class(node_id, network))
+    
+    node_class = Node
+    
+    def __init__(self, gui=None, runtime: str = 'threads'):
+        self.gui = gui
+        self.runtime = create_runtime(runtime, self)
+        self.nodes: Dict[int, Node] = {}
+        self.adjacency: Optional[Adjacency] = None
+        self._graph: Optional[nx.Graph] = None
+        self.positions = None
+        self.topology_meta: dict = {}
+        self.lock = threading.Lock()
+        self.delay = 0.5  # Задержка между шагами (секунды)
+        self.paused = False
+        self.sessions: Dict[int, DiscoverySession] = {}
+        self._sessions_by_request: Dict[Tuple[int, int], DiscoverySession] = {}
+        self._session_ids = itertools.count(1)
+        self._last_session: Optional[DiscoverySession] = None
+        self._session_lock = threading.Lock()
+        self.route_cache_ttl: Optional[float] = 300.0
+        self.route_cache_size: Optional[int] = 64
+        self.rreq_window = 64
+        self._open_requests: Dict[int, int] = {}  # источник -> открытые сеансы поиска
+        self.event_log = EventLog(clock=self.now)
+        if gui:
+            self.event_log.add_sink(CallbackSink(gui.add_log))
+        self._log_file: Optional[FileLogSink] = None
+        self.trace: Optional[TraceWriter] = None
+        self.link_model = LinkModel()
+        self.metrics: Optional[NetworkMetrics] = NetworkMetrics()
+        self._metrics_exporter: Optional[MetricsExporter] = None
+        self.flows: Dict[int, FlowStats] = {}
+        self._route_error_callbacks: List[Callable[[int, Tuple[int, int]], None]] = []
+        
+    @property
+    def graph(self) -> nx.Graph:
+        #граф топологии (networkx загружается только когда граф нужен)
+        #для чтения: связи меняются через set_topology и update_links
+        if self._graph is None:
+            self._graph = self.adjacency.to_networkx() if self.adjacency is not None else nx.Graph()
+        return self._graph
+        
+    @graph.setter
+    def graph(self, graph: nx.Graph):
+        self.adjacency = Adjacency.from_graph(graph)
+        self._graph = graph
+        
+    def now(self) -> float:
+        #текущее время сети (для TTL кэшей)
+        return time.monotonic()
+        
+    def configure_route_cache(self, ttl: Optional[float], max_size: Optional[int]):
+        #меняем параметры кэша маршрутов у текущих и будущих узлов
+        self.route_cache_ttl = ttl
+        self.route_cache_size = max_size
+        for node in self.nodes.values():
+            node.route_cache.ttl = ttl
+            node.route_cache.max_size = max_size
+        
+    def create_topology(self, num_nodes: int, seed: Optional[int] = None,
+                        method: str = 'incremental', num_edges: Optional[int] = None) -> bool:
+        #method и num_edges - см. NetworkTopologyGenerator.create_topology
+        #генератор сразу дает массивы смежности, граф networkx - только по запросу
+        adjacency = NetworkTopologyGenerator.create_adjacency(num_nodes, seed, method, num_edges)
+        return self.set_topology(adjacency, metadata={'seed': seed, 'method': method, 'num_edges': num_edges})
+        
+    def save_topology(self, path: str, fmt: Optional[str] = None):
+        #текущая топология с положениями и метаданными в файл (см. topology_file)
+        if self.adjacency is None:
+            raise ValueError("Топология не создана")
+        NetworkTopologyGenerator.save(path, self.adjacency, self.positions, self.topology_meta, fmt)
+        
+    def load_topology(self, path: str, mmap: bool = True) -> dict:
+        #сеть по сохраненной топологии (binary - через отображение в память), результат - метаданные
+        stored = NetworkTopologyGenerator.load(path, mmap)
+        self.set_topology(stored.adjacency, stored.positions, stored.metadata)
+        return stored.metadata
+        
+    def set_topology(self, topology: Union[Adjacency, nx.Graph], positions=None,
+                     metadata: Optional[dict] = None) -> bool:
+        #сеть по готовой смежности или графу (узлы 0..N-1), например построенным по положениям узлов
+        #positions положения узлов (GUI рисует по ним), metadata - для save_topology
+        self.nodes.clear()
+        self.clear_sessions()
+        if self.metrics is not None:
+            self.metrics.reset()
+        self.flows.clear()
+        if isinstance(topology, Adjacency):
+            self.adjacency = topology
+            self._graph = None
+        else:
+            self.graph = topology
+        self.positions = positions
+        self.topology_meta = dict(metadata or {})
+        
+        # Создаем узлы (соседей узел берет из adjacency)
+        for i in range(self.adjacency.num_nodes):
+            node = self.node_class(i, self)
+            self.nodes[i] = node
+            
+        if self.trace is not None:
+            self.trace.topology(self.now(), self.adjacency)
+            
+        # Логируем информацию о топологии
+        # (метрики ленивые: без читателей журнала ничего не вычисляется)
+        if self.event_log.enabled(INFO):
+            info = NetworkTopologyGenerator.get_graph_info(self.graph)
+            self.log("Создана топология с %d узлами и %d связями", info['nodes'], info['edges'])
+            connectivity = info.peek('edge_connectivity')
+            if connectivity is not None:
+                self.log("Реберная связность: %s", connectivity)
+            else:
+                # max-flow на большом графе - в фоне, результат придет в журнал позже
+                self.log("Реберная связность: вычисляется...")
+                info.compute_in_background(
+                    callback=lambda done: self.log("Реберная связность: %s", done['edge_connectivity'])
+                )
+            self.log("Мосты в графе: %s", 'Есть' if info['has_bridges'] else 'Отсутствуют')
+        
+        return True
+        
+    def update_links(self, added: Iterable[Tuple[int, int]], removed: Iterable[Tuple[int, int]]):
+        #изменение связей (подвижность узлов): новая смежность, узлы на концах
+        #разорванной связи сразу убирают из своих кэшей маршруты через нее,
+        #остальные узнают о разрыве из RERR при попытке переслать по ней данные
+        added = list(added)
+        removed = list(removed)
+        self.adjacency = self.adjacency.with_changes(added, removed)
+        if self.trace is not None:
+            self.trace.links(self.now(), added, removed)
+        for u, v in removed:
+            self.nodes[u].link_broken(v)
+            self.nodes[v].link_broken(u)
+        if self._graph is not None:  # уже построенный граф (GUI) меняем на месте
+            self._graph.remove_edges_from(removed)
+            self._graph.add_edges_from(added)
+            NetworkTopologyGenerator.get_graph_info(self._graph).invalidate()
+        
+    def start_nodes(self):
+        #запускаем все узлы, которые не запущены
+        self.runtime.start(self.nodes)
+            
+    def stop_nodes(self):
+        #останавливаем все узлы
+        self.runtime.stop()
+            
+    def send_packet(self, from_node: int, to_node: int, packet: DSRPacket):
+        #отправляем пакет от одного узла к другому
+        #(не ждем: время доставки или потерю определяет модель каналов)
+        delay = None
+        if not self.paused and to_node in self.nodes:
+            delay = self.link_model.transmit(self.now(), from_node, to_node, packet, self.delay)
+        self._on_send(from_node, to_node, packet, delay is None)
+        if delay is not None:
+            self.runtime.deliver(to_node, packet, delay)
+            
+    def _on_send(self, from_node: int, to_node: int, packet: DSRPacket, dropped: bool = False):
+        #учет отправки: трасса, счетчики узла и служебные пакеты сеанса
+        #dropped - пакет не будет доставлен (пауза или потеря в модели каналов)
+        if self.trace is not None:
+            self.trace.send(self.now(), from_node, to_node, packet, dropped)
+        if self.metrics is not None:
+            self.metrics.packet_sent(from_node, packet.type)
+        if packet.type == 'RREQ':
+            session = self._sessions_by_request.get((packet.source, packet.packet_id))
+            if session is not None:
+                session.rreq += 1
+        elif packet.type == 'RREP':
+            session = self._sessions_by_request.get((packet.destination, packet.packet_id))
+            if session is not None:
+                session.rrep += 1
+            
+    def initiate_communication(self, source: int, destination: int) -> Optional[DiscoverySession]:
+        #запускаем новый сеанс поиска маршрута, возвращаем его (None при неверных узлах)
+        #сеансы не мешают друг другу, результат - session.result() или session.future
+        if source not in self.nodes or destination not in self.nodes:
+            self.log("Ошибка: неверные узлы источника или назначения", level=ERROR)
+            return None
+            
+        if source == destination:
+            self.log("Ошибка: источник и назначение совпадают", level=ERROR)
+            return None
+            
+        node = self.nodes[source]
+        request_id = node.next_request_id()
+        with self._session_lock:
+            session = DiscoverySession(next(self._session_ids), source, destination, request_id, self.now())
+            self.sessions[session.session_id] = session
+            self._sessions_by_request[(source, request_id)] = session
+            self._last_session = session
+            # рассылки всех открытых сеансов источника могут идти одновременно:
+            # их RREQ должны помещаться в окно подавления повторов
+            open_requests = self._open_requests.get(source, 0) + 1
+            self._open_requests[source] = open_requests
+            if open_requests > self.rreq_window:
+                window = self.rreq_window
+                while window < open_requests:
+                    window *= 2
+                self.set_rreq_window(window)
+        
+        # Запускаем поиск маршрута
+        node.initiate_route_discovery(destination, request_id)
+        return session
+        
+    @property
+    def found_route(self) -> Optional[Route]:
+        session = self._last_session
+        return session.route if session is not None else None
+        
+    def pending_sessions(self) -> List[DiscoverySession]:
+        with self._session_lock:
+            return [session for session in self.sessions.values() if not session.done()]
+            
+    def close_sessions(self):
+        #завершаем все сеансы (рассылки закончились): без ответа - результат None,
+        #итоги попадают в metrics, сеансы больше не отслеживаются
+        with self._session_lock:
+            sessions = list(self.sessions.values())
+            self.sessions.clear()
+            self._sessions_by_request.clear()
+            self._open_requests.clear()
+        for session in sessions:
+            session._expire()
+            if self.metrics is not None:
+                self.metrics.discovery_finished(session.as_dict())
+                
+    def close_session(self, session: DiscoverySession):
+        #завершаем один сеанс (например, по тайм-ауту поиска): без ответа - результат None,
+        #итоги попадают в metrics, поздние RREP этого поиска сеанс больше не находят
+        with self._session_lock:
+            if self.sessions.pop(session.session_id, None) is None:
+                return
+            self._sessions_by_request.pop((session.source, session.request_id), None)
+            open_requests = self._open_requests.get(session.source, 0) - 1
+            if open_requests > 0:
+                self._open_requests[session.source] = open_requests
+            else:
+                self._open_requests.pop(session.source, None)
+        session._expire()
+        if self.metrics is not None:
+            self.metrics.discovery_finished(session.as_dict())
+            
+    def set_rreq_window(self, window: int):
+        #окно подавления повторных RREQ у текущих и будущих узлов (только увеличение)
+        self.rreq_window = window
+        for node in self.nodes.values():
+            node.processed_rreq.window = window
+            
+    def clear_sessions(self):
+        self.close_sessions()
+        self._last_session = None
+        
+    def discovery_metrics(self) -> List[dict]:
+        #поиски: завершенные (metrics.discoveries) и текущие
+        with self._session_lock:
+            current = [session.as_dict() for session in self.sessions.values()]
+        finished = list(self.metrics.discoveries) if self.metrics is not None else []
+        return finished + current
+        
+    def node_metrics(self, node_id: int) -> dict:
+        if self.metrics is None or node_id not in self.metrics.nodes:
+            return {}
+        return self.metrics.nodes[node_id].as_dict()
+        
+    def metrics_snapshot(self) -> dict:
+        return self.metrics.snapshot() if self.metrics is not None else {}
+        
+    def export_metrics(self, path: str, fmt: str = 'prometheus'):
+        #снимок метрик в файл (см. NetworkMetrics.export)
+        if self.metrics is not None:
+            self.metrics.export(path, fmt)
+            
+    def start_metrics_export(self, path: str, interval: float = 10.0, fmt: str = 'prometheus'):
+        #периодическая выгрузка снимка метрик (раз в interval секунд реального времени)
+        self.stop_metrics_export()
+        if self.metrics is not None:
+            self._metrics_exporter = MetricsExporter(self.metrics, path, interval, fmt)
+            self._metrics_exporter.start()
+            
+    def stop_metrics_export(self):
+        if self._metrics_exporter is not None:
+            self._metrics_exporter.stop()
+            self._metrics_exporter = None
+        
+    def data_delivered(self, packet: DataPacket):
+        #пакет данных дошел до назначения
+        stats = self.flows.get(packet.flow_id)
+        if stats is not None:
+            now = self.now()
+            stats.packet_delivered(now, now - packet.sent_at, packet.payload)
+            
+    def data_dropped(self, packet: DataPacket, node_id: int):
+        #узел node_id не может переслать пакет данных: следующего перехода нет среди соседей
+        stats = self.flows.get(packet.flow_id)
+        if stats is not None:
+            stats.dropped += 1
+        self.log("Узел %s: нет связи с %s, пакет данных %s потока %s отброшен",
+                 node_id, packet.route[packet.hop + 1], packet.packet_id, packet.flow_id, level=DEBUG)
+        
+    def route_error(self, node_id: int, link: Tuple[int, int]):
+        #источник node_id узнал о разрыве связи link на своем маршруте (RERR
+        #или не смог отправить сам), подписчики (потоки данных) ищут маршрут заново
+        if self.metrics is not None:
+            self.metrics.route_errors += 1
+        self.log("Узел %s: маршрут через %s-%s недействителен", node_id, link[0], link[1])
+        for callback in list(self._route_error_callbacks):
+            callback(node_id, link)
+            
+    def add_route_error_callback(self, callback: Callable[[int, Tuple[int, int]], None]):
+        #callback(node_id, link) при каждой ошибке маршрута у источника
+        self._route_error_callbacks.append(callback)
+        
+    def log(self, message: str, *args, level: int = INFO):
+        #добавляем сообщение в лог (message - шаблон %, форматируется только если есть читатели)
+        self.event_log.log(level, message, *args)
+        
+    def open_log_file(self, path: str, level: int = DEBUG):
+        #структурированный журнал в файл (JSON-строки), заменяет ранее открытый
+        self.close_log_file()
+        self._log_file = self.event_log.add_sink(FileLogSink(path, level))
+        
+    def close_log_file(self):
+        if self._log_file is not None:
+            self.event_log.remove_sink(self._log_file)
+            self._log_file = None
+        
+    def visualize_step(self, packet: DSRPacket, current_node: int):
+        #визуализируем текущий шаг протокола
+        if self.trace is not None:
+            self.trace.visualize(self.now(), packet, current_node, self.paused)
+        if self.paused:
+            return
+        if self.gui:
+            self.gui.update_visualization(packet, current_node)
+        
+    def route_found(self, route: Route, request_id: Optional[int] = None):
+        #вызывается когда маршрут найден (route начинается с источника)
+        #request_id идентификатор RREQ, по нему маршрут относится к своему сеансу;
+        #ответов может быть несколько, сеанс завершает первый - самый быстрый
+        if self.trace is not None:
+            self.trace.route_found(self.now(), route)
+        with self._session_lock:
+            session = self._sessions_by_request.get((route[0], request_id))
+        if session is None or not session._add_route(route, self.now()):
+            return
+        if self.gui:
+            self.gui.show_found_route(route)
+            
+    def start_trace(self, path: str):
+        #начинаем запись трассы (дописывается в конец файла), текущая топология пишется сразу
+        self.stop_trace()
+        self.trace = TraceWriter(path)
+        if self.adjacency is not None and self.adjacency.num_nodes > 0:
+            self.trace.topology(self.now(), self.adjacency)
+            
+    def stop_trace(self):
+        if self.trace is not None:
+            self.trace.close()
+            self.trace = None
+            
+    def configure_links(self, latency: Optional[float] = None, jitter: float = 0.0,
+                        loss: float = 0.0, bandwidth: Optional[float] = None,
+                        seed: Optional[int] = None):
+        #параметры всех каналов по умолчанию (latency None - задержка сети delay)
+        #отдельные ребра: link_model.set_link(u, v, LinkParams(...))
+        self.link_model.default = LinkParams(latency, jitter, loss, bandwidth)
+        if seed is not None:
+            self.link_model.rng.seed(seed)
+            
+    def set_delay(self, delay: float):
+        #устанавливаем задержку между шагами
+        self.delay = max(0, delay)
+
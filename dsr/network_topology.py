@@ -0,0 +1,385 @@
+from __future__ import annotations
+
+import random
+import threading
+import weakref
+from collections.abc import Mapping
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from ._lazy import lazy_import
+from .adjacency import Adjacency
+from .topology_file import StoredTopology, save_topology, load_topology
+
+nx = lazy_import('networkx')
+np = lazy_import('numpy')
+
+
+class BridgeTracker:
+    #Инкрементальный учет компонент реберной двусвязности
+    #Граф = остовное дерево + добавленные ребра. Ребро (u, v) вне дерева
+    #сливает все компоненты на пути u..v в дереве (система непересекающихся
+    #множеств, представитель компоненты - ее самая верхняя вершина).
+    #bridges количество мостов (компонент - 1, дерево связно)
+
+    def __init__(self, num_nodes: int):
+        self.parent = list(range(num_nodes))  # родитель в остовном дереве
+        self.depth = [0] * num_nodes
+        self._comp = list(range(num_nodes))  # union-find по компонентам
+        self.bridges = 0
+
+    def add_tree_edge(self, parent: int, child: int):
+        #ребро дерева: child присоединяется к уже построенной части
+        self.parent[child] = parent
+        self.depth[child] = self.depth[parent] + 1
+        self.bridges += 1
+
+    def find(self, node: int) -> int:
+        comp = self._comp
+        root = node
+        while comp[root] != root:
+            root = comp[root]
+        while comp[node] != root:  # сжатие путей
+            comp[node], node = root, comp[node]
+        return root
+
+    def add_edge(self, u: int, v: int) -> bool:
+        #добавляем ребро вне дерева, True если оно убрало хотя бы один мост
+        a = self.find(u)
+        b = self.find(v)
+        if a == b:
+            return False
+        depth = self.depth
+        while a != b:
+            if depth[a] < depth[b]:
+                a, b = b, a
+            # поднимаем более глубокую компоненту к компоненте родителя
+            top = self.find(self.parent[a])
+            self._comp[a] = top
+            self.bridges -= 1
+            a = top
+        return True
+
+
+class TopologyInfo(Mapping):
+    #Метрики графа: вычисляются при первом обращении и кэшируются, пока граф
+    #не изменился (версия - число узлов, ребер и вызовов invalidate). То, что
+    #гарантирует генератор (связность, отсутствие мостов), записывается сразу
+    #и не пересчитывается.
+    #Реберная связность графа без мостов с минимальной степенью <= 2 равна этой
+    #степени, max-flow (nx.edge_connectivity) нужен только в остальных случаях.
+    
+    KEYS = ('nodes', 'edges', 'is_connected', 'avg_degree', 'has_bridges', 'edge_connectivity')
+    _cache: "weakref.WeakKeyDictionary[nx.Graph, TopologyInfo]" = weakref.WeakKeyDictionary()
+    
+    def __init__(self, graph: nx.Graph):
+        self.graph = graph
+        self._lock = threading.Lock()
+        self._version: Optional[Tuple[int, int, int]] = None
+        self._changes = 0  # явные изменения графа без смены числа узлов и ребер
+        self._values: dict = {}
+        self._guaranteed: dict = {}
+        
+    @classmethod
+    def for_graph(cls, graph: nx.Graph) -> "TopologyInfo":
+        #общий экземпляр метрик для графа
+        info = cls._cache.get(graph)
+        if info is None:
+            info = cls._cache[graph] = cls(graph)
+        return info
+        
+    def _current(self) -> dict:
+        #значения для текущей версии графа (после изменения графа кэш сбрасывается)
+        version = (self.graph.number_of_nodes(), self.graph.number_of_edges(), self._changes)
+        with self._lock:
+            if version != self._version:
+                self._version = version
+                self._values = dict(self._guaranteed.get(version, {}))
+            return self._values
+            
+    def assume(self, **values):
+        #значения, гарантированные построением графа (для его текущей версии)
+        version = (self.graph.number_of_nodes(), self.graph.number_of_edges(), self._changes)
+        with self._lock:
+            self._guaranteed = {version: values}
+            self._version = None
+            
+    def invalidate(self):
+        #граф изменился (например, связи заменены при подвижности узлов): пересчитать все
+        with self._lock:
+            self._changes += 1
+            
+    def is_known(self, key: str) -> bool:
+        return key in self._current()
+        
+    def __getitem__(self, key: str):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        values = self._current()
+        if key not in values:
+            value = getattr(self, '_compute_' + key)()
+            with self._lock:
+                values[key] = value
+        return values[key]
+        
+    def __iter__(self):
+        return iter(self.KEYS)
+        
+    def __len__(self) -> int:
+        return len(self.KEYS)
+        
+    def compute_in_background(self, keys: Iterable[str] = ('edge_connectivity',),
+                              callback: Optional[Callable[["TopologyInfo"], None]] = None) -> threading.Thread:
+        #дорогие метрики в отдельном потоке, callback(info) по готовности
+        keys = tuple(keys)
+        
+        def work():
+            for key in keys:
+                self[key]
+            if callback:
+                callback(self)
+                
+        thread = threading.Thread(target=work, daemon=True)
+        thread.start()
+        return thread
+        
+    def _compute_nodes(self) -> int:
+        return self.graph.number_of_nodes()
+        
+    def _compute_edges(self) -> int:
+        return self.graph.number_of_edges()
+        
+    def _compute_is_connected(self) -> bool:
+        return self['nodes'] > 0 and nx.is_connected(self.graph)
+        
+    def _compute_avg_degree(self) -> float:
+        return 2 * self['edges'] / self['nodes'] if self['nodes'] > 0 else 0
+        
+    def _compute_has_bridges(self) -> bool:
+        return nx.has_bridges(self.graph) if self['nodes'] > 2 else False
+        
+    def peek(self, key: str):
+        #значение, если оно известно или дешево вычисляется, иначе None (без max-flow)
+        if key == 'edge_connectivity' and not self.is_known(key):
+            return self._edge_connectivity_bound()
+        return self[key]
+        
+    def _edge_connectivity_bound(self) -> Optional[int]:
+        if self['nodes'] <= 1 or not self['is_connected']:
+            return 0
+        if self['has_bridges']:
+            return 1
+        min_degree = min(degree for _, degree in self.graph.degree())
+        if min_degree <= 2:  # без мостов связность не меньше 2 и не больше минимальной степени
+            return min_degree
+        return None
+        
+    def _compute_edge_connectivity(self) -> int:
+        bound = self._edge_connectivity_bound()
+        if bound is not None:
+            return bound
+        try:
+            return nx.edge_connectivity(self.graph)
+        except:
+            return 0
+
+
+class NetworkTopologyGenerator:
+    #Генератор топологии сети
+    #METHODS способы построения: 'incremental' (дерево + ребра, пока есть мосты)
+    #и 'constructive' (ушное разложение, граф без мостов по построению)
+    
+    METHODS = ('incremental', 'constructive')
+    
+    @staticmethod
+    def create_topology(num_nodes: int, seed: Optional[int] = None, method: str = 'incremental',
+                        num_edges: Optional[int] = None) -> nx.Graph:
+        #num_edges точное число ребер (только для 'constructive')
+        if method == 'incremental':
+            return NetworkTopologyGenerator.create_incremental(num_nodes, seed)
+        if method == 'constructive':
+            return NetworkTopologyGenerator.create_constructive(num_nodes, seed, num_edges)
+        raise ValueError(f"Неизвестный способ построения топологии: {method}")
+        
+    @staticmethod
+    def create_adjacency(num_nodes: int, seed: Optional[int] = None, method: str = 'incremental',
+                         num_edges: Optional[int] = None) -> Adjacency:
+        #та же топология, что у create_topology, сразу в массивах CSR (без networkx)
+        if method == 'incremental':
+            edges = NetworkTopologyGenerator.incremental_edges(num_nodes, seed)
+        elif method == 'constructive':
+            edges = NetworkTopologyGenerator.constructive_edges(num_nodes, seed, num_edges)
+        else:
+            raise ValueError(f"Неизвестный способ построения топологии: {method}")
+        assumed = {'is_connected': True, 'has_bridges': False} if num_nodes >= 2 else None
+        return Adjacency.from_edges(num_nodes, edges, assumed)
+    
+    @staticmethod
+    def incremental_edges(num_nodes: int, seed: Optional[int] = None) -> np.ndarray:
+        """
+        Связный граф без мостов (при N >= 3): случайное остовное дерево, затем
+        случайные ребра, пока остаются мосты. Ребро добавляется, только если
+        убирает хотя бы один мост, поэтому ребер не больше 2(N - 1).
+        Ограничения реберной связности сверху нет (прежний предел max_edges
+        снят вместе с пределом в 50 узлов); обычно она равна 2.
+
+        Мосты проверяются инкрементально (BridgeTracker), поэтому каждое
+        ребро-кандидат стоит почти O(1), а не копию графа и nx.bridges.
+        Ребра (массив (M, 2)) идут в порядке добавления.
+        """
+        rng = random.Random(seed)
+        edges: List[Tuple[int, int]] = []
+        if num_nodes < 2:
+            return np.empty((0, 2), dtype=np.int64)
+            
+        # создаем минимальное дерево
+        nodes_list = list(range(num_nodes))
+        rng.shuffle(nodes_list)
+        tracker = BridgeTracker(num_nodes)
+        
+        # Соединяем узлы в цепочку
+        for i in range(1, num_nodes):
+            # Соединяем с одним из предыдущих узлов
+            prev = nodes_list[rng.randrange(i)]
+            edges.append((nodes_list[i], prev))
+            tracker.add_tree_edge(prev, nodes_list[i])
+        taken = {(u, v) if u < v else (v, u) for u, v in edges}
+            
+        # Добавляем ребра между разными компонентами реберной двусвязности,
+        # пока в графе остаются мосты (ребра внутри компоненты мостов не убирают).
+        # Из двух узлов граф без мостов не построить
+        while tracker.bridges > 0 and num_nodes > 2:
+            u = rng.randrange(num_nodes)
+            v = rng.randrange(num_nodes)
+            if u == v or ((u, v) if u < v else (v, u)) in taken:
+                continue
+            if tracker.add_edge(u, v):
+                edges.append((u, v))
+                taken.add((u, v) if u < v else (v, u))
+                
+        return np.array(edges, dtype=np.int64)
+    
+    @staticmethod
+    def create_incremental(num_nodes: int, seed: Optional[int] = None) -> nx.Graph:
+        #граф networkx по incremental_edges
+        graph = nx.Graph()
+        graph.add_nodes_from(range(num_nodes))
+        graph.add_edges_from(NetworkTopologyGenerator.incremental_edges(num_nodes, seed).tolist())
+        if num_nodes >= 2:
+            # связность и отсутствие мостов гарантированы построением
+            TopologyInfo.for_graph(graph).assume(is_connected=True, has_bridges=False)
+        return graph
+    
+    @staticmethod
+    def constructive_edges(num_nodes: int, seed: Optional[int] = None,
+                           num_edges: Optional[int] = None) -> np.ndarray:
+        """
+        Ребра графа без мостов ровно с num_edges ребрами (массив (num_edges, 2)).
+
+        Ушное разложение: цикл из трех узлов, затем "уши" - пути из новых узлов,
+        концы которых присоединены к уже построенной части. Каждое ухо сохраняет
+        реберную двусвязность, поэтому проверять мосты не нужно. Ухо из k узлов
+        добавляет k + 1 ребро, так что при num_edges - N ушах ребер ровно столько,
+        сколько нужно; если ушей больше, чем новых узлов, остаток - хорды между
+        случайными несмежными узлами. По умолчанию num_edges = 1.5 * N
+        (средняя степень 3, как у инкрементального генератора).
+        """
+        n = num_nodes
+        if n < 2:
+            return np.empty((0, 2), dtype=np.int64)
+        if n == 2:  # без мостов не построить, как и в инкрементальном режиме
+            return np.array([[0, 1]], dtype=np.int64)
+        max_edges = n * (n - 1) // 2
+        if num_edges is None:
+            num_edges = min(max_edges, (3 * n) // 2)
+        if not n <= num_edges <= max_edges:
+            raise ValueError(f"Для {n} узлов без мостов число ребер должно быть от {n} до {max_edges}")
+
+        rng = np.random.default_rng(seed)
+        order = rng.permutation(n).astype(np.int64)  # порядок появления узлов
+
+        extra = num_edges - n  # ушей (и хорд) сверх одного цикла
+        ears = min(extra, n - 3)
+        if ears == 0:
+            start = n  # один цикл через все узлы
+            ear_starts = np.empty(0, dtype=np.int64)
+        else:
+            start = 3
+            # делим n - 3 новых узлов на ears непустых путей
+            cuts = np.sort(rng.choice(np.arange(start + 1, n), size=ears - 1, replace=False))
+            ear_starts = np.concatenate(([start], cuts)).astype(np.int64)
+        ear_ends = np.append(ear_starts[1:], n) - 1  # позиция последнего узла уха
+
+        parts = []
+        # начальный цикл
+        ring = order[:start]
+        parts.append(np.stack([ring, np.roll(ring, -1)], axis=1))
+        if ears:
+            # ребра внутри ушей: соседние позиции одного уха
+            ear_of = np.repeat(np.arange(ears), ear_ends - ear_starts + 1)
+            inner = np.nonzero(ear_of[:-1] == ear_of[1:])[0] + start
+            parts.append(np.stack([order[inner], order[inner + 1]], axis=1))
+            # концы уха - случайные уже построенные узлы (позиции < начала уха)
+            first = rng.integers(0, ear_starts)
+            last = rng.integers(0, ear_starts)
+            # ухо из одного узла с совпадающими концами дало бы кратное ребро
+            single = (ear_starts == ear_ends) & (first == last)
+            last[single] = (first[single] + rng.integers(1, ear_starts[single])) % ear_starts[single]
+            parts.append(np.stack([order[first], order[ear_starts]], axis=1))
+            parts.append(np.stack([order[ear_ends], order[last]], axis=1))
+        edges = np.concatenate(parts)
+
+        chords = extra - ears
+        if chords:
+            lo = np.minimum(edges[:, 0], edges[:, 1])
+            hi = np.maximum(edges[:, 0], edges[:, 1])
+            taken = np.unique(lo * n + hi)
+            added = np.empty(0, dtype=np.int64)
+            while len(added) < chords:
+                batch = rng.integers(0, n, size=(2 * (chords - len(added)) + 16, 2))
+                lo = np.minimum(batch[:, 0], batch[:, 1])
+                hi = np.maximum(batch[:, 0], batch[:, 1])
+                codes = (lo * n + hi)[lo != hi]
+                _, first_seen = np.unique(codes, return_index=True)
+                codes = codes[np.sort(first_seen)]  # без повторов, в порядке выборки
+                codes = codes[~np.isin(codes, taken)]
+                added = np.concatenate([added, codes[:chords - len(added)]])
+                taken = np.union1d(taken, codes)
+            edges = np.concatenate([edges, np.stack([added // n, added % n], axis=1)])
+        return edges
+
+    @staticmethod
+    def create_constructive(num_nodes: int, seed: Optional[int] = None,
+                            num_edges: Optional[int] = None) -> nx.Graph:
+        #граф без мостов по построению (constructive_edges) с точным числом ребер
+        graph = nx.Graph()
+        graph.add_nodes_from(range(num_nodes))
+        graph.add_edges_from(NetworkTopologyGenerator.constructive_edges(num_nodes, seed, num_edges).tolist())
+        if num_nodes >= 2:
+            TopologyInfo.for_graph(graph).assume(is_connected=True, has_bridges=False)
+        return graph
+    
+    @staticmethod
+    def save(path: str, adjacency: Adjacency, positions=None, metadata: Optional[dict] = None,
+             fmt: Optional[str] = None):
+        #топология в файл (binary или edgelist, см. topology_file), metadata - seed и способ построения
+        save_topology(path, adjacency, positions, metadata, fmt)
+        
+    @staticmethod
+    def load(path: str, mmap: bool = True) -> StoredTopology:
+        #топология из файла: adjacency, positions, metadata
+        return load_topology(path, mmap)
+    
+    @staticmethod
+    def has_no_bridges(graph: nx.Graph) -> bool: #Проверка отсутствия мостов в графе
+        if graph.number_of_nodes() <= 2:
+            return True
+        try:
+            bridges = list(nx.bridges(graph))
+            return len(bridges) == 0
+        except:
+            return False
+    
+    @staticmethod
+    def get_graph_info(graph: nx.Graph) -> TopologyInfo:#выводим информацию о графе
+        #ленивые метрики (TopologyInfo), дорогие считаются при обращении
+        return TopologyInfo.for_graph(graph)
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .dsr_protocol import Node, DSRPacket
+from .event_log import ERROR
+from ._lazy import lazy_import
+
+asyncio = lazy_import('asyncio')  # только для runtime='asyncio'
+
+
+class DeliveryScheduler(threading.Thread):
+    #Центральный планировщик доставки: куча (время доставки, порядок, узел, пакет)
+    #Отправитель только ставит пакет в кучу и не ждет, один поток кладет
+    #пакеты в очереди узлов, когда подходит их время.
+
+    def __init__(self, deliver: Callable[[int, DSRPacket], None]):
+        super().__init__(daemon=True)
+        self._deliver = deliver
+        self._heap: List[Tuple[float, int, int, DSRPacket]] = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self.running = True
+
+    def schedule(self, delay: float, to_node: int, packet: DSRPacket):
+        with self._condition:
+            order = next(self._counter)
+            heapq.heappush(self._heap, (time.monotonic() + delay, order, to_node, packet))
+            if self._heap[0][1] == order:
+                self._condition.notify()  # новый пакет раньше всех - будим поток
+
+    def run(self):
+        heap = self._heap
+        while True:
+            with self._condition:
+                while self.running:
+                    now = time.monotonic()
+                    if heap and heap[0][0] <= now:
+                        break
+                    self._condition.wait(heap[0][0] - now if heap else None)
+                if not self.running:
+                    return
+                due = []
+                while heap and heap[0][0] <= now:
+                    _, _, to_node, packet = heapq.heappop(heap)
+                    due.append((to_node, packet))
+            for to_node, packet in due:
+                self._deliver(to_node, packet)
+
+    def stop(self):
+        with self._condition:
+            self.running = False
+            self._heap.clear()
+            self._condition.notify()
+
+
+class ThreadRuntime:
+    #Исходная среда выполнения: каждый узел - отдельный поток,
+    #пакеты доставляет общий планировщик (DeliveryScheduler), отправитель не ждет
+
+    def __init__(self, network):
+        self.network = network
+        self.scheduler: Optional[DeliveryScheduler] = None
+
+    def start(self, nodes: Dict[int, Node]):
+        #запускаем все узлы, которые не запущены
+        if self.scheduler is None:
+            self.scheduler = DeliveryScheduler(self._put)
+            self.scheduler.start()
+        for node in nodes.values():
+            if not node.is_alive():
+                node.start()
+
+    def stop(self):
+        for node in self.network.nodes.values():
+            node.stop()
+        if self.scheduler is not None:
+            self.scheduler.stop()
+            self.scheduler = None
+
+    def _put(self, to_node: int, packet: DSRPacket):
+        node = self.network.nodes.get(to_node)
+        if node is not None:
+            node.message_queue.put(packet)
+
+    def deliver(self, to_node: int, packet: DSRPacket, delay: float):
+        # Задержка канала (в секундах) отсчитывает планировщик
+        scheduler = self.scheduler
+        if scheduler is not None:
+            scheduler.schedule(delay, to_node, packet)
+        else:  # узлы не запущены: пакет ждет в очереди узла, как раньше
+            self._put(to_node, packet)
+
+
+class AsyncioRuntime:
+    #Узлы как задачи asyncio в одном фоновом потоке с циклом событий
+    #Почтовый ящик узла - asyncio.Queue, задача узла ждет await get(),
+    #поэтому простаивающие узлы не тратят процессорное время.
+    #Задержка доставки (из модели каналов) - call_later, отправитель не блокируется.
+    #Пакеты узлам без задачи (цикл не запущен или узел еще не запущен) ждут в
+    #_backlog и попадают в почтовый ящик при запуске узла.
+
+    def __init__(self, network):
+        self.network = network
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._mailboxes: Dict[int, asyncio.Queue] = {}
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._served: Dict[int, Node] = {}  # узел, которого обслуживает задача
+        self._backlog: Dict[Node, List[DSRPacket]] = {}
+        self._backlog_lock = threading.Lock()
+
+    def start(self, nodes: Dict[int, Node]):
+        if self.loop is None:
+            self.loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+            self._thread.start()
+        # новые узлы и узлы, замененные новой топологией (set_topology создает
+        # новые объекты Node с теми же номерами): задача и ящик создаются заново
+        new_nodes = [node for node_id, node in nodes.items() if self._served.get(node_id) is not node]
+        # задачи создаем и отменяем внутри потока цикла событий
+        asyncio.run_coroutine_threadsafe(self._spawn(new_nodes, set(nodes)), self.loop).result()
+
+    async def _spawn(self, nodes: List[Node], current: set):
+        replaced = {node.node_id for node in nodes}
+        stale = [node_id for node_id in self._tasks if node_id not in current or node_id in replaced]
+        await self._cancel([self._tasks.pop(node_id) for node_id in stale])
+        for node_id in stale:
+            self._mailboxes.pop(node_id, None)
+            self._served.pop(node_id, None)
+        with self._backlog_lock:
+            backlog = self._backlog
+            self._backlog = {node: backlog[node] for node in backlog if self.network.nodes.get(node.node_id) is node}
+            for node in nodes:
+                mailbox = self._mailboxes[node.node_id] = asyncio.Queue()
+                for packet in self._backlog.pop(node, ()):
+                    mailbox.put_nowait(packet)
+                self._served[node.node_id] = node
+                self._tasks[node.node_id] = asyncio.create_task(self._serve(node, mailbox))
+
+    async def _serve(self, node: Node, mailbox: asyncio.Queue):
+        #основной цикл узла (аналог Node.run)
+        while True:
+            packet = await mailbox.get()
+            try:
+                node.process_packet(packet, mailbox.qsize())
+            except Exception as e:
+                self.network.log("Ошибка в узле %s: %s", node.node_id, e, level=ERROR)
+
+    @staticmethod
+    async def _cancel(tasks: List[asyncio.Task]):
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _cancel_tasks(self):
+        await self._cancel(list(self._tasks.values()))
+        self._tasks.clear()
+
+    def stop(self):
+        if self.loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._cancel_tasks(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+        self.loop = None
+        self._thread = None
+        self._mailboxes.clear()
+        self._served.clear()
+
+    def deliver(self, to_node: int, packet: DSRPacket, delay: float):
+        loop = self.loop
+        mailbox = self._mailboxes.get(to_node) if loop is not None else None
+        if mailbox is None:
+            node = self.network.nodes.get(to_node)
+            if node is not None:
+                with self._backlog_lock:
+                    if self.loop is None or to_node not in self._mailboxes:
+                        self._backlog.setdefault(node, []).append(packet)
+                        return
+                # ящик создан, пока ждали блокировку
+                self.deliver(to_node, packet, delay)
+            return
+        if threading.current_thread() is self._thread:
+            loop.call_later(delay, mailbox.put_nowait, packet)
+        else:
+            # отправка из другого потока (например, запуск поиска из GUI)
+            loop.call_soon_threadsafe(loop.call_later, delay, mailbox.put_nowait, packet)
+
+
+RUNTIMES = {
+    'threads': ThreadRuntime,
+    'asyncio': AsyncioRuntime,
+}
+
+
+def create_runtime(name: str, network):
+    #создаем среду выполнения узлов по имени
+    try:
+        return RUNTIMES[name](network)
+    except KeyError:
+        raise ValueError(f"Неизвестная среда выполнения: {name}") from None
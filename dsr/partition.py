@@ -0,0 +1,559 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import math
+import multiprocessing
+import pickle
+import weakref
+from typing import Dict, List, Optional, Tuple
+
+from .adjacency import Adjacency
+from .dsr_protocol import DSRPacket, Route
+from .metrics import Histogram, NetworkMetrics, PROCESS_BUCKETS
+from .simulation import HeadlessNetwork
+from ._lazy import lazy_import
+
+np = lazy_import('numpy')
+
+
+#Моделирование без потоков в нескольких процессах: граф делится на части
+#(partition_nodes), узлы каждой части работают в своем рабочем процессе.
+#Пакеты внутри части остаются в очереди процесса, пакеты к узлам других частей
+#собираются за шаг и передаются одним сообщением на часть через координатор
+#(PartitionedNetwork, байты pickle пересылаются без разбора).
+#
+#Синхронизация консервативная, окнами времени: задержка любого канала не меньше
+#lookahead, поэтому события с временем из [T, T + lookahead), где T - самое
+#раннее событие сети, не порождают событий внутри окна - части обрабатывают их
+#независимо, затем обмениваются пакетами.
+#
+#Результаты те же, что у HeadlessNetwork. Планировщик упорядочивает события с
+#одинаковым временем по порядку постановки, а он совпадает с порядком обработки
+#родительских событий и номером отправки внутри родителя. Ключ события -
+#кортеж (время, *ключ родителя, номер отправки): ключи сравниваются как кортежи
+#в том же порядке, что и события в одном процессе, поэтому узел получает пакеты
+#в том же порядке. Начало цепочки - (время, INITIATED, номер поиска) или
+#(время, RENUMBERED, общий номер). Ключ растет на два элемента за переход,
+#поэтому, когда он длиннее RENUMBER_LENGTH, координатор заменяет ключи ожидающих
+#событий их общим порядковым номером.
+#
+#Разброс задержки и потери в каналах не поддерживаются: случайные числа модели
+#каналов берутся в общем порядке отправки, который части не видят.
+
+RENUMBER_LENGTH = 24
+INITIATED = math.inf  # поиски координатора - после событий того же времени
+RENUMBERED = -math.inf  # перенумерованные события - до событий, поставленных после них
+
+Key = Tuple[float, ...]
+
+
+def cut_edges(adjacency: Adjacency, labels) -> int:
+    #число ребер между разными частями
+    edges = adjacency.edges()
+    labels = np.asarray(labels)
+    return int(np.count_nonzero(labels[edges[:, 0]] != labels[edges[:, 1]]))
+
+
+def partition_nodes(adjacency: Adjacency, parts: int, passes: int = 10,
+                    imbalance: float = 0.03) -> np.ndarray:
+    #номер части (0..parts-1) для каждого узла, части почти равные, ребер между ними мало
+    #начальное деление - полосы порядка обхода в ширину от периферийного узла,
+    #затем проходы улучшения (как Fiduccia-Mattheyses без отката): граничный
+    #узел переходит в часть, где у него больше соседей, если баланс допускает
+    #imbalance допустимое превышение среднего размера части (0.03 - на 3%)
+    from .stretch import shortest_hops
+
+    if parts < 1:
+        raise ValueError(f"Число частей должно быть положительным: {parts}")
+    n = adjacency.num_nodes
+    labels = np.zeros(n, dtype=np.int32)
+    if parts == 1 or n == 0:
+        return labels
+
+    # периферийный узел - самый дальний от самого дальнего от узла 0;
+    # недостижимые узлы (другие компоненты) идут в конец порядка
+    start = 0
+    for _ in range(2):
+        hops = shortest_hops(adjacency, [start])[0]
+        start = int(np.argmax(hops))
+    hops = np.where(hops < 0, n, hops)
+    order = np.argsort(hops, kind='stable')
+    labels[order] = np.arange(n, dtype=np.int64) * parts // n
+
+    max_size = math.ceil(n / parts * (1.0 + imbalance))
+    min_size = math.floor(n / parts * (1.0 - imbalance))
+    sources = np.repeat(np.arange(n, dtype=np.int64), adjacency.degrees())
+    indices = np.asarray(adjacency.indices, dtype=np.int64)
+    nodes = np.arange(n)
+    for _ in range(passes):
+        # соседи каждого узла по частям (N x parts), выигрыш лучшего перехода
+        counts = np.bincount(sources * parts + labels[indices], minlength=n * parts).reshape(n, parts)
+        own = counts[nodes, labels].copy()
+        counts[nodes, labels] = -1
+        best = counts.argmax(axis=1)
+        gain = counts[nodes, best] - own
+        candidates = np.flatnonzero(gain > 0)
+        if not len(candidates):
+            break
+        candidates = candidates[np.argsort(-gain[candidates], kind='stable')]
+
+        # переходы по одному: выигрыш пересчитывается по текущим частям соседей
+        current = labels.tolist()
+        sizes = np.bincount(labels, minlength=parts).tolist()
+        moved = 0
+        for node, target in zip(candidates.tolist(), best[candidates].tolist()):
+            part = current[node]
+            if part == target or sizes[target] >= max_size or sizes[part] <= min_size:
+                continue
+            neighbors = [current[u] for u in adjacency.neighbors(node)]
+            if neighbors.count(target) <= neighbors.count(part):
+                continue
+            current[node] = target
+            sizes[part] -= 1
+            sizes[target] += 1
+            moved += 1
+        labels = np.asarray(current, dtype=np.int32)
+        if not moved:
+            break
+    return labels
+
+
+class RemoteNode:
+    #Узел в процессе-координаторе: идентификаторы RREQ и запуск поиска
+    #Сам узел (кэши, обработка пакетов) работает в процессе своей части.
+
+    __slots__ = ('node_id', 'network', '_request_ids')
+
+    def __init__(self, node_id: int, network: "PartitionedNetwork"):
+        self.node_id = node_id
+        self.network = network
+        self._request_ids = itertools.count(1)
+
+    def next_request_id(self) -> int:
+        return next(self._request_ids)
+
+    def initiate_route_discovery(self, destination: int, request_id: Optional[int] = None):
+        #поиск запускается в рабочем процессе при следующем run
+        if request_id is None:
+            request_id = self.next_request_id()
+        self.network._initiate(self.node_id, destination, request_id)
+
+    def link_broken(self, neighbor_id: int):
+        #кэш маршрутов узла - в рабочем процессе (см. PartitionedNetwork.update_links)
+        pass
+
+
+class PartitionWorker(HeadlessNetwork):
+    #Часть сети в рабочем процессе: узлы части part, события в порядке ключей
+    #Ожидающие события - список, сортируется раз за шаг: пакеты, отправленные по
+    #порядку обработки, уже упорядочены, и сортировка только сливает эти серии.
+    #Пакеты к узлам других частей копятся в _outbox до конца шага.
+
+    def __init__(self, part: int, labels, adjacency: Adjacency, settings: dict):
+        super().__init__(None, settings['delay'])
+        self.part = part
+        self._owner = memoryview(np.ascontiguousarray(labels, dtype=np.int32))
+        self.adjacency = adjacency
+        self.route_cache_ttl, self.route_cache_size = settings['route_cache']
+        self.rreq_window = settings['rreq_window']
+        self.link_model.default = settings['link_default']
+        self.link_model._links = dict(settings['links'])
+        self.metrics = NetworkMetrics() if settings['metrics'] else None
+        self.scheduler.now = settings['time']
+        self._pending: List[Tuple[Key, int, DSRPacket]] = []
+        self._outbox: Dict[int, list] = {}
+        self._found: List[Tuple[Key, Route, Optional[int]]] = []
+        self._control: Dict[Tuple[int, int], List[int]] = {}  # (источник, RREQ) -> [RREQ, RREP]
+        self._key_length = 0
+        self._key: Key = (self.scheduler.now, INITIATED, 0)
+        self._sends = itertools.count()
+        for node_id in np.flatnonzero(np.asarray(labels) == part).tolist():
+            self.nodes[node_id] = self.node_class(node_id, self)
+
+    def send_packet(self, from_node: int, to_node: int, packet: DSRPacket):
+        now = self.scheduler.now
+        delay = self.link_model.transmit(now, from_node, to_node, packet, self.delay)
+        self._on_send(from_node, to_node, packet, delay is None)
+        if delay is None:
+            return
+        key = (now + delay,) + self._key + (next(self._sends),)
+        if len(key) > self._key_length:
+            self._key_length = len(key)
+        part = self._owner[to_node]
+        if part == self.part:
+            self._pending.append((key, to_node, packet))
+        else:
+            self._outbox.setdefault(part, []).append((key, to_node, packet))
+
+    def _on_send(self, from_node: int, to_node: int, packet: DSRPacket, dropped: bool = False):
+        #счетчики отправок: итоги шага уходят координатору
+        if self.metrics is not None:
+            self.metrics.packet_sent(from_node, packet.type)
+        self.packet_counts[packet.type] = self.packet_counts.get(packet.type, 0) + 1
+        if packet.type == 'RREQ':
+            self._control.setdefault((packet.source, packet.packet_id), [0, 0])[0] += 1
+        elif packet.type == 'RREP':
+            self._control.setdefault((packet.destination, packet.packet_id), [0, 0])[1] += 1
+
+    def route_found(self, route: Route, request_id: Optional[int] = None):
+        #сеансы - у координатора, он применяет маршруты всех частей в порядке ключей
+        self._found.append((self._key, route, request_id))
+
+    def initiate(self, entries: List[tuple]) -> tuple:
+        #поиски, запущенные координатором: (источник, назначение, RREQ, время, номер)
+        for source, destination, request_id, now, number in entries:
+            self.scheduler.now = now
+            self._key = (now, INITIATED, number)
+            self._sends = itertools.count()
+            self.nodes[source].initiate_route_discovery(destination, request_id)
+        self._pending.sort()
+        return self._result(0)
+
+    def step(self, bound: float, until: Optional[float], inbound: List[bytes]) -> tuple:
+        #события с временем < bound (и <= until), inbound - пакеты от других частей
+        #новые события окна не попадают в окно (задержка >= lookahead)
+        self._receive(inbound)
+        pending = self._pending
+        end = _window_end(pending, bound, until)
+        self._pending = pending[end:]
+        for index in range(end):
+            key, to_node, packet = pending[index]
+            self.scheduler.now = key[0]
+            self._key = key
+            self._sends = itertools.count()
+            self._deliver(to_node, packet)
+        self._pending.sort()
+        return self._result(end)
+
+    def pending_keys(self, inbound: List[bytes]) -> List[Key]:
+        #ключи ожидающих событий по порядку (для общей перенумерации)
+        self._receive(inbound)
+        return [key for key, _, _ in self._pending]
+
+    def renumber(self, numbers: List[int]):
+        #numbers - общие номера событий в порядке pending_keys
+        self._pending = [((key[0], RENUMBERED, number), to_node, packet)
+                         for (key, to_node, packet), number in zip(self._pending, numbers)]
+        self._key_length = 0
+
+    def update_links(self, added, removed):
+        self.adjacency = self.adjacency.with_changes(added, removed)
+        for u, v in removed:
+            for node_id, neighbor in ((u, v), (v, u)):
+                if node_id in self.nodes:
+                    self.nodes[node_id].link_broken(neighbor)
+
+    def clear(self):
+        self._pending.clear()
+        self._outbox.clear()
+
+    def collect_metrics(self) -> tuple:
+        if self.metrics is None:
+            return {}, None
+        return self.metrics.nodes, self.metrics.process_time
+
+    def _receive(self, inbound: List[bytes]):
+        if inbound:
+            for blob in inbound:
+                self._pending.extend(pickle.loads(blob))
+            self._pending.sort()
+
+    def _result(self, processed: int) -> tuple:
+        #итог шага: (время ближайшего события, пакеты другим частям {часть: (ранний, байты)},
+        #найденные маршруты, отправки по типам, RREQ/RREP по поискам, переданные пакеты,
+        #обработано событий, время сети, наибольшая длина ключа)
+        outbox = {
+            part: (min(entry[0][0] for entry in entries), pickle.dumps(entries, pickle.HIGHEST_PROTOCOL))
+            for part, entries in self._outbox.items()
+        }
+        result = (self._pending[0][0][0] if self._pending else math.inf, outbox, self._found,
+                  self.packet_counts, self._control, self.link_model.sent, processed,
+                  self.scheduler.now, self._key_length)
+        self._outbox = {}
+        self._found = []
+        self.packet_counts = {}
+        self._control = {}
+        self.link_model.sent = 0
+        return result
+
+
+def _window_end(pending: list, bound: float, until: Optional[float]) -> int:
+    #число первых событий отсортированного списка с временем < bound и <= until
+    lo, hi = 0, len(pending)
+    while lo < hi:
+        middle = (lo + hi) // 2
+        event_time = pending[middle][0][0]
+        if event_time < bound and (until is None or event_time <= until):
+            lo = middle + 1
+        else:
+            hi = middle
+    return lo
+
+
+def _worker_main(connection, part: int, labels, adjacency: Adjacency, settings: dict):
+    #цикл рабочего процесса: команда (имя, аргументы) -> ответ
+    worker = PartitionWorker(part, labels, adjacency, settings)
+    while True:
+        command, args = connection.recv()
+        if command == 'stop':
+            break
+        connection.send(getattr(worker, command)(*args))
+    connection.close()
+
+
+def _stop_workers(connections, processes):
+    for connection in connections:
+        try:
+            connection.send(('stop', ()))
+            connection.close()
+        except (OSError, ValueError):
+            pass
+    for process in processes:
+        process.join(timeout=5)
+        if process.is_alive():
+            process.terminate()
+
+
+class PartitionedNetwork(HeadlessNetwork):
+    #Сеть без потоков, узлы которой работают в workers процессах
+    #Интерфейс поиска тот же: discover, initiate_communication + run, сеансы,
+    #packet_counts, metrics. Рабочие процессы запускаются при первом run
+    #(с текущими параметрами каналов) и останавливаются close или при новой топологии.
+    #labels части узлов (partition_nodes), lookahead наименьшая задержка канала
+    #Без GUI и трассы; DATA (traffic) и max_events в run не поддерживаются.
+    #Метрики узлов собираются из процессов по запросу (collect_metrics,
+    #metrics_snapshot, node_metrics, export_metrics).
+
+    node_class = RemoteNode
+
+    def __init__(self, workers: int = 2, delay: float = 1.0, passes: int = 10):
+        if workers < 1:
+            raise ValueError(f"Число процессов должно быть положительным: {workers}")
+        super().__init__(None, delay)
+        self.workers = workers
+        self.passes = passes
+        self.labels: Optional[np.ndarray] = None
+        self.lookahead: Optional[float] = None
+        self._connections: list = []
+        self._finalizer: Optional[weakref.finalize] = None
+        self._initiations: List[tuple] = []
+        self._initiation_numbers = itertools.count()
+        self._next_times: List[float] = []
+        self._inbound: List[List[Tuple[float, bytes]]] = []
+        self._key_length = 0
+        self._topology_time = 0.0
+
+    def set_topology(self, topology, positions=None, metadata: Optional[dict] = None) -> bool:
+        self.close()
+        self.labels = None
+        self._initiations.clear()
+        result = super().set_topology(topology, positions, metadata)
+        self._topology_time = self.now()
+        return result
+
+    def start_trace(self, path: str):
+        raise ValueError("Трасса не записывается при моделировании в нескольких процессах")
+
+    def configure_route_cache(self, ttl: Optional[float], max_size: Optional[int]):
+        self.route_cache_ttl = ttl
+        self.route_cache_size = max_size
+        self._broadcast('configure_route_cache', ttl, max_size)
+
+    def set_rreq_window(self, window: int):
+        #узлы - в рабочих процессах (запущенные позже получат окно в settings)
+        self.rreq_window = window
+        self._broadcast('set_rreq_window', window)
+
+    def update_links(self, added, removed):
+        added = list(added)
+        removed = list(removed)
+        super().update_links(added, removed)
+        self._broadcast('update_links', added, removed)
+
+    def stop_nodes(self):
+        self._initiations.clear()
+        self._broadcast('clear')
+        self._next_times = [math.inf] * len(self._connections)
+        self._inbound = [[] for _ in self._connections]
+
+    def _initiate(self, source: int, destination: int, request_id: int):
+        self._initiations.append((source, destination, request_id, self.now(), next(self._initiation_numbers)))
+
+    def _links_lookahead(self) -> float:
+        #наименьшая задержка канала (окно синхронизации), каналы без случайности
+        links = [self.link_model.default] + list(self.link_model._links.values())
+        if any(params.jitter or params.loss for params in links):
+            raise ValueError("Разброс задержки и потери в каналах не поддерживаются "
+                             "при моделировании в нескольких процессах")
+        lookahead = min(self.delay if params.latency is None else params.latency for params in links)
+        if lookahead <= 0:
+            raise ValueError("Для моделирования в нескольких процессах задержка каналов должна быть положительной")
+        return lookahead
+
+    def start_workers(self):
+        #разбиение графа и запуск рабочих процессов (если еще не запущены)
+        if self._connections:
+            return
+        if self.adjacency is None:
+            raise ValueError("Топология не создана")
+        self.lookahead = self._links_lookahead()
+        if self.labels is None:
+            self.labels = partition_nodes(self.adjacency, self.workers, self.passes)
+        settings = {
+            'delay': self.delay,
+            'route_cache': (self.route_cache_ttl, self.route_cache_size),
+            'rreq_window': self.rreq_window,
+            'link_default': self.link_model.default,
+            'links': self.link_model._links,
+            'metrics': self.metrics is not None,
+            'time': self._topology_time,
+        }
+        context = multiprocessing.get_context()
+        processes = []
+        for part in range(self.workers):
+            parent, child = context.Pipe()
+            process = context.Process(target=_worker_main, daemon=True,
+                                      args=(child, part, self.labels, self.adjacency, settings))
+            process.start()
+            child.close()
+            self._connections.append(parent)
+            processes.append(process)
+        self._finalizer = weakref.finalize(self, _stop_workers, self._connections, processes)
+        self._next_times = [math.inf] * self.workers
+        self._inbound = [[] for _ in range(self.workers)]
+        self._key_length = 0
+
+    def close(self):
+        #остановка рабочих процессов (узлы и их кэши теряются)
+        if self._finalizer is not None:
+            self._finalizer()
+            self._finalizer = None
+        self._connections = []
+
+    def __enter__(self) -> "PartitionedNetwork":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _broadcast(self, command: str, *args) -> list:
+        for connection in self._connections:
+            connection.send((command, args))
+        return [connection.recv() for connection in self._connections]
+
+    def _next_time(self) -> float:
+        return min(itertools.chain(self._next_times, (first for inbound in self._inbound for first, _ in inbound)),
+                   default=math.inf)
+
+    def _exchange(self, command: str, args: Dict[int, tuple]) -> int:
+        #команда частям из args, разбор итогов шага: пакеты между частями,
+        #маршруты (в порядке ключей, как в одном процессе) и счетчики
+        for part, part_args in args.items():
+            self._connections[part].send((command, part_args))
+        processed = 0
+        latest = self.scheduler.now
+        found = []
+        for part in args:
+            (next_time, outbox, routes, packets, control, sent, count,
+             now, key_length) = self._connections[part].recv()
+            self._next_times[part] = next_time
+            for target, message in outbox.items():
+                self._inbound[target].append(message)
+            found.extend(routes)
+            for kind, value in packets.items():
+                self.packet_counts[kind] = self.packet_counts.get(kind, 0) + value
+            for request, (rreq, rrep) in control.items():
+                session = self._sessions_by_request.get(request)
+                if session is not None:
+                    session.rreq += rreq
+                    session.rrep += rrep
+            self.link_model.sent += sent
+            processed += count
+            latest = max(latest, now)
+            self._key_length = max(self._key_length, key_length)
+        found.sort(key=lambda report: report[0])
+        for key, route, request_id in found:
+            self.scheduler.now = key[0]
+            self.route_found(route, request_id)
+        self.scheduler.now = latest
+        return processed
+
+    def _renumber(self):
+        #общий порядок ожидающих событий всех частей -> короткие ключи
+        inbound = [[blob for _, blob in messages] for messages in self._inbound]
+        for part, connection in enumerate(self._connections):
+            connection.send(('pending_keys', (inbound[part],)))
+        keys = [connection.recv() for connection in self._connections]
+        self._inbound = [[] for _ in self._connections]
+        self._next_times = [part_keys[0][0] if part_keys else math.inf for part_keys in keys]
+        numbers: List[List[int]] = [[] for _ in self._connections]
+        merged = heapq.merge(*(zip(part_keys, itertools.repeat(part)) for part, part_keys in enumerate(keys)))
+        for number, (_, part) in enumerate(merged):
+            numbers[part].append(number)
+        for part, connection in enumerate(self._connections):
+            connection.send(('renumber', (numbers[part],)))
+        for connection in self._connections:
+            connection.recv()
+        self._key_length = 0
+
+    def run(self, until: Optional[float] = None, max_events: Optional[int] = None) -> int:
+        #шаги окнами lookahead до опустошения очередей всех частей (или до until)
+        if max_events is not None:
+            raise ValueError("max_events не поддерживается при моделировании в нескольких процессах")
+        self.start_workers()
+        processed = 0
+        if self._initiations:
+            initiations: Dict[int, tuple] = {}
+            for entry in self._initiations:
+                initiations.setdefault(int(self.labels[entry[0]]), ([],))[0].append(entry)
+            self._initiations = []
+            processed += self._exchange('initiate', initiations)
+
+        while True:
+            start = self._next_time()
+            if start == math.inf or (until is not None and start > until):
+                break
+            if self._key_length > RENUMBER_LENGTH:
+                self._renumber()
+            bound = start + self.lookahead
+            # шаг только частям с событиями в окне или входящими пакетами
+            args = {}
+            for part, next_time in enumerate(self._next_times):
+                if next_time < bound or self._inbound[part]:
+                    args[part] = (bound, until, [blob for _, blob in self._inbound[part]])
+                    self._inbound[part] = []
+            processed += self._exchange('step', args)
+
+        pending = self._next_time() != math.inf
+        if until is not None and self.scheduler.now < until:
+            self.scheduler.now = until
+        self.scheduler.processed += processed
+        if not pending:
+            self.close_sessions()
+        return processed
+
+    def collect_metrics(self):
+        #счетчики узлов и гистограмма времени обработки из рабочих процессов в metrics
+        if self.metrics is None or not self._connections:
+            return
+        process_time = Histogram(PROCESS_BUCKETS)
+        for nodes, histogram in self._broadcast('collect_metrics'):
+            self.metrics.nodes.update(nodes)
+            if histogram is not None:
+                process_time.counts = [a + b for a, b in zip(process_time.counts, histogram.counts)]
+                process_time.count += histogram.count
+                process_time.sum += histogram.sum
+        self.metrics.process_time = process_time
+
+    def metrics_snapshot(self) -> dict:
+        self.collect_metrics()
+        return super().metrics_snapshot()
+
+    def node_metrics(self, node_id: int) -> dict:
+        self.collect_metrics()
+        return super().node_metrics(node_id)
+
+    def export_metrics(self, path: str, fmt: str = 'prometheus'):
+        self.collect_metrics()
+        super().export_metrics(path, fmt)
@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import bisect
+import struct
+import threading
+from array import array
+from collections import namedtuple
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from .adjacency import Adjacency
+from .dsr_protocol import DSRPacket, Route
+from ._lazy import lazy_import
+
+nx = lazy_import('networkx')
+
+
+#Трасса моделирования: двоичный файл только для дописывания
+#Записываются топология, изменения связей (подвижность) и все события send_packet,
+#visualize_step, route_found (в том числе отброшенные на паузе, а для send - и
+#потерянные моделью каналов - с флагом dropped), поэтому запуск можно
+#проиграть с любой скоростью, перематывать и шагать назад без узлов и потоков.
+#
+#Формат (little-endian): заголовок MAGIC, затем записи <kind:B, time:d> и тело:
+#  topology  <nodes:I, edges:I> + edges*2 int32
+#  links     <added:I, removed:I> + (added+removed)*2 int32
+#  send      <from:i, to:i, dropped:?> + пакет
+#  visualize <node:i, dropped:?> + пакет
+#  route     <len:I> + len int32
+#  пакет     <type:B, source:i, destination:i, packet_id:q, hop:i, len:I> + len int32
+#Трассы прежней версии (MAGIC_V1: len маршрута H, packet_id i) читаются, но не дописываются.
+
+MAGIC = b'DSRTRACE2\n'
+MAGIC_V1 = b'DSRTRACE1\n'
+
+TOPOLOGY, SEND, VISUALIZE, ROUTE, LINKS = 1, 2, 3, 4, 5
+KIND_NAMES = {TOPOLOGY: 'topology', SEND: 'send', VISUALIZE: 'visualize', ROUTE: 'route', LINKS: 'links'}
+
+PACKET_TYPES = ('RREQ', 'RREP', 'DATA', 'RERR')
+_PACKET_CODES = {name: code for code, name in enumerate(PACKET_TYPES)}
+
+_HEAD = struct.Struct('<Bd')
+_TOPOLOGY = struct.Struct('<II')
+_LINKS = struct.Struct('<II')
+_SEND = struct.Struct('<ii?')
+_VISUALIZE = struct.Struct('<i?')
+_ROUTE = struct.Struct('<I')
+_PACKET = struct.Struct('<BiiqiI')
+_ROUTE_V1 = struct.Struct('<H')
+_PACKET_V1 = struct.Struct('<BiiiiH')
+
+#kind имя события ('topology', 'links', 'send', 'visualize', 'route')
+#node узел (отправитель для send, текущий для visualize), peer получатель для send
+#edges список ребер для topology, node для topology - количество узлов
+#(в TraceReplay.links для topology еще peer - прежнее количество узлов и removed - исчезнувшие ребра)
+#для links edges - добавленные связи, removed - разорванные
+#dropped для send - пакет не доставлен (пауза или потеря в модели каналов)
+TraceEvent = namedtuple(
+    'TraceEvent', 'kind time node peer packet route edges dropped removed',
+    defaults=(None, None, None, None, None, False, None)
+)
+
+
+class TraceWriter:
+    #запись трассы, безопасна для вызова из потоков узлов
+
+    def __init__(self, path: str, buffer_size: int = 1 << 16):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'ab', buffering=buffer_size)
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+        else:
+            with open(path, 'rb') as f:
+                magic = f.read(len(MAGIC))
+            if magic != MAGIC:
+                self._file.close()
+                raise ValueError(f"Трасса {path} в другом формате, дописывать в нее нельзя")
+
+    def _write(self, data: bytes):
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(data)
+
+    @staticmethod
+    def _route(route: Sequence[int]) -> bytes:
+        return _ROUTE.pack(len(route)) + array('i', route).tobytes()
+
+    @staticmethod
+    def _packet(packet: DSRPacket) -> bytes:
+        return _PACKET.pack(
+            _PACKET_CODES[packet.type], packet.source, packet.destination,
+            packet.packet_id, packet.hop, len(packet.route)
+        ) + array('i', packet.route).tobytes()
+
+    def topology(self, time: float, adjacency: Adjacency):
+        edges = adjacency.edges()
+        self._write(
+            _HEAD.pack(TOPOLOGY, time)
+            + _TOPOLOGY.pack(adjacency.num_nodes, len(edges))
+            + edges.astype('<i4').tobytes()
+        )
+
+    def links(self, time: float, added: Sequence[Tuple[int, int]], removed: Sequence[Tuple[int, int]]):
+        flat = array('i', [node for edge in added for node in edge])
+        flat.extend(node for edge in removed for node in edge)
+        self._write(_HEAD.pack(LINKS, time) + _LINKS.pack(len(added), len(removed)) + flat.tobytes())
+
+    def send(self, time: float, from_node: int, to_node: int, packet: DSRPacket, dropped: bool = False):
+        self._write(_HEAD.pack(SEND, time) + _SEND.pack(from_node, to_node, dropped) + self._packet(packet))
+
+    def visualize(self, time: float, packet: DSRPacket, node: int, dropped: bool = False):
+        self._write(_HEAD.pack(VISUALIZE, time) + _VISUALIZE.pack(node, dropped) + self._packet(packet))
+
+    def route_found(self, time: float, route: Route):
+        self._write(_HEAD.pack(ROUTE, time) + self._route(route))
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+def _read_exact(stream, size: int) -> bytes:
+    data = stream.read(size)
+    if len(data) != size:
+        raise EOFError
+    return data
+
+
+def _read_ints(stream, count: int) -> Tuple[int, ...]:
+    values = array('i')
+    values.frombytes(_read_exact(stream, 4 * count))
+    return tuple(values)
+
+
+def _read_packet(stream, layout: struct.Struct = _PACKET) -> DSRPacket:
+    code, source, destination, packet_id, hop, length = layout.unpack(_read_exact(stream, layout.size))
+    return DSRPacket(PACKET_TYPES[code], source, destination, _read_ints(stream, length), packet_id, hop)
+
+
+def read_trace(path: str) -> Iterator[TraceEvent]:
+    #потоковое чтение трассы по одному событию
+    #(оборванная последняя запись, например при аварийной остановке, пропускается)
+    with open(path, 'rb') as stream:
+        magic = stream.read(len(MAGIC))
+        if magic == MAGIC:
+            packet_layout, route_layout = _PACKET, _ROUTE
+        elif magic == MAGIC_V1:
+            packet_layout, route_layout = _PACKET_V1, _ROUTE_V1
+        else:
+            raise ValueError(f"Файл не является трассой DSR: {path}")
+        while True:
+            head = stream.read(_HEAD.size)
+            if len(head) < _HEAD.size:
+                return
+            kind, time = _HEAD.unpack(head)
+            try:
+                if kind == TOPOLOGY:
+                    num_nodes, num_edges = _TOPOLOGY.unpack(_read_exact(stream, _TOPOLOGY.size))
+                    flat = _read_ints(stream, 2 * num_edges)
+                    yield TraceEvent('topology', time, num_nodes, edges=list(zip(flat[::2], flat[1::2])))
+                elif kind == LINKS:
+                    num_added, num_removed = _LINKS.unpack(_read_exact(stream, _LINKS.size))
+                    flat = _read_ints(stream, 2 * (num_added + num_removed))
+                    edges = list(zip(flat[::2], flat[1::2]))
+                    yield TraceEvent('links', time, edges=edges[:num_added], removed=edges[num_added:])
+                elif kind == SEND:
+                    from_node, to_node, dropped = _SEND.unpack(_read_exact(stream, _SEND.size))
+                    yield TraceEvent('send', time, from_node, to_node, _read_packet(stream, packet_layout),
+                                     dropped=dropped)
+                elif kind == VISUALIZE:
+                    node, dropped = _VISUALIZE.unpack(_read_exact(stream, _VISUALIZE.size))
+                    yield TraceEvent('visualize', time, node, packet=_read_packet(stream, packet_layout),
+                                     dropped=dropped)
+                elif kind == ROUTE:
+                    (length,) = route_layout.unpack(_read_exact(stream, route_layout.size))
+                    yield TraceEvent('route', time, route=_read_ints(stream, length))
+                else:
+                    raise ValueError(f"Неизвестный тип записи трассы: {kind}")
+            except EOFError:
+                return
+
+
+class TraceReplay:
+    #трасса, загруженная для проигрывания
+    #graph топология (последняя записанная до первого кадра)
+    #frames кадры визуализации: события visualize и route по порядку времени
+    #times время каждого кадра относительно первого события
+    #links изменения графа после первого кадра: записи links и новые топологии
+    #(topology с разницей ребер и числом узлов до и после), link_frames - число кадров до каждого
+    #sends количество записанных отправок пакетов, dropped - из них не доставленных
+
+    def __init__(self, path: str):
+        self.path = path
+        self.graph = nx.Graph()
+        self.frames: List[TraceEvent] = []
+        self.times: List[float] = []
+        self.links: List[TraceEvent] = []
+        self.link_frames: List[int] = []
+        self.sends = 0
+        self.dropped = 0
+        start: Optional[float] = None
+        num_nodes = 0
+        edges = set()  # ребра (u < v) на текущий момент трассы
+        for event in read_trace(path):
+            if start is None:
+                start = event.time
+            if event.kind == 'topology':
+                new_edges = {(u, v) if u < v else (v, u) for u, v in event.edges}
+                if not self.frames:  # топология для последующих кадров
+                    self.graph = nx.Graph()
+                    self.graph.add_nodes_from(range(event.node))
+                    self.graph.add_edges_from(event.edges)
+                else:  # новая топология посреди записи - изменение графа между кадрами
+                    self.links.append(event._replace(
+                        peer=num_nodes, edges=sorted(new_edges - edges), removed=sorted(edges - new_edges)
+                    ))
+                    self.link_frames.append(len(self.frames))
+                num_nodes, edges = event.node, new_edges
+            elif event.kind == 'links':
+                edges.difference_update((u, v) if u < v else (v, u) for u, v in event.removed)
+                edges.update((u, v) if u < v else (v, u) for u, v in event.edges)
+                if self.frames:
+                    self.links.append(event)
+                    self.link_frames.append(len(self.frames))
+                else:
+                    self.graph.remove_edges_from(event.removed)
+                    self.graph.add_edges_from(event.edges)
+            elif event.kind == 'send':
+                self.sends += 1
+                self.dropped += event.dropped
+            else:
+                self.frames.append(event)
+                self.times.append(event.time - start)
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    @property
+    def duration(self) -> float:
+        return self.times[-1] if self.times else 0.0
+
+    def index_at(self, time: float) -> int:
+        #индекс последнего кадра не позже time (перемотка)
+        return max(0, bisect.bisect_right(self.times, time) - 1)
+
+    def links_at(self, index: int) -> int:
+        #сколько изменений связей произошло до кадра index включительно
+        return bisect.bisect_right(self.link_frames, index)
+
+    def apply_links(self, graph: nx.Graph, applied: int, index: int) -> int:
+        #переводим graph из состояния после applied изменений связей в состояние
+        #кадра index (вперед или назад по трассе), возвращаем новое число изменений
+        target = self.links_at(index)
+        for event in self.links[applied:target]:
+            if event.kind == 'topology':
+                graph.add_nodes_from(range(event.peer, event.node))
+            graph.remove_edges_from(event.removed)
+            graph.add_edges_from(event.edges)
+            if event.kind == 'topology':
+                graph.remove_nodes_from(range(event.node, event.peer))
+        for event in reversed(self.links[target:applied]):
+            if event.kind == 'topology':
+                graph.add_nodes_from(range(event.node, event.peer))
+            graph.remove_edges_from(event.edges)
+            graph.add_edges_from(event.removed)
+            if event.kind == 'topology':
+                graph.remove_nodes_from(range(event.peer, event.node))
+        return target
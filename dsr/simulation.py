@@ -0,0 +1,116 @@
+import heapq
+import itertools
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .network import Network
+from .dsr_protocol import DSRPacket, Route
+from .event_log import ERROR
+
+
+class EventScheduler:
+    #Очередь событий с виртуальными часами (дискретно-событийное моделирование)
+    #now текущее виртуальное время (секунды)
+    #processed количество обработанных событий за все время
+
+    def __init__(self):
+        self.now = 0.0
+        self.processed = 0
+        self._queue: List[Tuple[float, int, Callable, tuple]] = []
+        self._counter = itertools.count()  # порядок событий с одинаковым временем
+
+    def schedule(self, delay: float, callback: Callable, *args):
+        #запланировать вызов callback(*args) через delay виртуальных секунд
+        heapq.heappush(self._queue, (self.now + delay, next(self._counter), callback, args))
+
+    def run(self, until: Optional[float] = None, max_events: Optional[int] = None) -> int:
+        #обрабатываем события по порядку времени, возвращаем их количество
+        queue = self._queue
+        processed = 0
+        while queue:
+            if until is not None and queue[0][0] > until:
+                break
+            if max_events is not None and processed >= max_events:
+                break
+            event_time, _, callback, args = heapq.heappop(queue)
+            self.now = event_time
+            callback(*args)
+            processed += 1
+
+        if until is not None and self.now < until and (not queue or queue[0][0] > until):
+            self.now = until
+        self.processed += processed
+        return processed
+
+    def clear(self):
+        #отбрасываем все запланированные события
+        self._queue.clear()
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+
+class HeadlessNetwork(Network):
+    #Сеть без потоков и без реального ожидания
+    #Пакеты доставляются событиями планировщика с виртуальным временем,
+    #логика узлов (process_rreq/process_rrep) выполняется без изменений.
+    #gui необязательный потребитель событий (log, visualize_step, route_found)
+    #scheduler планировщик событий
+    #start_time виртуальное время запуска последнего discover
+    #found_time виртуальное время нахождения маршрута последним discover
+    #packet_counts число отправленных пакетов по типам (RREQ, RREP)
+
+    def __init__(self, gui=None, delay: float = 1.0):
+        super().__init__(gui)
+        self.scheduler = EventScheduler()
+        self.delay = delay
+        self.start_time: Optional[float] = None
+        self.found_time: Optional[float] = None
+        self.packet_counts: Dict[str, int] = {}
+
+    def now(self) -> float:
+        return self.scheduler.now
+
+    def start_nodes(self):
+        #узлы не запускаются как потоки, их вызывает планировщик
+        pass
+
+    def stop_nodes(self):
+        self.scheduler.clear()
+
+    def send_packet(self, from_node: int, to_node: int, packet: DSRPacket):
+        #вместо sleep планируем событие доставки
+        delay = None
+        if not self.paused:
+            self.packet_counts[packet.type] = self.packet_counts.get(packet.type, 0) + 1
+            if to_node in self.nodes:
+                delay = self.link_model.transmit(self.scheduler.now, from_node, to_node, packet, self.delay)
+        self._on_send(from_node, to_node, packet, delay is None)
+        if delay is not None:
+            self.scheduler.schedule(delay, self._deliver, to_node, packet)
+
+    def _deliver(self, to_node: int, packet: DSRPacket):
+        try:
+            self.nodes[to_node].process_packet(packet)
+        except Exception as e:
+            self.log("Ошибка в узле %s: %s", to_node, e, level=ERROR)
+
+    def run(self, until: Optional[float] = None, max_events: Optional[int] = None) -> int:
+        #выполняем моделирование до опустошения очереди (или до until)
+        #когда событий не осталось, рассылки закончились: сеансы закрываются
+        #(без ответа - результат None), их итоги попадают в metrics
+        processed = self.scheduler.run(until, max_events)
+        if not self.scheduler:
+            self.close_sessions()
+        return processed
+
+    def discover(self, source: int, destination: int) -> Optional[Route]:
+        #поиск маршрута целиком: запуск, моделирование до конца рассылки, результат
+        #(для нескольких одновременных поисков - initiate_communication для каждого, затем run)
+        self.start_time = self.scheduler.now
+        self.found_time = None
+        session = self.initiate_communication(source, destination)
+        self.run()
+        if session is None:
+            return None
+        self.found_time = session.found_time
+        return session.route
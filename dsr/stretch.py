@@ -0,0 +1,432 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import random
+import sys
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .adjacency import Adjacency
+from .batch import choose_pairs
+from .dsr_protocol import DSRPacket
+from .network_topology import NetworkTopologyGenerator
+from .simulation import HeadlessNetwork
+from .traffic import summarize_latencies
+from ._lazy import lazy_import
+
+nx = lazy_import('networkx')
+np = lazy_import('numpy')
+
+
+#Растяжение маршрутов DSR относительно кратчайших путей по всем парам
+#Эталон - кратчайшее число переходов для всех пар (shortest_hops): поиск в
+#ширину сразу от многих источников, фронт - булева матрица (источники x узлы),
+#шаг фронта - одна выборка по массиву смежности CSR и logical_or.reduceat.
+#
+#Режимы поиска маршрутов:
+#  flood - одна рассылка RREQ на источник (FloodNetwork) отвечает за всех
+#          назначений: первый RREQ, пришедший к узлу, - тот, на который он
+#          ответил бы как назначение (его собственное поведение на приход не
+#          влияет). Это поиск с холодными кэшами, N рассылок вместо N^2 поисков.
+#  pairs - настоящие поиски по очереди (network.discover), кэши маршрутов
+#          узлов как в batch.py: растяжение дают ответы из кэшей.
+
+MODES = ('flood', 'pairs')
+
+NO_DESTINATION = -1  # назначение рассылки flood: такого узла нет, RREQ доходит до всех
+
+CSV_FIELDS = ['source', 'destination', 'found', 'hops', 'optimal', 'stretch', 'latency', 'rreq', 'rrep']
+
+
+def shortest_hops(adjacency: Adjacency, sources: Optional[Sequence[int]] = None,
+                  block_bytes: int = 1 << 25) -> np.ndarray:
+    #кратчайшее число переходов от sources (по умолчанию все узлы) до всех узлов,
+    #матрица (len(sources), N) int32, -1 - узел недостижим
+    #block_bytes ограничение памяти на блок источников (выборка фронта по всем ребрам)
+    n = adjacency.num_nodes
+    sources = np.arange(n) if sources is None else np.asarray(sources, dtype=np.int64)
+    dist = np.full((len(sources), n), -1, dtype=np.int32)
+    if not len(sources):
+        return dist
+    indices = np.asarray(adjacency.indices, dtype=np.intp)
+    degrees = adjacency.degrees()
+    linked = degrees > 0
+    # reduceat по началам непустых списков соседей: отрезок узла - ровно его соседи
+    starts = np.asarray(adjacency.offsets[:-1], dtype=np.intp)[linked]
+    block = max(1, block_bytes // max(1, len(indices)))
+
+    for lo in range(0, len(sources), block):
+        rows = sources[lo:lo + block]
+        part = dist[lo:lo + block]
+        index = np.arange(len(rows))
+        frontier = np.zeros((len(rows), n), dtype=bool)
+        frontier[index, rows] = True
+        visited = frontier.copy()
+        part[index, rows] = 0
+        level = 0
+        while len(starts) and frontier.any():
+            level += 1
+            reached = np.zeros_like(frontier)
+            # узел достигнут, если хотя бы один его сосед во фронте
+            reached[:, linked] = np.logical_or.reduceat(frontier[:, indices], starts, axis=1)
+            reached &= ~visited
+            part[reached] = level
+            visited |= reached
+            frontier = reached
+    return dist
+
+
+class FloodNetwork(HeadlessNetwork):
+    #Рассылка RREQ от одного источника без назначения (режим flood)
+    #flood(source) - переходы и время прихода первого RREQ к каждому узлу и
+    #число RREQ, отправленных каждым узлом. Узлы и планировщик - обычные.
+
+    def __init__(self, gui=None, delay: float = 1.0):
+        super().__init__(gui, delay)
+        self._flood: Optional[Tuple[int, int]] = None  # (источник, идентификатор RREQ)
+        self._hops: List[int] = []
+        self._arrival: List[float] = []
+        self._sends: List[int] = []
+
+    def flood(self, source: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        #(переходы, время прихода от начала рассылки, отправлено RREQ) по узлам
+        #недостигнутые узлы: переходы -1, время nan
+        n = len(self.nodes)
+        self._hops = [-1] * n
+        self._arrival = [float('nan')] * n
+        self._sends = [0] * n
+        node = self.nodes[source]
+        self._flood = (source, node.next_request_id())
+        started = self.scheduler.now
+        try:
+            node.initiate_route_discovery(NO_DESTINATION, self._flood[1])
+            self.run()
+        finally:
+            self._flood = None
+        arrival = np.array(self._arrival) - started
+        return np.array(self._hops, dtype=np.int32), arrival, np.array(self._sends, dtype=np.int64)
+
+    def send_packet(self, from_node: int, to_node: int, packet: DSRPacket):
+        if self._flood is not None and packet.type == 'RREQ':
+            self._sends[from_node] += 1
+        super().send_packet(from_node, to_node, packet)
+
+    def visualize_step(self, packet: DSRPacket, current_node: int):
+        #вызывается узлом один раз на первый (не повторный) RREQ
+        flood = self._flood
+        if flood is not None and packet.type == 'RREQ' and (packet.source, packet.packet_id) == flood:
+            self._hops[current_node] = len(packet.route) if current_node != flood[0] else 0
+            self._arrival[current_node] = self.scheduler.now
+        super().visualize_step(packet, current_node)
+
+
+class CutIndex:
+    #Компоненты графа без каждой точки сочленения a (networkx, один раз на топологию)
+    #В поиске s -> a узел a не пересылает RREQ, и узлы, отрезанные им от s,
+    #RREQ не получают - их отправки вычитаются из рассылки (cut).
+
+    def __init__(self, adjacency: Adjacency):
+        graph = adjacency.to_networkx()
+        self.points = np.array(sorted(nx.articulation_points(graph)), dtype=np.int64)
+        n = adjacency.num_nodes
+        # labels[i, v] - номер компоненты v в графе без points[i] (сквозной), -1 у самой точки
+        self.labels = np.full((len(self.points), n), -1, dtype=np.int64)
+        self.num_labels = 0
+        for i, point in enumerate(self.points.tolist()):
+            rest = graph.subgraph(v for v in graph if v != point)
+            for component in nx.connected_components(rest):
+                self.labels[i, list(component)] = self.num_labels
+                self.num_labels += 1
+
+    def cut(self, source: int, sends: np.ndarray) -> np.ndarray:
+        #отправки узлов, отрезанных от source, для каждого назначения (0 не у точек сочленения)
+        result = np.zeros(self.labels.shape[1], dtype=np.int64)
+        if not len(self.points):
+            return result
+        valid = self.labels >= 0
+        weights = np.bincount(self.labels[valid], weights=np.broadcast_to(sends, self.labels.shape)[valid],
+                              minlength=self.num_labels)
+        total = sends.sum() - sends[self.points]  # отправки всех, кроме самой точки
+        own = weights[self.labels[:, source]]  # компонента источника
+        own[self.points == source] = total[self.points == source]  # источник - сама точка: ничего не отрезано
+        result[self.points] = np.rint(total - own).astype(np.int64)
+        return result
+
+
+class PairResults:
+    #итоги по парам (массивы одной длины), optimal - эталон shortest_hops
+    #hops -1 - маршрут не найден, stretch nan - нет маршрута или эталона
+
+    def __init__(self, sources, destinations, hops, optimal, latency, rreq, rrep):
+        self.sources = np.asarray(sources, dtype=np.int32)
+        self.destinations = np.asarray(destinations, dtype=np.int32)
+        self.hops = np.asarray(hops, dtype=np.int32)
+        self.optimal = np.asarray(optimal, dtype=np.int32)
+        self.latency = np.asarray(latency, dtype=np.float64)
+        self.rreq = np.asarray(rreq, dtype=np.int64)
+        self.rrep = np.asarray(rrep, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.sources)
+
+    @property
+    def found(self) -> np.ndarray:
+        return self.hops >= 0
+
+    @property
+    def stretch(self) -> np.ndarray:
+        valid = self.found & (self.optimal > 0)
+        result = np.full(len(self), np.nan)
+        result[valid] = self.hops[valid] / self.optimal[valid]
+        return result
+
+    def rows(self):
+        #строки CSV по парам
+        stretch = self.stretch
+        for i in range(len(self)):
+            found = bool(self.hops[i] >= 0)
+            yield {
+                'source': int(self.sources[i]),
+                'destination': int(self.destinations[i]),
+                'found': found,
+                'hops': int(self.hops[i]) if found else None,
+                'optimal': int(self.optimal[i]) if self.optimal[i] >= 0 else None,
+                'stretch': float(stretch[i]) if stretch[i] == stretch[i] else None,
+                'latency': float(self.latency[i]) if found else None,
+                'rreq': int(self.rreq[i]),
+                'rrep': int(self.rrep[i]),
+            }
+
+    def summary(self) -> dict:
+        found = self.found
+        stretch = self.stretch
+        valid = ~np.isnan(stretch)
+        extra = (self.hops - self.optimal)[valid]
+        values, counts = np.unique(extra, return_counts=True)
+        control = self.rreq + self.rrep
+        return {
+            'pairs': len(self),
+            'found': int(found.sum()),
+            'unreachable': int((self.optimal < 0).sum()),
+            'optimal_share': float((extra == 0).mean()) if len(extra) else None,
+            'stretch': summarize_latencies(stretch[valid]),
+            'extra_hops': {str(int(value)): int(count) for value, count in zip(values, counts)},
+            'hops': summarize_latencies(self.hops[found]),
+            'optimal_hops': summarize_latencies(self.optimal[self.optimal > 0]),
+            'latency': summarize_latencies(self.latency[found]),
+            'rreq': summarize_latencies(self.rreq),
+            'rrep': summarize_latencies(self.rrep),
+            'control': summarize_latencies(control),
+            'control_per_found': float(control.sum() / found.sum()) if found.any() else None,
+        }
+
+
+def links_uniform(network: HeadlessNetwork) -> bool:
+    #все каналы одинаковые и без случайности: рассылка flood повторяет отдельные поиски точно
+    default = network.link_model.default
+    return (not network.link_model._links and default.jitter == 0.0 and default.loss == 0.0
+            and default.bandwidth is None)
+
+
+def flood_pairs(network: FloodNetwork, sources: Optional[Sequence[int]] = None,
+                optimal: Optional[np.ndarray] = None) -> PairResults:
+    #все назначения для каждого источника по одной рассылке
+    #rreq пары - RREQ рассылки без пересылок назначения и отрезанных им узлов,
+    #rrep - по одному на переход обратно, задержка - RREQ туда и RREP обратно
+    #за то же время (точно при links_uniform)
+    n = len(network.nodes)
+    sources = list(range(n)) if sources is None else list(sources)
+    if optimal is None:
+        optimal = shortest_hops(network.adjacency, sources)
+    cuts = CutIndex(network.adjacency)
+    others = np.arange(n)
+    columns: Dict[str, list] = {key: [] for key in ('sources', 'destinations', 'hops', 'optimal',
+                                                    'latency', 'rreq', 'rrep')}
+    for row, source in enumerate(sources):
+        hops, arrival, sends = network.flood(source)
+        rreq = sends.sum() - sends - cuts.cut(source, sends)
+        keep = others != source
+        found = hops[keep] >= 0
+        columns['sources'].append(np.full(n - 1, source))
+        columns['destinations'].append(others[keep])
+        columns['hops'].append(hops[keep])
+        columns['optimal'].append(optimal[row][keep])
+        columns['latency'].append(np.where(found, 2 * arrival[keep], np.nan))
+        columns['rreq'].append(rreq[keep])
+        columns['rrep'].append(np.where(found, hops[keep], 0))
+    if not sources:
+        return PairResults(*([] for _ in columns))
+    return PairResults(*(np.concatenate(columns[key]) for key in columns))
+
+
+def discover_pairs(network: HeadlessNetwork, pairs: Sequence[Tuple[int, int]],
+                   optimal: Optional[np.ndarray] = None) -> PairResults:
+    #настоящие поиски по очереди (кэши маршрутов узлов - как настроены в сети)
+    #optimal - строки shortest_hops по источникам пар в порядке sorted(set(...))
+    sources = sorted({source for source, _ in pairs})
+    if optimal is None:
+        optimal = shortest_hops(network.adjacency, sources)
+    row = {source: i for i, source in enumerate(sources)}
+    hops, best, latency, rreq, rrep = [], [], [], [], []
+    for source, destination in pairs:
+        session = network.initiate_communication(source, destination)
+        network.run()
+        route = session.route
+        hops.append(len(route) - 1 if route else -1)
+        best.append(optimal[row[source], destination])
+        latency.append(session.latency if route else float('nan'))
+        rreq.append(session.rreq)
+        rrep.append(session.rrep)
+    return PairResults([s for s, _ in pairs], [d for _, d in pairs], hops, best, latency, rreq, rrep)
+
+
+def run_stretch(num_nodes: int, seed: int, mode: str = 'flood', num_pairs: Optional[int] = None,
+                delay: float = 1.0, use_cache: bool = True, method: str = 'incremental',
+                num_edges: Optional[int] = None, jitter: float = 0.0, loss: float = 0.0,
+                bandwidth: Optional[float] = None, topology: Optional[str] = None) -> Tuple[dict, PairResults]:
+    #топология по seed (или из файла topology), эталон и поиски для всех пар (num_pairs - случайная выборка)
+    #use_cache только для mode='pairs' (flood - всегда холодные кэши)
+    if mode not in MODES:
+        raise ValueError(f"Неизвестный режим анализа: {mode}")
+    network = FloodNetwork(delay=delay) if mode == 'flood' else HeadlessNetwork(delay=delay)
+    network.metrics = None  # счетчики пар считаются здесь
+    if not use_cache:
+        network.configure_route_cache(None, 0)
+    network.configure_links(None, jitter, loss, bandwidth, seed)
+    if topology:
+        network.load_topology(topology)
+        num_nodes = network.adjacency.num_nodes
+    else:
+        network.create_topology(num_nodes, seed, method, num_edges)
+    if num_pairs is None:
+        pairs = [(s, d) for s in range(num_nodes) for d in range(num_nodes) if s != d]
+    else:
+        pairs = choose_pairs(num_nodes, num_pairs, random.Random(seed))
+    sources = sorted({source for source, _ in pairs})
+
+    started = time.perf_counter()
+    optimal = shortest_hops(network.adjacency, sources)
+    oracle_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    if mode == 'flood':
+        results = flood_pairs(network, sources, optimal)
+        if num_pairs is not None:  # из рассылок - только выбранные пары (строки идут по источникам)
+            row = {source: i for i, source in enumerate(sources)}
+            picked = np.array([row[s] * (num_nodes - 1) + (d if d < s else d - 1) for s, d in pairs],
+                              dtype=np.int64)
+            results = PairResults(results.sources[picked], results.destinations[picked], results.hops[picked],
+                                  results.optimal[picked], results.latency[picked], results.rreq[picked],
+                                  results.rrep[picked])
+    else:
+        results = discover_pairs(network, pairs, optimal)
+    discovery_s = time.perf_counter() - started
+
+    summary = results.summary()
+    summary['oracle_s'] = oracle_s
+    summary['discovery_s'] = discovery_s
+    report = {
+        'config': {
+            'nodes': num_nodes,
+            'edges': network.adjacency.num_edges,
+            'seed': seed,
+            'generator': method,
+            'topology': topology,
+            'mode': mode,
+            'pairs': num_pairs,
+            'delay': delay,
+            'cache': use_cache if mode == 'pairs' else False,
+            'jitter': jitter,
+            'loss': loss,
+            'bandwidth': bandwidth,
+            'exact': mode == 'pairs' or links_uniform(network),
+        },
+        'summary': summary,
+    }
+    return report, results
+
+
+def write_csv(results: PairResults, stream):
+    writer = csv.DictWriter(stream, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    writer.writerows(results.rows())
+
+
+def format_summary(report: dict) -> str:
+    config = report['config']
+    summary = report['summary']
+
+    def stats(values, spec='.3f'):
+        return ', '.join(f"{key}={format(x, spec) if x is not None else '-'}" for key, x in values.items())
+
+    share = summary['optimal_share']
+    extra = ', '.join(f"+{hops}: {count}" for hops, count in summary['extra_hops'].items())
+    lines = [
+        f"Топология: {config['nodes']} узлов, {config['edges']} связей, seed={config['seed']}, "
+        f"режим {config['mode']}" + ('' if config['exact'] else ' (RREQ и задержка - оценка)'),
+        f"Пар: {summary['pairs']}, найдено {summary['found']}, недостижимо {summary['unreachable']}",
+        f"Кратчайших маршрутов: {share * 100:.1f}%" if share is not None else "Кратчайших маршрутов: -",
+        f"Растяжение: {stats(summary['stretch'])}",
+        f"Лишних переходов: {extra or '-'}",
+        f"RREQ на пару: {stats(summary['rreq'], '.1f')}",
+        f"RREP на пару: {stats(summary['rrep'], '.1f')}",
+        f"Эталон {summary['oracle_s']:.2f} с, поиски {summary['discovery_s']:.2f} с",
+    ]
+    return '\n'.join(lines)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Растяжение маршрутов DSR относительно кратчайших путей и служебный трафик по парам"
+    )
+    parser.add_argument('--nodes', type=int, default=50, help="количество узлов")
+    parser.add_argument('--seed', type=int, default=0, help="seed топологии и выбора пар")
+    parser.add_argument('--generator', choices=NetworkTopologyGenerator.METHODS, default='incremental',
+                        help="способ построения топологии")
+    parser.add_argument('--edges', type=int, help="точное число ребер (для --generator constructive)")
+    parser.add_argument('--topology', help="файл топологии (см. dsr topology) вместо --nodes/--generator")
+    parser.add_argument('--mode', choices=MODES, default='flood',
+                        help="flood - рассылка на источник (холодные кэши), pairs - поиски по очереди")
+    parser.add_argument('--pairs', type=int, help="случайные пары вместо всех N*(N-1)")
+    parser.add_argument('--delay', type=float, default=1.0, help="задержка одного перехода (вирт. с)")
+    parser.add_argument('--no-cache', action='store_true', help="отключить кэш маршрутов узлов (--mode pairs)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="разброс задержки канала (вирт. с)")
+    parser.add_argument('--loss', type=float, default=0.0, help="вероятность потери пакета в канале")
+    parser.add_argument('--bandwidth', type=float, help="пропускная способность канала (байт/вирт. с)")
+    parser.add_argument('--csv', help="файл итогов по парам (CSV)")
+    parser.add_argument('--output', '-o', help="файл отчета JSON (по умолчанию stdout)")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.nodes < 2:
+        print("Ошибка: количество узлов должно быть не меньше 2", file=sys.stderr)
+        return 2
+
+    try:
+        report, results = run_stretch(args.nodes, args.seed, args.mode, args.pairs, args.delay,
+                                      not args.no_cache, args.generator, args.edges,
+                                      args.jitter, args.loss, args.bandwidth, args.topology)
+    except ValueError as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 2
+
+    if args.csv:
+        with open(args.csv, 'w', newline='', encoding='utf-8') as f:
+            write_csv(results, f)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+    else:
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write('\n')
+    print(format_summary(report), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
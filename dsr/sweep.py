@@ -0,0 +1,189 @@
+import argparse
+import csv
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Set, Tuple
+
+from .batch import run_batch
+from .topology_file import content_hash, read_metadata
+
+
+#Перебор параметров (узлы x seed x пары) в нескольких процессах без GUI
+#Каждая точка сетки - отдельный запуск batch.run_batch в рабочем процессе.
+#Результаты дописываются в CSV по мере готовности, поэтому прерванный перебор
+#продолжается с --resume. Топология и пары зависят только от seed,
+#значит строка результата для точки сетки всегда одна и та же (кроме wall_ms).
+#С --topology все точки используют одну сохраненную топологию: рабочие процессы
+#открывают файл через отображение в память, страницы общие и только для чтения.
+#Столбец topology - хэш содержимого файла (пусто для сгенерированных топологий),
+#поэтому --resume не смешивает точки разных топологий в одной таблице.
+
+KEY_FIELDS = ['nodes', 'seed', 'pairs', 'delay', 'cache', 'topology']
+FIELDS = KEY_FIELDS + [
+    'edges', 'discoveries', 'found',
+    'latency_mean', 'latency_p50', 'latency_p90', 'latency_p99', 'latency_max',
+    'hops_mean', 'hops_max',
+    'rreq_total', 'rrep_total', 'rreq_mean', 'rrep_mean',
+    'wall_ms_mean', 'wall_ms_p99',
+]
+
+Point = Tuple[int, int, int, float, bool, str]  # nodes, seed, pairs, delay, cache, topology
+
+
+def parse_ints(values: List[str]) -> List[int]:
+    #числа и диапазоны вида 0-9 (включительно)
+    result = []
+    for value in values:
+        if '-' in value.lstrip('-'):
+            start, end = value.split('-', 1)
+            result.extend(range(int(start), int(end) + 1))
+        else:
+            result.append(int(value))
+    return result
+
+
+def build_grid(nodes: List[int], seeds: List[int], pairs: List[int],
+               delay: float, cache: bool, topology: str = '') -> List[Point]:
+    #topology хэш файла топологии (content_hash), '' - топология генерируется
+    return [(n, s, p, delay, cache, topology) for n, s, p in itertools.product(nodes, seeds, pairs)]
+
+
+def point_key(row: Dict) -> Tuple[str, ...]:
+    #ключ точки сетки в текстовом виде (как в CSV)
+    #(строки таблиц без столбца topology - сгенерированные топологии)
+    return tuple(str(row.get(field, '')) for field in KEY_FIELDS)
+
+
+def run_point(point: Point, topology: Optional[str] = None) -> Dict:
+    #выполняется в рабочем процессе: одна точка сетки, строка таблицы
+    #topology файл топологии (seed точки тогда задает только пары)
+    num_nodes, seed, num_pairs, delay, cache, topology_hash = point
+    report = run_batch(num_nodes, seed, num_pairs, delay, cache, topology=topology)
+    summary = report['summary']
+    return {
+        'nodes': num_nodes,
+        'seed': seed,
+        'pairs': num_pairs,
+        'delay': delay,
+        'cache': cache,
+        'topology': topology_hash,
+        'edges': report['config']['edges'],
+        'discoveries': summary['discoveries'],
+        'found': summary['found'],
+        'latency_mean': summary['latency']['mean'],
+        'latency_p50': summary['latency']['p50'],
+        'latency_p90': summary['latency']['p90'],
+        'latency_p99': summary['latency']['p99'],
+        'latency_max': summary['latency']['max'],
+        'hops_mean': summary['hops']['mean'],
+        'hops_max': summary['hops']['max'],
+        'rreq_total': summary['rreq_total'],
+        'rrep_total': summary['rrep_total'],
+        'rreq_mean': summary['rreq_per_discovery']['mean'],
+        'rrep_mean': summary['rrep_per_discovery']['mean'],
+        'wall_ms_mean': summary['wall_ms']['mean'],
+        'wall_ms_p99': summary['wall_ms']['p99'],
+    }
+
+
+def read_rows(path: str) -> List[Dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def write_rows(path: str, rows: List[Dict]):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def sort_rows(rows: List[Dict]) -> List[Dict]:
+    return sorted(rows, key=lambda row: (int(row['nodes']), int(row['seed']), int(row['pairs'])))
+
+
+def run_sweep(grid: List[Point], output: str, workers: Optional[int] = None,
+              resume: bool = False, progress=None, topology: Optional[str] = None) -> List[Dict]:
+    #распределяем точки сетки по процессам, результат - одна таблица в output
+    #resume пропускает точки, уже записанные в output
+    done: Set[Tuple[str, ...]] = set()
+    if resume and os.path.exists(output):
+        rows = read_rows(output)
+        done = {point_key(row) for row in rows}
+        write_rows(output, rows)  # таблица прежнего формата (без topology) получает все столбцы
+    else:
+        write_rows(output, [])
+
+    todo = [point for point in grid if point_key(dict(zip(KEY_FIELDS, point))) not in done]
+
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers) as pool, \
+                open(output, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            futures = [pool.submit(run_point, point, topology) for point in todo]
+            for finished, future in enumerate(as_completed(futures), 1):
+                writer.writerow(future.result())
+                f.flush()  # строка на диске - точка не будет пересчитана при --resume
+                if progress:
+                    progress(finished, len(todo))
+
+    # итоговая таблица упорядочена по сетке
+    rows = sort_rows(read_rows(output))
+    write_rows(output, rows)
+    return rows
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Перебор параметров DSR в нескольких процессах (без GUI)"
+    )
+    parser.add_argument('--nodes', nargs='+', default=['50'], help="количества узлов (например 50 100 200)")
+    parser.add_argument('--seeds', nargs='+', default=['0-9'], help="seed или диапазоны (например 0-9)")
+    parser.add_argument('--pairs', nargs='+', default=['100'], help="количества пар источник/назначение")
+    parser.add_argument('--delay', type=float, default=1.0, help="задержка одного перехода (вирт. с)")
+    parser.add_argument('--topology', help="одна сохраненная топология для всех точек (--nodes берется из нее)")
+    parser.add_argument('--no-cache', action='store_true', help="отключить кэш маршрутов узлов")
+    parser.add_argument('--workers', type=int, help="число процессов (по умолчанию - все ядра)")
+    parser.add_argument('--resume', action='store_true', help="продолжить прерванный перебор")
+    parser.add_argument('--output', '-o', default='sweep.csv', help="файл таблицы результатов")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    nodes = parse_ints(args.nodes)
+    topology_hash = ''
+    if args.topology:
+        try:
+            nodes = [read_metadata(args.topology)['nodes']]
+            topology_hash = content_hash(args.topology)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ошибка: не удалось прочитать топологию {args.topology}: {e}", file=sys.stderr)
+            return 2
+    if min(nodes) < 2:
+        print("Ошибка: количество узлов должно быть не меньше 2", file=sys.stderr)
+        return 2
+
+    grid = build_grid(nodes, parse_ints(args.seeds), parse_ints(args.pairs), args.delay, not args.no_cache,
+                      topology_hash)
+    started = time.perf_counter()
+
+    def progress(finished, total):
+        print(f"\r{finished}/{total}", end='', file=sys.stderr, flush=True)
+
+    rows = run_sweep(grid, args.output, args.workers, args.resume, progress, args.topology)
+    print(
+        f"\nТочек сетки: {len(grid)}, строк в {args.output}: {len(rows)}, "
+        f"{time.perf_counter() - started:.1f} с",
+        file=sys.stderr
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
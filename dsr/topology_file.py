@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import struct
+import sys
+from typing import Dict, List, Optional
+
+from .adjacency import Adjacency
+from ._lazy import lazy_import
+
+np = lazy_import('numpy')
+
+
+#Сохранение и загрузка топологии: смежность, положения узлов, метаданные (seed, способ построения)
+#Форматы:
+#  binary   - заголовок MAGIC, <длина:I> + JSON (метаданные и таблица массивов:
+#             dtype, shape, смещение), затем массивы CSR offsets/indices и
+#             positions, каждый с границы 64 байт. Загрузка - np.memmap только
+#             для чтения: файл с миллионом ребер открывается сразу, и страницы
+#             общие у всех процессов, открывших один файл (рабочие процессы sweep).
+#  edgelist - текст: строка "# dsr-topology {JSON}", строки "# pos узел x y",
+#             затем "u v" на ребро (читается и nx.read_edgelist)
+#Соседи в Adjacency упорядочены по номеру, поэтому обе формы дают ту же
+#смежность, что и генератор, и те же результаты моделирования.
+
+MAGIC = b'DSRTOPO1'
+FORMATS = ('binary', 'edgelist')
+EDGELIST_SUFFIXES = ('.edges', '.edgelist', '.txt')
+ALIGN = 64
+
+_LENGTH = struct.Struct('<I')
+_EDGELIST_HEADER = '# dsr-topology '
+
+
+class StoredTopology:
+    #загруженная топология
+    #adjacency смежность (для binary - поверх np.memmap, только чтение)
+    #positions положения узлов (N, 2) или None
+    #metadata словарь метаданных (nodes, edges, seed, method, num_edges, ...)
+
+    def __init__(self, adjacency: Adjacency, positions: Optional[np.ndarray] = None,
+                 metadata: Optional[dict] = None):
+        self.adjacency = adjacency
+        self.positions = positions
+        self.metadata = dict(metadata or {})
+
+    @property
+    def num_nodes(self) -> int:
+        return self.adjacency.num_nodes
+
+
+def topology_format(path: str, fmt: Optional[str] = None) -> str:
+    #формат по явному fmt или расширению файла (.edges, .edgelist, .txt - edgelist)
+    if fmt is None:
+        fmt = 'edgelist' if os.path.splitext(path)[1].lower() in EDGELIST_SUFFIXES else 'binary'
+    if fmt not in FORMATS:
+        raise ValueError(f"Неизвестный формат файла топологии: {fmt}")
+    return fmt
+
+
+def _metadata(adjacency: Adjacency, metadata: Optional[dict]) -> dict:
+    result = dict(metadata or {})
+    result['nodes'] = adjacency.num_nodes
+    result['edges'] = adjacency.num_edges
+    result['hash'] = adjacency.content_hash()
+    if adjacency.assumed:
+        result['assumed'] = adjacency.assumed
+    return result
+
+
+def _check_positions(adjacency: Adjacency, positions) -> Optional[np.ndarray]:
+    if positions is None:
+        return None
+    positions = np.asarray(positions, dtype=np.float64)
+    if positions.shape != (adjacency.num_nodes, 2):
+        raise ValueError(f"Положения узлов должны быть массивом ({adjacency.num_nodes}, 2), "
+                         f"получено {positions.shape}")
+    return positions
+
+
+def save_topology(path: str, adjacency: Adjacency, positions=None, metadata: Optional[dict] = None,
+                  fmt: Optional[str] = None):
+    #сохраняем смежность, положения (None - без них) и метаданные в формате fmt
+    positions = _check_positions(adjacency, positions)
+    metadata = _metadata(adjacency, metadata)
+    if topology_format(path, fmt) == 'edgelist':
+        _save_edgelist(path, adjacency, positions, metadata)
+    else:
+        _save_binary(path, adjacency, positions, metadata)
+
+
+def load_topology(path: str, mmap: bool = True, fmt: Optional[str] = None) -> StoredTopology:
+    #загрузка; mmap - массивы binary отображаются в память, а не читаются
+    if topology_format(path, fmt) == 'edgelist':
+        return _load_edgelist(path)
+    return _load_binary(path, mmap)
+
+
+def read_metadata(path: str, fmt: Optional[str] = None) -> dict:
+    #только метаданные (без чтения массивов или ребер)
+    with open(path, 'rb') as f:
+        if topology_format(path, fmt) == 'edgelist':
+            line = f.readline().decode('utf-8')
+            if not line.startswith(_EDGELIST_HEADER):
+                return {}
+            return json.loads(line[len(_EDGELIST_HEADER):])
+        return _read_header(f, path)['metadata']
+
+
+def content_hash(path: str, fmt: Optional[str] = None) -> str:
+    #хэш топологии в файле: из метаданных, для файлов без него (сохранены раньше,
+    #простой список ребер) - по загруженной смежности
+    digest = read_metadata(path, fmt).get('hash')
+    if digest is None:
+        digest = load_topology(path, fmt=fmt).adjacency.content_hash()
+    return digest
+
+
+def _save_binary(path: str, adjacency: Adjacency, positions: Optional[np.ndarray], metadata: dict):
+    arrays = {
+        'offsets': np.asarray(adjacency.offsets).astype('<i8', copy=False),
+        'indices': np.asarray(adjacency.indices).astype('<i4', copy=False),
+    }
+    if positions is not None:
+        arrays['positions'] = positions.astype('<f8', copy=False)
+
+    def header(offset: int) -> bytes:
+        table = {}
+        for name, values in arrays.items():
+            table[name] = {'dtype': values.dtype.str, 'shape': list(values.shape), 'offset': offset}
+            offset = _aligned(offset + values.nbytes)
+        return json.dumps({'metadata': metadata, 'arrays': table}, ensure_ascii=False).encode('utf-8')
+
+    # длина заголовка зависит от смещений массивов, а смещения - от длины заголовка:
+    # пересчитываем, пока не сойдется (обычно хватает двух проходов)
+    start = 0
+    data = header(start)
+    while _aligned(len(MAGIC) + _LENGTH.size + len(data)) != start:
+        start = _aligned(len(MAGIC) + _LENGTH.size + len(data))
+        data = header(start)
+
+    with open(path, 'wb') as f:
+        f.write(MAGIC + _LENGTH.pack(len(data)) + data)
+        for values in arrays.values():
+            f.write(b'\0' * (_aligned(f.tell()) - f.tell()))
+            f.write(values.tobytes())
+
+
+def _aligned(offset: int) -> int:
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def _read_header(f, path: str) -> dict:
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError(f"Файл {path} не является топологией DSR")
+    (length,) = _LENGTH.unpack(f.read(_LENGTH.size))
+    return json.loads(f.read(length).decode('utf-8'))
+
+
+def _load_binary(path: str, mmap: bool) -> StoredTopology:
+    with open(path, 'rb') as f:
+        header = _read_header(f, path)
+        arrays = {}
+        for name, spec in header['arrays'].items():
+            shape = tuple(spec['shape'])
+            if mmap and int(np.prod(shape)):
+                arrays[name] = np.memmap(path, dtype=spec['dtype'], mode='r', offset=spec['offset'], shape=shape)
+            else:  # пустой массив не отображается
+                f.seek(spec['offset'])
+                count = int(np.prod(shape))
+                arrays[name] = np.fromfile(f, dtype=spec['dtype'], count=count).reshape(shape)
+    metadata = header['metadata']
+    num_nodes = len(arrays['offsets']) - 1
+    if int(arrays['offsets'][-1]) != len(arrays['indices']):
+        raise ValueError(f"Файл топологии {path} поврежден: смещения не совпадают с числом соседей")
+    adjacency = Adjacency(num_nodes, arrays['offsets'], arrays['indices'], metadata.get('assumed'))
+    return StoredTopology(adjacency, arrays.get('positions'), metadata)
+
+
+def _save_edgelist(path: str, adjacency: Adjacency, positions: Optional[np.ndarray], metadata: dict):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(_EDGELIST_HEADER + json.dumps(metadata, ensure_ascii=False) + '\n')
+        if positions is not None:
+            for node, (x, y) in enumerate(positions.tolist()):
+                f.write(f"# pos {node} {x!r} {y!r}\n")
+        np.savetxt(f, adjacency.edges(), fmt='%d')
+
+
+def _load_edgelist(path: str) -> StoredTopology:
+    metadata: dict = {}
+    positions: Dict[int, List[float]] = {}
+    edges = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.startswith(_EDGELIST_HEADER):
+                metadata = json.loads(line[len(_EDGELIST_HEADER):])
+            elif line.startswith('# pos '):
+                node, x, y = line.split()[2:5]
+                positions[int(node)] = [float(x), float(y)]
+            elif line.strip() and not line.startswith('#'):
+                u, v = line.split()[:2]  # остальные поля (веса nx.write_edgelist) не нужны
+                edges.append((int(u), int(v)))
+    num_nodes = metadata.get('nodes')
+    if num_nodes is None:  # обычный список ребер без заголовка
+        num_nodes = max((max(u, v) for u, v in edges), default=-1) + 1
+    adjacency = Adjacency.from_edges(num_nodes, edges, metadata.get('assumed'))
+    metadata = _metadata(adjacency, metadata)
+    if positions and len(positions) != num_nodes:
+        raise ValueError(f"В {path} положения заданы не для всех узлов ({len(positions)} из {num_nodes})")
+    points = np.array([positions[node] for node in range(num_nodes)]) if positions else None
+    return StoredTopology(adjacency, points, metadata)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    from .network_topology import NetworkTopologyGenerator
+
+    parser = argparse.ArgumentParser(description="Создание, преобразование и просмотр файлов топологии DSR")
+    parser.add_argument('input', nargs='?', help="файл топологии (без --nodes: показать или преобразовать)")
+    parser.add_argument('--nodes', type=int, help="создать топологию с этим числом узлов")
+    parser.add_argument('--seed', type=int, default=0, help="seed топологии")
+    parser.add_argument('--generator', choices=NetworkTopologyGenerator.METHODS, default='incremental',
+                        help="способ построения топологии")
+    parser.add_argument('--edges', type=int, help="точное число ребер (для --generator constructive)")
+    parser.add_argument('--format', choices=FORMATS, help="формат результата (по умолчанию - по расширению)")
+    parser.add_argument('--output', '-o', help="файл результата")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from .network_topology import NetworkTopologyGenerator
+
+    args = build_parser().parse_args(argv)
+    try:
+        if args.nodes is not None:
+            if not args.output:
+                print("Ошибка: для новой топологии нужен --output", file=sys.stderr)
+                return 2
+            adjacency = NetworkTopologyGenerator.create_adjacency(args.nodes, args.seed, args.generator, args.edges)
+            topology = StoredTopology(adjacency, None, {
+                'seed': args.seed, 'method': args.generator, 'num_edges': args.edges,
+            })
+        elif args.input:
+            topology = load_topology(args.input)
+        else:
+            print("Ошибка: укажите файл топологии или --nodes", file=sys.stderr)
+            return 2
+        if args.output:
+            save_topology(args.output, topology.adjacency, topology.positions, topology.metadata, args.format)
+    except (OSError, ValueError) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 2
+
+    metadata = topology.metadata if args.output is None else read_metadata(args.output, args.format)
+    json.dump(metadata, sys.stdout, ensure_ascii=False, indent=2)
+    sys.stdout.write('\n')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,393 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import itertools
+import json
+import random
+import sys
+import time
+from typing import Dict, List, Optional
+
+from .batch import choose_pairs
+from .dsr_protocol import DataPacket, Route, route_uses_link
+from .metrics import FlowStats
+from .network_topology import NetworkTopologyGenerator
+from .simulation import HeadlessNetwork
+from ._lazy import lazy_import
+
+np = lazy_import('numpy')
+
+
+#Передача данных по найденным маршрутам без GUI: потоки CBR и Poisson
+#Поток сначала ищет маршрут (обычный сеанс DiscoverySession), после первого RREP
+#источник отправляет пакеты DATA с маршрутом в заголовке, узлы пересылают их
+#по маршруту (Node.process_data). Итоги: доставка, потери, пропускная способность,
+#процентили задержки (время сети от отправки до доставки).
+#Если маршрут разорван (RERR дошел до источника), поток ищет маршрут заново,
+#пакеты до его получения не отправляются (считаются в no_route).
+#У каждого поиска есть срок в виртуальном времени (discovery_timeout): сеанс
+#без ответа к этому сроку завершается, и поток повторяет поиск через
+#retry_interval, не дожидаясь, пока опустеет очередь событий (при подвижности
+#и других потоках она не пустеет до конца прогона). Первый поиск повторяется так
+#же, пока не истечет время, за которое поток отправил бы все пакеты (Flow.deadline).
+
+PATTERNS = ('cbr', 'poisson')
+
+FLOW_FIELDS = [
+    'flow_id', 'source', 'destination', 'pattern', 'rate', 'payload', 'status', 'hops',
+    'sent', 'delivered', 'dropped', 'lost', 'no_route', 'rediscoveries', 'delivery_ratio', 'throughput',
+    'latency_mean', 'latency_p50', 'latency_p90', 'latency_p99', 'latency_max',
+]
+
+
+def summarize_latencies(values) -> Dict[str, Optional[float]]:
+    #как batch.summarize, но одна сортировка на все процентили (значений миллионы)
+    if not len(values):
+        return {'mean': None, 'p50': None, 'p90': None, 'p99': None, 'max': None}
+    data = np.asarray(values, dtype=np.float64)  # array('d') - без копирования
+    p50, p90, p99 = np.percentile(data, [50, 90, 99])
+    return {'mean': float(data.mean()), 'p50': float(p50), 'p90': float(p90),
+            'p99': float(p99), 'max': float(data.max())}
+
+
+class Flow:
+    #поток данных source -> destination
+    #pattern 'cbr' (интервал 1/rate) или 'poisson' (экспоненциальные интервалы, в среднем rate в секунду)
+    #rate пакетов в секунду сети, payload размер данных пакета (байты)
+    #start время сети начала (поиск маршрута), duration длительность отправки от получения
+    #маршрута, count наибольшее число пакетов (None - без ограничения)
+    #status 'pending' (ждет маршрут), 'active', 'done', 'no_route'
+    #generated пакеты по расписанию потока (отправленные и no_route), rediscoveries повторные поиски
+    #stats итоги (metrics.FlowStats, доступны и как network.flows[flow_id])
+
+    def __init__(self, flow_id: int, source: int, destination: int, rate: float,
+                 pattern: str = 'cbr', payload: int = 512, start: float = 0.0,
+                 duration: Optional[float] = None, count: Optional[int] = None):
+        if pattern not in PATTERNS:
+            raise ValueError(f"Неизвестный вид потока: {pattern}")
+        if rate <= 0:
+            raise ValueError(f"Интенсивность потока должна быть положительной: {rate}")
+        if duration is None and count is None:
+            raise ValueError("Для потока нужно задать duration или count")
+        self.flow_id = flow_id
+        self.source = source
+        self.destination = destination
+        self.rate = rate
+        self.pattern = pattern
+        self.payload = payload
+        self.start = start
+        self.duration = duration
+        self.count = count
+        self.status = 'pending'
+        self.generated = 0
+        self.rediscoveries = 0
+        self.route: Optional[Route] = None
+        self.started: Optional[float] = None  # время сети получения маршрута (начала отправки)
+        self.end: Optional[float] = None  # время сети окончания отправки
+        # без маршрута к этому времени поток не начинается (no_route)
+        self.deadline = start + (duration if duration is not None else count / rate)
+        self.stats = FlowStats(flow_id, source, destination)
+
+    def as_dict(self) -> dict:
+        stats = self.stats
+        latency = summarize_latencies(stats.latencies)
+        return {
+            'flow_id': self.flow_id,
+            'source': self.source,
+            'destination': self.destination,
+            'pattern': self.pattern,
+            'rate': self.rate,
+            'payload': self.payload,
+            'status': self.status,
+            'hops': len(self.route) - 1 if self.route else None,
+            'sent': stats.sent,
+            'delivered': stats.delivered,
+            'dropped': stats.dropped,
+            'lost': stats.lost,
+            'no_route': stats.no_route,
+            'rediscoveries': self.rediscoveries,
+            'delivery_ratio': stats.delivered / stats.sent if stats.sent else None,
+            'throughput': stats.throughput,
+            'latency_mean': latency['mean'],
+            'latency_p50': latency['p50'],
+            'latency_p90': latency['p90'],
+            'latency_p99': latency['p99'],
+            'latency_max': latency['max'],
+        }
+
+
+class TrafficGenerator:
+    #источник трафика для сети без GUI (события на планировщике HeadlessNetwork)
+    #seed для интервалов потоков Poisson
+    #retry_interval пауза перед повтором неудачного поиска (секунды сети)
+    #discovery_timeout срок поиска маршрута (секунды сети), None - наибольшее время
+    #рассылки и ответа: 2 * (N - 1) переходов с наибольшей задержкой канала
+    #(очереди каналов с ограниченной пропускной способностью не учитываются)
+
+    def __init__(self, network: HeadlessNetwork, seed: Optional[int] = None, retry_interval: float = 1.0,
+                 discovery_timeout: Optional[float] = None):
+        self.network = network
+        self.scheduler = network.scheduler
+        self.rng = random.Random(seed)
+        self.retry_interval = retry_interval
+        self.discovery_timeout = discovery_timeout
+        self.flows: List[Flow] = []
+        self._flows_by_source: Dict[int, List[Flow]] = {}
+        self._flow_ids = itertools.count(1)
+        network.add_route_error_callback(self._route_error)
+
+    def add_flow(self, source: int, destination: int, rate: float, pattern: str = 'cbr',
+                 payload: int = 512, start: float = 0.0, duration: Optional[float] = None,
+                 count: Optional[int] = None) -> Flow:
+        #новый поток (параметры - см. Flow), start отсчитывается от текущего времени сети
+        flow = Flow(next(self._flow_ids), source, destination, rate, pattern, payload,
+                    self.scheduler.now + start, duration, count)
+        self.flows.append(flow)
+        self._flows_by_source.setdefault(source, []).append(flow)
+        self.network.flows[flow.flow_id] = flow.stats
+        self.scheduler.schedule(start, self._discover, flow)
+        return flow
+
+    def flood_time(self) -> float:
+        #наибольшее время поиска: RREQ и RREP проходят не больше N - 1 переходов каждый
+        link_model = self.network.link_model
+        latency = max(
+            (self.network.delay if params.latency is None else params.latency) + params.jitter
+            for params in [link_model.default, *link_model._links.values()]
+        )
+        return 2 * max(self.network.adjacency.num_nodes - 1, 1) * latency
+
+    def _discover(self, flow: Flow):
+        if flow.status == 'done':
+            return
+        session = self.network.initiate_communication(flow.source, flow.destination)
+        if session is None:
+            flow.status = 'no_route'
+            return
+        # маршрут из кэша источника приходит сразу, иначе - с первым RREP
+        session.add_done_callback(lambda done: self._route_ready(flow, done))
+        # к сроку рассылка закончена: сеанс закрывается (без ответа - повтор поиска)
+        timeout = self.discovery_timeout if self.discovery_timeout is not None else self.flood_time()
+        self.scheduler.schedule(timeout, self.network.close_session, session)
+
+    def _route_ready(self, flow: Flow, session):
+        route = session.route
+        if flow.started is not None:
+            # повторный поиск: расписание отправки уже идет
+            if flow.status == 'done':
+                return
+            if route is None:
+                self.scheduler.schedule(self.retry_interval, self._discover, flow)
+                return
+            flow.route = route
+            flow.status = 'active'
+            return
+        if route is None:
+            # первый поиск: повтор, пока поток еще успел бы отправить пакеты
+            if self.scheduler.now + self.retry_interval < flow.deadline:
+                self.scheduler.schedule(self.retry_interval, self._discover, flow)
+            else:
+                flow.status = 'no_route'
+            return
+        flow.route = route
+        flow.status = 'active'
+        flow.started = self.scheduler.now
+        if flow.duration is not None:
+            flow.end = flow.started + flow.duration
+        self.scheduler.schedule(0.0, self._emit, flow)
+
+    def _route_error(self, node_id: int, link):
+        #маршрут потоков источника node_id через link разорван - ищем новый
+        for flow in self._flows_by_source.get(node_id, ()):
+            if flow.status == 'active' and route_uses_link(flow.route, *link):
+                flow.route = None
+                flow.status = 'pending'
+                flow.rediscoveries += 1
+                self._discover(flow)
+
+    def _emit(self, flow: Flow):
+        #отправка очередного пакета потока и планирование следующего
+        now = self.scheduler.now
+        stats = flow.stats
+        if (flow.end is not None and now >= flow.end) or (flow.count is not None and flow.generated >= flow.count):
+            flow.status = 'done'
+            return
+        flow.generated += 1
+        if flow.route is None:
+            stats.no_route += 1
+        else:
+            packet = DataPacket(flow.route, flow.flow_id, stats.sent, flow.payload, now)
+            stats.packet_sent(now)
+            self.network.nodes[flow.source].send_data(packet)
+        if flow.pattern == 'cbr':
+            # от начала потока, а не от предыдущего пакета (без накопления ошибки округления)
+            interval = flow.started + flow.generated / flow.rate - now
+        else:
+            interval = self.rng.expovariate(flow.rate)
+        self.scheduler.schedule(interval, self._emit, flow)
+
+    def run(self, until: Optional[float] = None) -> int:
+        #моделирование до окончания всех потоков (или до until), количество событий
+        return self.network.run(until)
+
+    def report(self) -> dict:
+        #итоги по потокам и по всей сети
+        flows = [flow.as_dict() for flow in self.flows]
+        stats = [flow.stats for flow in self.flows]
+        sent = sum(s.sent for s in stats)
+        delivered = sum(s.delivered for s in stats)
+        starts = [s.first_sent for s in stats if s.first_sent is not None]
+        ends = [s.last_delivered for s in stats if s.last_delivered is not None]
+        bytes_delivered = sum(s.bytes_delivered for s in stats)
+        span = max(ends) - min(starts) if starts and ends else 0.0
+        latencies = np.concatenate([np.asarray(s.latencies, dtype=np.float64) for s in stats]) \
+            if stats else np.empty(0)
+        return {
+            'summary': {
+                'flows': len(flows),
+                'active_flows': sum(1 for flow in self.flows if flow.route is not None),
+                'sent': sent,
+                'delivered': delivered,
+                'dropped': sum(s.dropped for s in stats),
+                'lost': sum(s.lost for s in stats),
+                'no_route': sum(s.no_route for s in stats),
+                'rediscoveries': sum(flow.rediscoveries for flow in self.flows),
+                'delivery_ratio': delivered / sent if sent else None,
+                'bytes_delivered': bytes_delivered,
+                'throughput': bytes_delivered / span if span > 0 else None,
+                'latency': summarize_latencies(latencies),
+            },
+            'flows': flows,
+        }
+
+
+def run_traffic(num_nodes: int, seed: int, num_flows: int, rate: float, pattern: str = 'cbr',
+                payload: int = 512, duration: Optional[float] = 10.0, count: Optional[int] = None,
+                delay: float = 0.01, method: str = 'incremental', num_edges: Optional[int] = None,
+                jitter: float = 0.0, loss: float = 0.0, bandwidth: Optional[float] = None,
+                topology: Optional[str] = None) -> dict:
+    #топология по seed (или из файла topology), num_flows потоков между случайными парами, отчет
+    network = HeadlessNetwork(delay=delay)
+    network.configure_links(None, jitter, loss, bandwidth, seed)
+    if topology:
+        network.load_topology(topology)
+        num_nodes = network.adjacency.num_nodes
+    else:
+        network.create_topology(num_nodes, seed, method, num_edges)
+    generator = TrafficGenerator(network, seed)
+    for source, destination in choose_pairs(num_nodes, num_flows, random.Random(seed)):
+        generator.add_flow(source, destination, rate, pattern, payload, duration=duration, count=count)
+
+    started = time.perf_counter()
+    events = generator.run()
+    wall = time.perf_counter() - started
+
+    report = generator.report()
+    report['config'] = {
+        'nodes': num_nodes,
+        'edges': network.adjacency.num_edges,
+        'seed': seed,
+        'generator': method,
+        'topology': topology,
+        'flows': num_flows,
+        'rate': rate,
+        'pattern': pattern,
+        'payload': payload,
+        'duration': duration,
+        'count': count,
+        'delay': delay,
+        'jitter': jitter,
+        'loss': loss,
+        'bandwidth': bandwidth,
+    }
+    report['summary']['data_hops'] = network.packet_counts.get('DATA', 0)
+    report['summary']['events'] = events
+    report['summary']['wall_s'] = wall
+    return report
+
+
+def write_json(report: dict, stream):
+    json.dump(report, stream, ensure_ascii=False, indent=2)
+    stream.write('\n')
+
+
+def write_csv(report: dict, stream):
+    writer = csv.DictWriter(stream, fieldnames=FLOW_FIELDS)
+    writer.writeheader()
+    writer.writerows(report['flows'])
+
+
+def format_summary(report: dict) -> str:
+    config = report['config']
+    summary = report['summary']
+
+    def value(x, spec='.3f'):
+        return format(x, spec) if x is not None else '-'
+
+    latency = ', '.join(f"{key}={value(x, '.4f')}" for key, x in summary['latency'].items())
+    return '\n'.join([
+        f"Топология: {config['nodes']} узлов, {config['edges']} связей, seed={config['seed']}",
+        f"Потоков: {summary['flows']}, с маршрутом: {summary['active_flows']}",
+        f"Пакетов: отправлено {summary['sent']}, доставлено {summary['delivered']}, "
+        f"отброшено {summary['dropped']}, потеряно {summary['lost']}, без маршрута {summary['no_route']}, "
+        f"доля доставки {value(summary['delivery_ratio'], '.4f')}",
+        f"Повторных поисков маршрута: {summary['rediscoveries']}",
+        f"Пропускная способность (байт/вирт. с): {value(summary['throughput'], '.1f')}",
+        f"Задержка (вирт. с): {latency}",
+        f"Переходов DATA: {summary['data_hops']}, событий: {summary['events']}, "
+        f"{summary['wall_s']:.2f} с ({summary['events'] / summary['wall_s'] if summary['wall_s'] else 0:.0f} событий/с)",
+    ])
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Потоки данных DSR без GUI (пропускная способность и задержка доставки)"
+    )
+    parser.add_argument('--nodes', type=int, default=50, help="количество узлов")
+    parser.add_argument('--seed', type=int, default=0, help="seed топологии, пар и интервалов")
+    parser.add_argument('--generator', choices=NetworkTopologyGenerator.METHODS, default='incremental',
+                        help="способ построения топологии")
+    parser.add_argument('--edges', type=int, help="точное число ребер (для --generator constructive)")
+    parser.add_argument('--topology', help="файл топологии (см. dsr topology) вместо --nodes/--generator")
+    parser.add_argument('--flows', type=int, default=10, help="количество потоков между случайными парами")
+    parser.add_argument('--pattern', choices=PATTERNS, default='cbr', help="вид потока")
+    parser.add_argument('--rate', type=float, default=100.0, help="пакетов в вирт. секунду на поток")
+    parser.add_argument('--payload', type=int, default=512, help="размер данных пакета (байты)")
+    parser.add_argument('--duration', type=float, default=10.0, help="длительность отправки (вирт. с)")
+    parser.add_argument('--count', type=int, help="наибольшее число пакетов потока")
+    parser.add_argument('--delay', type=float, default=0.01, help="задержка одного перехода (вирт. с)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="разброс задержки канала (вирт. с)")
+    parser.add_argument('--loss', type=float, default=0.0, help="вероятность потери пакета в канале")
+    parser.add_argument('--bandwidth', type=float, help="пропускная способность канала (байт/вирт. с)")
+    parser.add_argument('--format', choices=('json', 'csv'), default='json')
+    parser.add_argument('--output', '-o', help="файл результата (по умолчанию stdout)")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.nodes < 2:
+        print("Ошибка: количество узлов должно быть не меньше 2", file=sys.stderr)
+        return 2
+
+    try:
+        report = run_traffic(args.nodes, args.seed, args.flows, args.rate, args.pattern, args.payload,
+                             args.duration, args.count, args.delay, args.generator, args.edges,
+                             args.jitter, args.loss, args.bandwidth, args.topology)
+    except ValueError as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 2
+    writer = write_json if args.format == 'json' else write_csv
+
+    if args.output:
+        with open(args.output, 'w', newline='', encoding='utf-8') as f:
+            writer(report, f)
+    else:
+        writer(report, sys.stdout)
+    print(format_summary(report), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
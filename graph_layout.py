@@ -0,0 +1,172 @@
+import os
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import networkx as nx
+import numpy as np
+
+from dsr.adjacency import Adjacency
+
+
+#Раскладка графа для отрисовки
+#Небольшие графы раскладываются как раньше (nx.spring_layout), большие -
+#векторизованным силовым алгоритмом с сеткой: отталкивание считается от центров
+#масс ячеек, а не от всех узлов, поэтому итерация стоит O(N * ячейки), а не O(N^2).
+#Готовые позиции кэшируются по хэшу топологии в памяти и на диске.
+
+LAYOUT_VERSION = 1  # меняется при изменении алгоритма (старый дисковый кэш не подходит)
+SPRING_LAYOUT_MAX_NODES = 300  # до этого размера - nx.spring_layout как раньше
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'dsr_simulator', 'layouts')
+
+Positions = Dict[int, np.ndarray]
+
+
+def topology_hash(graph: nx.Graph) -> str:
+    #хэш топологии (узлы 0..N-1) - тот же, что в файлах топологии и таблицах sweep
+    return Adjacency.from_graph(graph).content_hash()
+
+
+def grid_force_layout(graph: nx.Graph, iterations: int = 50, seed: Optional[int] = 42,
+                      nodes_per_cell: int = 16, chunk: int = 2048) -> Positions:
+    #силовая раскладка (Fruchterman-Reingold) на NumPy с приближенным отталкиванием по сетке
+    #узлы графа - числа 0..N-1 (как у NetworkTopologyGenerator)
+    nodes = list(graph.nodes())
+    n = len(nodes)
+    if n == 0:
+        return {}
+    if n == 1:
+        return {nodes[0]: np.zeros(2)}
+    index = {node: i for i, node in enumerate(nodes)}
+    edges = np.array([(index[u], index[v]) for u, v in graph.edges()], dtype=np.int64).reshape(-1, 2)
+
+    rng = np.random.default_rng(seed)
+    pos = rng.random((n, 2))
+    k = np.sqrt(1.0 / n)  # оптимальное расстояние между узлами
+    side = max(1, int(np.sqrt(n / nodes_per_cell)))  # ячеек по одной стороне
+    temperature = 0.1
+    cooling = temperature / (iterations + 1)
+
+    for _ in range(iterations):
+        # ячейки сетки и их центры масс
+        low = pos.min(axis=0)
+        span = np.maximum(pos.max(axis=0) - low, 1e-9)
+        cell_xy = np.minimum(((pos - low) / span * side).astype(np.int64), side - 1)
+        cell = cell_xy[:, 0] * side + cell_xy[:, 1]
+        mass = np.bincount(cell, minlength=side * side).astype(float)
+        sums = np.stack([
+            np.bincount(cell, weights=pos[:, 0], minlength=side * side),
+            np.bincount(cell, weights=pos[:, 1], minlength=side * side),
+        ], axis=1)
+        occupied = np.nonzero(mass)[0]
+        centers = sums[occupied] / mass[occupied, None]
+        weights = mass[occupied]
+
+        # отталкивание k^2/d от центров чужих ячеек (своя ячейка - без самого узла)
+        displacement = np.zeros_like(pos)
+        for start in range(0, n, chunk):
+            part = pos[start:start + chunk]
+            dx = part[:, 0, None] - centers[None, :, 0]
+            dy = part[:, 1, None] - centers[None, :, 1]
+            force = weights / np.maximum(dx * dx + dy * dy, 1e-9)
+            force[cell[start:start + len(part), None] == occupied[None, :]] = 0.0
+            # sum_c force * (p - c) = p * sum_c force - force @ c
+            displacement[start:start + len(part)] = k * k * (
+                part * force.sum(axis=1)[:, None] - force @ centers
+            )
+
+        own_mass = mass[cell] - 1
+        crowded = own_mass > 0
+        own_center = (sums[cell[crowded]] - pos[crowded]) / own_mass[crowded, None]
+        delta = pos[crowded] - own_center
+        dist2 = np.maximum((delta ** 2).sum(axis=1), 1e-9)
+        displacement[crowded] += k * k * delta * (own_mass[crowded] / dist2)[:, None]
+
+        # притяжение d^2/k вдоль ребер
+        if len(edges):
+            delta = pos[edges[:, 0]] - pos[edges[:, 1]]
+            dist = np.maximum(np.sqrt((delta ** 2).sum(axis=1)), 1e-9)
+            pull = delta * (dist / k)[:, None]
+            np.add.at(displacement, edges[:, 0], -pull)
+            np.add.at(displacement, edges[:, 1], pull)
+
+        # шаг не длиннее текущей температуры
+        length = np.maximum(np.sqrt((displacement ** 2).sum(axis=1)), 1e-9)
+        pos += displacement * (np.minimum(length, temperature) / length)[:, None]
+        temperature -= cooling
+
+    # как nx.spring_layout: центр в нуле, масштаб 1
+    pos -= pos.mean(axis=0)
+    limit = np.abs(pos).max()
+    if limit > 0:
+        pos /= limit
+    return {node: pos[i] for i, node in enumerate(nodes)}
+
+
+def compute_layout(graph: nx.Graph, seed: Optional[int] = 42) -> Positions:
+    if graph.number_of_nodes() <= SPRING_LAYOUT_MAX_NODES:
+        return nx.spring_layout(graph, k=2, iterations=50, seed=seed)
+    return grid_force_layout(graph, seed=seed)
+
+
+class LayoutCache:
+    #кэш позиций по хэшу топологии
+    #max_entries раскладок в памяти (LRU), cache_dir каталог дискового кэша (None - только память)
+
+    def __init__(self, cache_dir: Optional[str] = DEFAULT_CACHE_DIR, max_entries: int = 16):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, Positions]" = OrderedDict()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}-v{LAYOUT_VERSION}.npz")
+
+    def get(self, graph: nx.Graph, key: Optional[str] = None) -> Optional[Positions]:
+        key = key or topology_hash(graph)
+        pos = self._memory.get(key)
+        if pos is not None:
+            self._memory.move_to_end(key)
+            return pos
+        if self.cache_dir is None:
+            return None
+        try:
+            with np.load(self._path(key)) as data:
+                nodes, coords = data['nodes'], data['pos']
+        except (OSError, KeyError, ValueError):
+            return None
+        pos = {int(node): coords[i] for i, node in enumerate(nodes)}
+        if set(pos) != set(graph.nodes()):
+            return None
+        self._remember(key, pos)
+        return pos
+
+    def put(self, graph: nx.Graph, pos: Positions, key: Optional[str] = None):
+        key = key or topology_hash(graph)
+        self._remember(key, pos)
+        if self.cache_dir is None:
+            return
+        nodes = np.fromiter(pos.keys(), dtype=np.int64, count=len(pos))
+        coords = np.array([pos[node] for node in pos.keys()], dtype=float).reshape(-1, 2)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = self._path(key) + '.tmp'
+            with open(tmp, 'wb') as f:
+                np.savez(f, nodes=nodes, pos=coords)
+            os.replace(tmp, self._path(key))
+        except OSError:
+            pass  # дисковый кэш необязателен
+
+    def _remember(self, key: str, pos: Positions):
+        self._memory[key] = pos
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def layout(self, graph: nx.Graph, seed: Optional[int] = 42) -> Tuple[Positions, bool]:
+        #позиции из кэша или новая раскладка, второй элемент - было ли попадание в кэш
+        key = topology_hash(graph)
+        pos = self.get(graph, key)
+        if pos is not None:
+            return pos, True
+        pos = compute_layout(graph, seed)
+        self.put(graph, pos, key)
+        return pos, False
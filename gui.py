@@ -1,15 +1,19 @@
 import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox
+from tkinter import ttk, scrolledtext, messagebox, filedialog
 import threading
 import time
-from typing import List, Optional
+from collections import deque
+from typing import Deque, Dict, List, Optional
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
+from matplotlib.collections import LineCollection
 import networkx as nx
 
-from network import Network
-from dsr_protocol import DSRPacket
+from dsr.network import Network
+from dsr.dsr_protocol import DSRPacket
+from dsr.sim_trace import TraceReplay
+from graph_layout import LayoutCache
 
 
 class DSRSimulatorGUI:
@@ -20,6 +24,38 @@ class DSRSimulatorGUI:
         
         self.network = Network(self)
         self.pos = None  # позиций узлов для отрисовки
+        self.layout_cache = LayoutCache()  # позиции по хэшу топологии (память + диск)
+        
+        # постоянные объекты рисунка (пересоздаются только при смене топологии)
+        self._drawn_graph = None
+        self.node_collection = None
+        self.route_collection = None
+        self.info_text = None
+        self._node_order: List[int] = []
+        self._node_index: Dict[int, int] = {}
+        
+        # объединение кадров: не чаще max_fps перерисовок в секунду
+        self.max_fps = 30
+        self._frame_lock = threading.Lock()
+        self._pending_frame: Optional[tuple] = None
+        self._frame_scheduled = False
+        self._last_frame_time = 0.0
+        
+        # журнал: пачки строк раз в log_flush_ms, в виджете не больше max_log_lines
+        self.max_log_lines = 2000
+        self.log_flush_ms = 100
+        self._log_buffer: Deque[str] = deque(maxlen=self.max_log_lines)
+        self._log_lock = threading.Lock()
+        self._log_scheduled = False
+        
+        # проигрывание трассы
+        self.replay: Optional[TraceReplay] = None
+        self.replay_index = 0
+        self._replay_links = 0
+        self._replay_job = None
+        self._replay_speed = 1.0
+        self._replay_origin = (0.0, 0.0)
+        self._seeking = False
         
         self.setup_ui()
         
@@ -29,7 +65,7 @@ class DSRSimulatorGUI:
         control_frame.pack(side=tk.TOP, fill=tk.X)
         
         # Поле ввода количества узлов
-        ttk.Label(control_frame, text="Количество узлов (2-50):").pack(side=tk.LEFT, padx=5)
+        ttk.Label(control_frame, text="Количество узлов (от 2):").pack(side=tk.LEFT, padx=5)
         self.nodes_var = tk.StringVar(value="10")
         nodes_entry = ttk.Entry(control_frame, textvariable=self.nodes_var, width=10)
         nodes_entry.pack(side=tk.LEFT, padx=5)
@@ -40,6 +76,18 @@ class DSRSimulatorGUI:
             command=self.create_topology
         ).pack(side=tk.LEFT, padx=5)
         
+        ttk.Button(
+            control_frame,
+            text="Сохранить",
+            command=self.save_topology
+        ).pack(side=tk.LEFT, padx=2)
+        
+        ttk.Button(
+            control_frame,
+            text="Загрузить",
+            command=self.load_topology
+        ).pack(side=tk.LEFT, padx=2)
+        
         ttk.Separator(control_frame, orient=tk.VERTICAL).pack(side=tk.LEFT, fill=tk.Y, padx=10) # полоска между кнопками
         
         # Поля для выбора узлов
@@ -82,6 +130,46 @@ class DSRSimulatorGUI:
             command=self.update_delay
         ).pack(side=tk.LEFT, padx=5)
         
+        # Панель трассы: запись и проигрывание без запуска узлов
+        trace_frame = ttk.Frame(self.root, padding=(10, 0, 10, 5))
+        trace_frame.pack(side=tk.TOP, fill=tk.X)
+        
+        self.record_button = ttk.Button(
+            trace_frame, 
+            text="Записать трассу", 
+            command=self.toggle_recording
+        )
+        self.record_button.pack(side=tk.LEFT, padx=5)
+        
+        ttk.Button(
+            trace_frame, 
+            text="Открыть трассу", 
+            command=self.open_trace
+        ).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Separator(trace_frame, orient=tk.VERTICAL).pack(side=tk.LEFT, fill=tk.Y, padx=10)
+        
+        ttk.Button(trace_frame, text="◀", width=3, command=lambda: self.step_replay(-1)).pack(side=tk.LEFT, padx=2)
+        self.play_button = ttk.Button(trace_frame, text="▶", width=3, command=self.toggle_replay)
+        self.play_button.pack(side=tk.LEFT, padx=2)
+        ttk.Button(trace_frame, text="▶|", width=3, command=lambda: self.step_replay(1)).pack(side=tk.LEFT, padx=2)
+        
+        ttk.Label(trace_frame, text="Скорость:").pack(side=tk.LEFT, padx=5)
+        self.replay_speed_var = tk.StringVar(value="1.0")
+        ttk.Entry(trace_frame, textvariable=self.replay_speed_var, width=5).pack(side=tk.LEFT, padx=5)
+        
+        # перемотка по кадрам трассы
+        self.replay_scale = ttk.Scale(
+            trace_frame, 
+            from_=0, 
+            to=0, 
+            orient=tk.HORIZONTAL, 
+            command=self.seek_replay
+        )
+        self.replay_scale.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        self.replay_label = ttk.Label(trace_frame, text="0 / 0")
+        self.replay_label.pack(side=tk.LEFT, padx=5)
+        
         # Основная область с отступами
         main_frame = ttk.Frame(self.root)
         main_frame.pack(side=tk.TOP, fill=tk.BOTH, expand=True, padx=10, pady=5)
@@ -136,14 +224,16 @@ class DSRSimulatorGUI:
         try:
             num_nodes = int(self.nodes_var.get())
             
-            if num_nodes < 2 or num_nodes > 50:
+            if num_nodes < 2:
                 messagebox.showerror(
                     "Ошибка", 
-                    "Количество узлов должно быть от 2 до 50"
+                    "Количество узлов должно быть не меньше 2"
                 )
                 return
                 
             self.network.stop_nodes() # при создании новой топологии останавливаем текущую сеть
+            self.stop_replay()
+            self.replay = None
             
             # Создаем новую топологию
             self.add_log("=" * 60)
@@ -165,11 +255,92 @@ class DSRSimulatorGUI:
         except ValueError:
             messagebox.showerror("Ошибка", "Введите корректное число узлов")
             
+    def save_topology(self): # Сохранить топологию в файл
+        if not self.network.nodes:
+            messagebox.showerror("Ошибка", "Сначала создайте топологию")
+            return
+        path = filedialog.asksaveasfilename(
+            title="Файл топологии",
+            defaultextension=".dsrtopo",
+            filetypes=[("Топология DSR", "*.dsrtopo"), ("Список ребер", "*.edges"), ("Все файлы", "*.*")]
+        )
+        if not path:
+            return
+        if self.network.positions is None and self.pos is not None:
+            # раскладка с экрана сохраняется как положения узлов
+            self.network.positions = [self.pos[node] for node in range(len(self.network.nodes))]
+        try:
+            self.network.save_topology(path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить топологию: {e}")
+            return
+        self.add_log(f"Топология сохранена: {path}")
+        
+    def load_topology(self): # Загрузить топологию из файла
+        path = filedialog.askopenfilename(
+            title="Открыть топологию",
+            filetypes=[("Топология DSR", "*.dsrtopo"), ("Список ребер", "*.edges"), ("Все файлы", "*.*")]
+        )
+        if not path:
+            return
+        self.network.stop_nodes()
+        self.stop_replay()
+        self.replay = None
+        try:
+            metadata = self.network.load_topology(path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Ошибка", f"Не удалось открыть топологию: {e}")
+            return
+        self.network.start_nodes()
+        self.nodes_var.set(str(len(self.network.nodes)))
+        self.pos = None
+        self.visualize_graph()
+        self.add_log("=" * 60)
+        self.add_log(f"Топология {path}: {metadata['nodes']} узлов, {metadata['edges']} связей, "
+                     f"seed={metadata.get('seed')}")
+        self.add_log("=" * 60)
+        
     def visualize_graph(self, highlight_route=None, current_packet=None, current_node=None): # Визуализировать граф сети
-        # очищаем поле для отрисовки
+        # постоянные объекты рисунка создаются один раз на топологию,
+        # дальше меняются только цвета узлов, подсветка маршрута и подпись
+        if self._drawn_graph is not self.network.graph or self.pos is None:
+            self._build_artists()
+        if self.node_collection is None:  # пустой граф
+            self.canvas.draw_idle()
+            return
+            
+        # Если есть найденный маршрут, подсвечиваем его
+        if highlight_route and len(highlight_route) > 1:
+            self.route_collection.set_segments([
+                (self.pos[highlight_route[i]], self.pos[highlight_route[i+1]])
+                for i in range(len(highlight_route)-1)
+            ])
+        else:
+            self.route_collection.set_segments([])
+            
+        self.node_collection.set_facecolor(
+            self._node_colors(current_packet, current_node)
+        )
+        
+        # Информационная панель
+        if current_packet:
+            legend_text = f"Тип пакета: {current_packet.type}\n"
+            legend_text += f"Маршрут: {current_packet.source} → {current_packet.destination}\n"
+            legend_text += f"Путь: {' → '.join(map(str, current_packet.route))}"
+            self.info_text.set_text(legend_text)
+            self.info_text.set_visible(True)
+        else:
+            self.info_text.set_visible(False)
+            
+        self.canvas.draw_idle()
+        
+    def _build_artists(self): # Создать объекты рисунка для текущего графа
+        graph = self.network.graph
         self.ax.clear()
+        self._drawn_graph = graph
+        self.node_collection = None
         
-        if self.network.graph.number_of_nodes() == 0: # если нет узлов, то выводим сообщение
+        if graph.number_of_nodes() == 0: # если нет узлов, то выводим сообщение
             self.ax.text(
                 0.5, 0.5, 
                 'Создайте топологию,\nчтобы здесь был граф', 
@@ -179,16 +350,19 @@ class DSRSimulatorGUI:
                 bbox=dict(boxstyle='round', facecolor='lightblue', alpha=0.5)
             )
             self.ax.axis('off')
-            self.canvas.draw()
             return
             
         # Вычисляем позиции узлов
-        if self.pos is None or len(self.pos) != self.network.graph.number_of_nodes():
-            self.pos = nx.spring_layout(self.network.graph, k=2, iterations=50, seed=42)
+        if self.pos is None or len(self.pos) != graph.number_of_nodes():
+            positions = self.network.positions
+            if positions is not None and len(positions) == graph.number_of_nodes():
+                self.pos = {node: (float(x), float(y)) for node, (x, y) in enumerate(positions)}
+            else:
+                self.pos, _ = self.layout_cache.layout(graph)  # кэш по хэшу топологии
             
         # Рисуем ребра
         nx.draw_networkx_edges(
-            self.network.graph, 
+            graph, 
             self.pos, 
             ax=self.ax,
             edge_color='gray',
@@ -196,87 +370,77 @@ class DSRSimulatorGUI:
             alpha=0.6
         )
         
-        # Если есть найденный маршрут, подсвечиваем его
-        if highlight_route and len(highlight_route) > 1:
-            route_edges = [
-                (highlight_route[i], highlight_route[i+1]) 
-                for i in range(len(highlight_route)-1)
-            ]
-            nx.draw_networkx_edges(
-                self.network.graph,
-                self.pos,
-                ax=self.ax,
-                edgelist=route_edges,
-                edge_color='green',
-                width=4,
-                alpha=0.9
-            )
-            
-        # Определяем цвета узлов
-        node_colors = []
-        for node in self.network.graph.nodes():
-            if current_node is not None and node == current_node:
-                if current_packet and current_packet.type == 'RREQ':
-                    node_colors.append('orange')  # Текущий узел обрабатывает RREQ
-                elif current_packet and current_packet.type == 'RREP':
-                    node_colors.append('lightgreen')  # Текущий узел обрабатывает RREP
-                else:
-                    node_colors.append('yellow')
-            elif current_packet:
-                if node == current_packet.source:
-                    node_colors.append('blue')  # Источник
-                elif node == current_packet.destination:
-                    node_colors.append('red')  # Назначение
-                elif node in current_packet.route:
-                    node_colors.append('lightblue')  # Часть маршрута
-                else:
-                    node_colors.append('lightgray')
-            else:
-                node_colors.append('lightblue')
-                
-        # Рисуем узлы
-        nx.draw_networkx_nodes(
-            self.network.graph,
+        # Отдельная коллекция для подсветки маршрута (поверх ребер, под узлами)
+        self.route_collection = LineCollection(
+            [], colors='green', linewidths=4, alpha=0.9, zorder=1
+        )
+        self.ax.add_collection(self.route_collection)
+        
+        # Рисуем узлы (цвета потом меняются через set_facecolor)
+        self.node_collection = nx.draw_networkx_nodes(
+            graph,
             self.pos,
             ax=self.ax,
-            node_color=node_colors,
+            node_color='lightblue',
             node_size=500,
             edgecolors='black',
             linewidths=2
         )
+        self._node_order = list(graph.nodes())
+        self._node_index = {node: i for i, node in enumerate(self._node_order)}
         
         # Рисуем метки узлов
         nx.draw_networkx_labels(
-            self.network.graph,
+            graph,
             self.pos,
             ax=self.ax,
             font_size=10,
             font_weight='bold'
         )
         
-        # Добавляем информационную панель
-        if current_packet:
-            legend_text = f"Тип пакета: {current_packet.type}\n"
-            legend_text += f"Маршрут: {current_packet.source} → {current_packet.destination}\n"
-            legend_text += f"Путь: {' → '.join(map(str, current_packet.route))}"
-            
-            self.ax.text(
-                0.05, 0.05, 
-                legend_text,
-                transform=self.ax.transAxes,
-                fontsize=9,
-                verticalalignment='top',
-                bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.9)
-            )
+        self.info_text = self.ax.text(
+            0.05, 0.05, 
+            '',
+            transform=self.ax.transAxes,
+            fontsize=9,
+            verticalalignment='top',
+            bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.9),
+            visible=False
+        )
         
         self.ax.set_title(
-            f"Граф сети: {self.network.graph.number_of_nodes()} узлов, "
-            f"{self.network.graph.number_of_edges()} связей",
+            f"Граф сети: {graph.number_of_nodes()} узлов, "
+            f"{graph.number_of_edges()} связей",
             fontsize=11,
             fontweight='bold'
         )
         self.ax.axis('off')
-        self.canvas.draw()
+        
+    def _node_colors(self, current_packet=None, current_node=None) -> list: # Цвета узлов для кадра
+        if current_packet is None:
+            colors = ['lightblue'] * len(self._node_order)
+        else:
+            route = set(current_packet.route)
+            colors = []
+            for node in self._node_order:
+                if node == current_packet.source:
+                    colors.append('blue')  # Источник
+                elif node == current_packet.destination:
+                    colors.append('red')  # Назначение
+                elif node in route:
+                    colors.append('lightblue')  # Часть маршрута
+                else:
+                    colors.append('lightgray')
+                    
+        if current_node in self._node_index:
+            if current_packet and current_packet.type == 'RREQ':
+                color = 'orange'  # Текущий узел обрабатывает RREQ
+            elif current_packet and current_packet.type == 'RREP':
+                color = 'lightgreen'  # Текущий узел обрабатывает RREP
+            else:
+                color = 'yellow'
+            colors[self._node_index[current_node]] = color
+        return colors
         
     def start_routing(self):#Запустить поиск маршрута
         try:
@@ -314,26 +478,191 @@ class DSRSimulatorGUI:
             messagebox.showerror("Ошибка", "Введите корректные номера узлов")
             
     def update_visualization(self, packet: DSRPacket, current_node: int): # Обновить визуализацию с текущим пакетом
-        self.root.after(0, lambda: self.visualize_graph(None, packet, current_node))
+        self._request_frame((None, packet, current_node))
         
     def show_found_route(self, route: List[int]): #Показать найденный маршрут
-        self.root.after(0, lambda: self.visualize_graph(highlight_route=route))
+        self._request_frame((route, None, None))
+        
+    def _request_frame(self, frame: tuple):
+        #события между кадрами сливаются: рисуется только последнее состояние,
+        #не чаще max_fps раз в секунду
+        with self._frame_lock:
+            self._pending_frame = frame
+            if self._frame_scheduled:
+                return
+            self._frame_scheduled = True
+        wait = self._last_frame_time + 1.0 / self.max_fps - time.monotonic()
+        self.root.after(max(0, int(wait * 1000)), self._flush_frame)
+        
+    def _flush_frame(self):
+        with self._frame_lock:
+            frame = self._pending_frame
+            self._pending_frame = None
+            self._frame_scheduled = False
+        self._last_frame_time = time.monotonic()
+        if frame is not None:
+            self.visualize_graph(*frame)
         
     def add_log(self, message: str):# Добавить сообщение в лог
+        # строки копятся в кольцевом буфере и вставляются в виджет пачкой
         timestamp = time.strftime("%H:%M:%S [log here]")
+        line = f"[{timestamp}] {message}\n"
+        with self._log_lock:
+            self._log_buffer.append(line)
+            if self._log_scheduled:
+                return
+            self._log_scheduled = True
+        self.root.after(self.log_flush_ms, self._flush_log)
+        
+    def _flush_log(self):
+        # буфер подменяется новым под блокировкой: строки потоков узлов не теряются
+        with self._log_lock:
+            lines = self._log_buffer
+            self._log_buffer = deque(maxlen=self.max_log_lines)
+            self._log_scheduled = False
+        if not lines:
+            return
+        self.log_text.insert(tk.END, ''.join(lines))
+        
+        # оставляем в виджете не больше max_log_lines последних строк
+        excess = int(self.log_text.index('end-1c').split('.')[0]) - 1 - self.max_log_lines
+        if excess > 0:
+            self.log_text.delete('1.0', f'{excess + 1}.0')
+        self.log_text.see(tk.END)
+        
+    def toggle_recording(self): # Начать или остановить запись трассы
+        if self.network.trace is not None:
+            path = self.network.trace.path
+            self.network.stop_trace()
+            self.record_button.config(text="Записать трассу")
+            self.add_log(f"Запись трассы остановлена: {path}")
+            return
+        path = filedialog.asksaveasfilename(
+            title="Файл трассы",
+            defaultextension=".dsrtrace",
+            filetypes=[("Трасса DSR", "*.dsrtrace"), ("Все файлы", "*.*")]
+        )
+        if not path:
+            return
+        self.network.start_trace(path)
+        self.record_button.config(text="Остановить запись")
+        self.add_log(f"Запись трассы: {path}")
+        
+    def open_trace(self): # Загрузить трассу для проигрывания
+        path = filedialog.askopenfilename(
+            title="Открыть трассу",
+            filetypes=[("Трасса DSR", "*.dsrtrace"), ("Все файлы", "*.*")]
+        )
+        if not path:
+            return
+        try:
+            replay = TraceReplay(path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Ошибка", f"Не удалось открыть трассу: {e}")
+            return
+            
+        # проигрывание не запускает узлы: сеть без узлов только с графом трассы
+        self.stop_replay()
+        self.network.stop_nodes()
+        self.network.stop_trace()
+        self.record_button.config(text="Записать трассу")
+        self.network = Network(self)
+        self.network.graph = replay.graph
+        self.pos = None
+        self.replay = replay
+        self.replay_index = 0
+        self._replay_links = 0
+        self.replay_scale.config(to=max(0, len(replay) - 1))
+        self.show_replay_frame(0)
+        self.add_log(
+            f"Трасса {path}: {len(replay)} кадров, {replay.sends} пакетов "
+            f"(не доставлено {replay.dropped}), изменений связей {len(replay.links)}, "
+            f"{replay.duration:.2f} с"
+        )
         
-        def update():
-            self.log_text.insert(tk.END, f"[{timestamp}] {message}\n")
-            self.log_text.see(tk.END)
+    def show_replay_frame(self, index: int): # Показать кадр трассы
+        if self.replay is None or len(self.replay) == 0:
+            self.visualize_graph()
+            return
+        index = min(max(index, 0), len(self.replay) - 1)
+        self.replay_index = index
+        links = self.replay.apply_links(self.network.graph, self._replay_links, index)
+        if links != self._replay_links:  # связи изменились - ребра рисуются заново
+            self._replay_links = links
+            self._drawn_graph = None
+        event = self.replay.frames[index]
+        if event.kind == 'route':
+            self.visualize_graph(highlight_route=event.route)
+        else:
+            self.visualize_graph(None, event.packet, event.node)
+        self.replay_label.config(text=f"{index + 1} / {len(self.replay)}")
+        self._seeking = True  # set() вызывает command, не перематываем повторно
+        self.replay_scale.set(index)
+        self._seeking = False
+        
+    def step_replay(self, delta: int): # Шаг вперед или назад по трассе
+        self.stop_replay()
+        if self.replay is not None:
+            self.show_replay_frame(self.replay_index + delta)
             
-        self.root.after(0, update)
+    def seek_replay(self, value): # Перемотка ползунком
+        if self.replay is None or self._seeking:
+            return
+        self.stop_replay()
+        self.show_replay_frame(int(float(value)))
+        
+    def toggle_replay(self): # Воспроизведение / пауза
+        if self._replay_job is not None:
+            self.stop_replay()
+            return
+        if self.replay is None or len(self.replay) == 0:
+            return
+        try:
+            speed = float(self.replay_speed_var.get())
+            if speed <= 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Ошибка", "Введите положительную скорость")
+            return
+        if self.replay_index >= len(self.replay) - 1:
+            self.replay_index = 0
+        self._replay_speed = speed
+        self._replay_origin = (time.monotonic(), self.replay.times[self.replay_index])
+        self.play_button.config(text="❚❚")
+        self._replay_tick()
+        
+    def _replay_tick(self):
+        # кадр выбирается по времени трассы, лишние кадры при высокой скорости пропускаются
+        wall_start, trace_start = self._replay_origin
+        trace_now = trace_start + (time.monotonic() - wall_start) * self._replay_speed
+        index = max(self.replay_index, self.replay.index_at(trace_now))
+        if index != self.replay_index or self._replay_job is None:
+            self.show_replay_frame(index)
+        if index >= len(self.replay) - 1:
+            self.stop_replay()
+            return
+        wait = (self.replay.times[index + 1] - trace_now) / self._replay_speed
+        wait = max(wait, 1.0 / self.max_fps)
+        self._replay_job = self.root.after(int(wait * 1000), self._replay_tick)
+        
+    def stop_replay(self):
+        if self._replay_job is not None:
+            self.root.after_cancel(self._replay_job)
+            self._replay_job = None
+        self.play_button.config(text="▶")
         
     def clear_log(self):
+        with self._log_lock:
+            self._log_buffer.clear()
         self.log_text.delete(1.0, tk.END)
         self.add_log("Лог очищен")
         
     def reset(self):
+        self.stop_replay()
+        self.replay = None
         self.network.stop_nodes()
+        self.network.stop_trace()
+        self.record_button.config(text="Записать трассу")
         self.network = Network(self)
         self.pos = None
         self.visualize_graph()
@@ -350,6 +679,8 @@ class DSRSimulatorGUI:
             messagebox.showerror("Ошибка", "Введите корректное значение задержки")
             
     def on_closing(self):
+        self.stop_replay()
         self.network.stop_nodes()
+        self.network.stop_trace()
         self.root.destroy()
 
@@ -0,0 +1,9 @@
+import sys
+
+from dsr.mobility import main
+
+
+#Запуск из каталога проекта: python mobility.py ... (то же, что dsr mobility ...)
+
+if __name__ == "__main__":
+    sys.exit(main())
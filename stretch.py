@@ -0,0 +1,9 @@
+import sys
+
+from dsr.stretch import main
+
+
+#Запуск из каталога проекта: python stretch.py ... (то же, что dsr stretch ...)
+
+if __name__ == "__main__":
+    sys.exit(main())
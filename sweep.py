@@ -0,0 +1,9 @@
+import sys
+
+from dsr.sweep import main
+
+
+#Запуск из каталога проекта: python sweep.py ... (то же, что dsr sweep ...)
+
+if __name__ == "__main__":
+    sys.exit(main())
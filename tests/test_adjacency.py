@@ -0,0 +1,68 @@
+import random
+
+import numpy as np
+import pytest
+
+from dsr.adjacency import Adjacency
+from dsr.network_topology import NetworkTopologyGenerator
+from dsr.topology_file import content_hash, save_topology
+from graph_layout import topology_hash
+
+
+def test_one_topology_hash_for_files_and_layouts(tmp_path):
+    adjacency = NetworkTopologyGenerator.create_adjacency(50, seed=3)
+    save_topology(str(tmp_path / 'net.dsrtopo'), adjacency)
+    save_topology(str(tmp_path / 'net.edges'), adjacency)
+    digest = adjacency.content_hash()
+    assert content_hash(str(tmp_path / 'net.dsrtopo')) == digest
+    assert content_hash(str(tmp_path / 'net.edges')) == digest
+    assert topology_hash(adjacency.to_networkx()) == digest
+
+
+def _reference(num_nodes, edges):
+    # та же смежность заново по набору ребер (u < v, без повторов)
+    return Adjacency.from_edges(num_nodes, sorted({(min(u, v), max(u, v)) for u, v in edges}))
+
+
+def _assert_same(adjacency, expected):
+    assert adjacency.num_nodes == expected.num_nodes
+    assert np.array_equal(np.asarray(adjacency.offsets), np.asarray(expected.offsets))
+    assert np.array_equal(np.asarray(adjacency.indices), np.asarray(expected.indices))
+    assert adjacency.content_hash() == expected.content_hash()
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_with_changes_matches_from_edges(seed):
+    rng = random.Random(seed)
+    n = 40
+    adjacency = NetworkTopologyGenerator.create_adjacency(n, seed=seed)
+    edges = {tuple(edge) for edge in adjacency.edges().tolist()}
+    for _ in range(20):
+        existing = sorted(edges)
+        removed = rng.sample(existing, min(len(existing), rng.randint(0, 4)))
+        # отсутствующие ребра среди удаляемых, существующие среди добавляемых,
+        # ребра в обратном порядке концов и повторы в одном списке
+        removed += [(rng.randrange(n), rng.randrange(n)) for _ in range(2)]
+        removed = [(v, u) if rng.random() < 0.5 else (u, v) for u, v in removed if u != v]
+        added = [(rng.randrange(n), rng.randrange(n)) for _ in range(4)]
+        added += rng.sample(existing, min(len(existing), 2))
+        added = [(u, v) for u, v in added if u != v]
+        added += added[:1]
+        adjacency = adjacency.with_changes(added, removed)
+        edges -= {(min(u, v), max(u, v)) for u, v in removed}
+        edges |= {(min(u, v), max(u, v)) for u, v in added}
+        _assert_same(adjacency, _reference(n, edges))
+
+
+def test_with_changes_edge_cases():
+    adjacency = Adjacency.from_edges(5, [(0, 1), (1, 2), (2, 3)])
+    # удаление отсутствующего ребра и повторное добавление существующего ничего не меняют
+    _assert_same(adjacency.with_changes([(1, 0), (2, 3)], [(0, 4), (3, 4)]), adjacency)
+    _assert_same(adjacency.with_changes([], []), adjacency)
+    # ребро и удаляется, и добавляется: остается (удаления применяются первыми)
+    _assert_same(adjacency.with_changes([(2, 1)], [(1, 2)]), adjacency)
+    # узел без соседей получает связи, узел 3 теряет единственную
+    changed = adjacency.with_changes([(4, 0), (4, 2)], [(2, 3)])
+    _assert_same(changed, _reference(5, [(0, 1), (1, 2), (0, 4), (2, 4)]))
+    with pytest.raises(ValueError):
+        adjacency.with_changes([(0, 5)], [])
@@ -0,0 +1,40 @@
+import random
+
+import networkx as nx
+
+from dsr.network_topology import BridgeTracker, NetworkTopologyGenerator
+
+
+def test_bridge_count_matches_networkx():
+    rng = random.Random(0)
+    for trial in range(30):
+        n = rng.randrange(2, 40)
+        graph = nx.Graph()
+        graph.add_nodes_from(range(n))
+        tracker = BridgeTracker(n)
+        order = list(range(n))
+        rng.shuffle(order)
+        for i in range(1, n):
+            parent = order[rng.randrange(i)]
+            tracker.add_tree_edge(parent, order[i])
+            graph.add_edge(parent, order[i])
+        assert tracker.bridges == len(list(nx.bridges(graph)))
+        for _ in range(rng.randrange(3 * n)):
+            u, v = rng.sample(range(n), 2)
+            if graph.has_edge(u, v):
+                continue
+            before = tracker.bridges
+            removed = tracker.add_edge(u, v)
+            graph.add_edge(u, v)
+            assert tracker.bridges == len(list(nx.bridges(graph)))
+            assert removed == (tracker.bridges < before)
+
+
+def test_incremental_topology_is_bridge_free():
+    for seed in range(10):
+        edges = NetworkTopologyGenerator.incremental_edges(60, seed)
+        graph = nx.Graph(edges.tolist())
+        assert graph.number_of_nodes() == 60
+        assert nx.is_connected(graph)
+        assert not nx.has_bridges(graph)
+        assert len(edges) <= 2 * (60 - 1)
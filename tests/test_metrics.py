@@ -0,0 +1,29 @@
+import os
+
+import pytest
+
+from dsr.metrics import MetricsExporter, NetworkMetrics
+
+
+def test_unknown_format_leaves_no_files(tmp_path):
+    path = str(tmp_path / 'metrics.prom')
+    with pytest.raises(ValueError):
+        NetworkMetrics().export(path, 'xml')
+    with pytest.raises(ValueError):
+        MetricsExporter(NetworkMetrics(), path, fmt='xml')
+    assert os.listdir(tmp_path) == []
+
+
+def test_failed_write_removes_temp_file(tmp_path, monkeypatch):
+    metrics = NetworkMetrics()
+    path = str(tmp_path / 'metrics.prom')
+    metrics.export(path)
+
+    def broken(f):
+        f.write('partial')
+        raise RuntimeError('запись прервана')
+
+    monkeypatch.setattr(metrics, 'write_prometheus', broken)
+    with pytest.raises(RuntimeError):
+        metrics.export(path)
+    assert os.listdir(tmp_path) == ['metrics.prom']
@@ -0,0 +1,43 @@
+import numpy as np
+
+from dsr.mobility import MobilityController
+from dsr.simulation import HeadlessNetwork
+from dsr.traffic import TrafficGenerator
+
+
+class _ScriptedModel:
+    # узел 1 уходит от линии 0 - 1 - 2, узел 3 подходит на его место снизу
+    def __init__(self):
+        self.positions = np.array([[0.0, 0.0], [100.0, 0.0], [200.0, 0.0], [100.0, 500.0]])
+
+    def step(self, dt: float) -> np.ndarray:
+        self.positions[1, 1] += 40.0 * dt
+        self.positions[3, 1] = max(100.0, self.positions[3, 1] - 40.0 * dt)
+        return np.array([1, 3])
+
+
+def test_flow_recovers_while_nodes_keep_moving():
+    network = HeadlessNetwork(delay=0.01)
+    controller = MobilityController(network, _ScriptedModel(), radio_range=150.0)
+    controller.attach()
+    generator = TrafficGenerator(network, retry_interval=0.5)
+    flow = generator.add_flow(0, 2, rate=10, duration=20)
+    seen = {}
+
+    def probe(name):
+        seen[name] = (flow.status, flow.route, flow.stats.delivered)
+
+    # связь 0 - 1 рвется на шаге 3, узел 3 связывает 0 и 2 с шага 10
+    network.scheduler.schedule(5.0, probe, 'cut')
+    network.scheduler.schedule(15.0, probe, 'recovered')
+    controller.start(20.0)
+    generator.run()
+
+    assert controller.link_breaks >= 2
+    assert seen['cut'][0] == 'pending' and seen['cut'][1] is None
+    assert seen['recovered'][:2] == ('active', (0, 3, 2))
+    assert flow.rediscoveries == 1
+    assert flow.status == 'done'
+    # после восстановления пакеты снова доставляются, пока узлы продолжают двигаться
+    assert flow.stats.delivered - seen['recovered'][2] >= 45
+    assert flow.stats.delivered >= 100
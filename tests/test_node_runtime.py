@@ -0,0 +1,17 @@
+import pytest
+
+from dsr.network import Network
+
+
+@pytest.mark.parametrize('runtime', ['threads', 'asyncio'])
+def test_packets_sent_before_start_are_delivered(runtime):
+    # поиск запущен до start_nodes: пакеты ждут узлы, а не теряются
+    network = Network(runtime=runtime)
+    network.set_delay(0.001)
+    network.create_topology(8, seed=1)
+    session = network.initiate_communication(0, 7)
+    try:
+        network.start_nodes()
+        assert session.result(timeout=10) is not None
+    finally:
+        network.stop_nodes()
@@ -0,0 +1,36 @@
+import random
+
+import pytest
+
+from dsr import partition
+from dsr.partition import PartitionedNetwork
+from dsr.simulation import HeadlessNetwork
+
+
+def _concurrent_sessions(network, num_nodes, seed, pairs):
+    # одновременные поиски без кэшей маршрутов, рассылки до конца
+    network.configure_route_cache(None, 0)
+    network.create_topology(num_nodes, seed, 'constructive')
+    sessions = [network.initiate_communication(source, destination) for source, destination in pairs]
+    network.run()
+    results = [(session.route, session.latency, session.rreq, session.rrep) for session in sessions]
+    return results, dict(network.packet_counts)
+
+
+@pytest.mark.parametrize('renumber_length', [partition.RENUMBER_LENGTH, 4])
+def test_partitioned_sessions_match_headless(monkeypatch, renumber_length):
+    # короткий предел ключа - перенумерация событий почти на каждом шаге
+    monkeypatch.setattr(partition, 'RENUMBER_LENGTH', renumber_length)
+    num_nodes, seed = 200, 5
+    rng = random.Random(seed)
+    pairs = [tuple(rng.sample(range(num_nodes), 2)) for _ in range(12)]
+    # одна и та же пара дважды в одно время - разные номера поиска
+    pairs.append(pairs[0])
+
+    expected, expected_counts = _concurrent_sessions(HeadlessNetwork(delay=1.0), num_nodes, seed, pairs)
+    with PartitionedNetwork(2, delay=1.0) as network:
+        results, counts = _concurrent_sessions(network, num_nodes, seed, pairs)
+
+    assert all(route is not None for route, _, _, _ in expected)
+    assert results == expected
+    assert counts == expected_counts
@@ -0,0 +1,78 @@
+from dsr.dsr_protocol import RreqFilter
+from dsr.simulation import HeadlessNetwork
+
+
+def test_request_older_than_window_is_new():
+    rreq_filter = RreqFilter(window=4, expiry=None)
+    assert rreq_filter.register(0, 10)
+    assert rreq_filter.register(0, 2)  # старше окна, но не встречался
+    assert not rreq_filter.register(0, 2)
+    assert (0, 2) in rreq_filter
+    assert (0, 3) not in rreq_filter
+
+
+def test_requests_leaving_window_stay_seen():
+    rreq_filter = RreqFilter(window=4, expiry=None)
+    for request_id in range(1, 4):
+        assert rreq_filter.register(0, request_id)
+    assert rreq_filter.register(0, 100)
+    for request_id in range(1, 4):
+        assert not rreq_filter.register(0, request_id)
+    assert rreq_filter.register(0, 4)
+
+
+def test_expiry_forgets_requests_outside_window():
+    now = [0.0]
+    rreq_filter = RreqFilter(window=4, expiry=10.0, clock=lambda: now[0])
+    rreq_filter.register(0, 1)
+    rreq_filter.register(0, 100)
+    now[0] = 5.0
+    assert not rreq_filter.register(0, 1)
+    now[0] = 30.0
+    rreq_filter.register(1, 1)  # очистка по времени
+    assert (0, 1) not in rreq_filter
+
+
+def test_many_concurrent_sessions_from_one_source_under_jitter():
+    # больше window одновременных поисков одного источника, RREQ приходят не по порядку
+    network = HeadlessNetwork(delay=1.0)
+    network.configure_route_cache(None, 0)
+    network.configure_links(None, jitter=0.9, seed=1)
+    network.create_topology(10, seed=0)
+    sessions = [network.initiate_communication(0, 1 + i % 9) for i in range(300)]
+    network.run()
+    assert network.rreq_window == 512
+    assert network.link_model.lost == 0
+    assert all(session.route is not None for session in sessions)
+
+
+def test_window_grows_with_open_sessions():
+    rreq_filter = RreqFilter(window=4, expiry=None)
+    rreq_filter.register(0, 1)
+    rreq_filter.register(0, 8)  # 1 уходит в словарь
+    rreq_filter.window = 16
+    assert not rreq_filter.register(0, 1)
+    assert (0, 1) in rreq_filter
+    assert rreq_filter.register(0, 2)
+
+
+def _routes(concurrent: bool, pairs):
+    network = HeadlessNetwork(delay=1.0)
+    network.configure_route_cache(None, 0)
+    network.create_topology(30, seed=2)
+    if not concurrent:
+        return [network.discover(source, destination) for source, destination in pairs], network
+    sessions = [network.initiate_communication(source, destination) for source, destination in pairs]
+    network.run()
+    return [session.route for session in sessions], network
+
+
+def test_concurrent_and_sequential_find_same_routes():
+    # больше 64 одновременных поисков от одного источника: окно растет,
+    # рассылки не подавляют друг друга и дают те же маршруты, что и по очереди
+    pairs = [(0, 1 + i % 29) for i in range(150)] + [(5, 1 + i % 29) for i in range(80) if 1 + i % 29 != 5]
+    sequential, _ = _routes(False, pairs)
+    concurrent, network = _routes(True, pairs)
+    assert network.rreq_window == 256
+    assert all(route is not None for route in concurrent)
+    assert concurrent == sequential
@@ -0,0 +1,53 @@
+import pytest
+
+from dsr.adjacency import Adjacency
+from dsr.dsr_protocol import DSRPacket
+from dsr.sim_trace import MAGIC_V1, TraceReplay, TraceWriter, read_trace
+
+
+def _edges(graph):
+    return {(u, v) if u < v else (v, u) for u, v in graph.edges()}
+
+
+def test_later_topology_is_applied_between_frames(tmp_path):
+    path = str(tmp_path / 'run.dsrtrace')
+    writer = TraceWriter(path)
+    writer.topology(0.0, Adjacency.from_edges(3, [(0, 1), (1, 2)]))
+    writer.visualize(1.0, DSRPacket('RREQ', 0, 2), 0)
+    writer.topology(2.0, Adjacency.from_edges(4, [(0, 2), (2, 3)]))
+    writer.visualize(3.0, DSRPacket('RREQ', 0, 3), 2)
+    writer.links(4.0, [(1, 3)], [(2, 3)])
+    writer.visualize(5.0, DSRPacket('RREQ', 0, 3), 1)
+    writer.close()
+
+    replay = TraceReplay(path)
+    graph = replay.graph.copy()
+    assert _edges(graph) == {(0, 1), (1, 2)}
+    applied = replay.apply_links(graph, 0, 1)
+    assert graph.number_of_nodes() == 4
+    assert _edges(graph) == {(0, 2), (2, 3)}
+    applied = replay.apply_links(graph, applied, 2)
+    assert _edges(graph) == {(0, 2), (1, 3)}
+    replay.apply_links(graph, applied, 0)
+    assert graph.number_of_nodes() == 3
+    assert _edges(graph) == {(0, 1), (1, 2)}
+
+
+def test_long_routes_and_large_ids(tmp_path):
+    path = str(tmp_path / 'run.dsrtrace')
+    route = tuple(range(70000))
+    writer = TraceWriter(path)
+    writer.send(0.0, 0, 1, DSRPacket('RREP', 0, 69999, route, packet_id=2 ** 40, hop=69998))
+    writer.route_found(1.0, route)
+    writer.close()
+    send, found = read_trace(path)
+    assert send.packet.route == route and send.packet.packet_id == 2 ** 40
+    assert found.route == route
+
+
+def test_old_format_is_not_appended(tmp_path):
+    path = tmp_path / 'old.dsrtrace'
+    path.write_bytes(MAGIC_V1)
+    with pytest.raises(ValueError):
+        TraceWriter(str(path))
+    assert list(read_trace(str(path))) == []
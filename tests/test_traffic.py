@@ -0,0 +1,46 @@
+from dsr.adjacency import Adjacency
+from dsr.simulation import HeadlessNetwork
+from dsr.traffic import TrafficGenerator
+
+
+def _ring_network():
+    network = HeadlessNetwork(delay=0.01)
+    network.set_topology(Adjacency.from_edges(4, [(0, 1), (1, 2), (2, 3), (3, 0)]))
+    return network
+
+
+def test_flow_rediscovers_after_source_reconnects():
+    # источник отрезан на t=1..3, поиски без ответа повторяются, пока связь не вернется
+    network = _ring_network()
+    generator = TrafficGenerator(network, retry_interval=0.5)
+    flow = generator.add_flow(0, 2, rate=10, duration=5)
+    network.scheduler.schedule(1.0, network.update_links, [], [(0, 1), (0, 3)])
+    network.scheduler.schedule(3.0, network.update_links, [(0, 1)], [])
+    generator.run()
+    assert flow.status == 'done'
+    assert flow.rediscoveries == 1
+    assert 15 <= flow.stats.no_route <= 25
+    assert flow.stats.delivered >= 25
+    assert flow.route == (0, 1, 2)
+
+
+def test_initial_discovery_is_retried():
+    network = _ring_network()
+    network.update_links([], [(0, 1), (0, 3)])
+    generator = TrafficGenerator(network, retry_interval=0.5)
+    flow = generator.add_flow(0, 2, rate=10, duration=5)
+    network.scheduler.schedule(2.0, network.update_links, [(0, 3)], [])
+    generator.run()
+    assert flow.status == 'done'
+    assert 2.0 <= flow.started <= 2.6
+    assert flow.stats.delivered == 50
+
+
+def test_unreachable_flow_gives_up_at_deadline():
+    network = _ring_network()
+    network.update_links([], [(0, 1), (0, 3)])
+    generator = TrafficGenerator(network, retry_interval=0.5)
+    flow = generator.add_flow(0, 2, rate=10, duration=2)
+    generator.run()
+    assert flow.status == 'no_route'
+    assert network.scheduler.now < 2.5
@@ -0,0 +1,9 @@
+import sys
+
+from dsr.traffic import main
+
+
+#Запуск из каталога проекта: python traffic.py ... (то же, что dsr traffic ...)
+
+if __name__ == "__main__":
+    sys.exit(main())